@@ -2,9 +2,24 @@
 # Streamlit-app: Avanza-CSV → Tid till mål (P10/P50/P90) + XIRR
 #
 # - Användaren laddar upp två CSV: transactions och positions.
-# - Vi sparar dem till fasta sökvägar i data/raw/.
-# - Vi läser och normaliserar, räknar nuvärde (V0) och snitt månadsspar.
-# - Vi kör Monte Carlo för tid till mål och skriver summary + diagnostics.
+# - Vi tolkar de uppladdade bytes direkt i minnet (ingen disk-rundtur).
+# - Samma memoiserade pipeline som CLI:n (moneygoal.pipeline): validering,
+#   normalisering, V0, snitt månadsspar, XIRR, Monte Carlo och rapport är
+#   steg med deklarerade indata. Uppladdade bytes hashas på innehåll, så
+#   oförändrade filer tolkas bara en gång per process och ändrat mål/vol
+#   kör bara om simuleringen och rapporten.
+# - Datakontraktet valideras först (alla felaktiga rader visas på en gång,
+#   innan något räknas).
+# - Monte Carlo körs i bitar i en delad, begränsad trådpool (gemensam för
+#   alla sessioner); preliminära P10/P50/P90 med konvergensintervall visas
+#   medan den räknar, och en pågående körning avbryts när parametrarna ändras.
+# - Allt per användare lever i sessionen (st.session_state): indata, resultat
+#   och nedladdningar byggs i minnet, så samtidiga sessioner aldrig skriver
+#   över varandras filer. Enda delade filen är diagnostics.csv, som bara
+#   append:as under ett processlås.
+# - What-if-reglage (cagr, vol, månadsspar, mål) räknar om percentilerna
+#   mot en fast shock bank per session, utan ny slump. Banken mappas från
+#   result/shockbank/, så sessioner med samma seed/paths/horisont delar den.
 # - UI visar resultat och erbjuder nedladdning av CSV:er.
 # --------------------------------------------------------------------
 
@@ -13,32 +28,31 @@ import pandas as pd
 from pathlib import Path
 import datetime as dt
 import logging
-
-from moneygoal.io.avanza_csv import read_positions, read_transactions
-from moneygoal.contrib import prepare_contribution_rows, mean_monthly_contribution
-from moneygoal.sim.monte_carlo import time_to_goal_mc
-from moneygoal.diagnostics import diagnostics_dict
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from moneygoal.pipeline import Pipeline, Stage, default_pipeline
+from moneygoal.sim.progressive import BackgroundRun
+from moneygoal.sim.shockbank import ShockStore
+from moneygoal.sim.whatif import WhatIfBank
+from moneygoal.diagnostics import append_diagnostics
+from moneygoal.logsetup import setup_logging, new_run_id
+from moneygoal.instrument import Instrument
 
 APP_TITLE = "Moneygoal PoC"
-# Fasta målplatser för uppladdade filer enligt projektets kontrakt
-POS_PATH = Path("data/raw/positions/positions.csv")
-TRX_PATH = Path("data/raw/transactions/transactions.csv")
-RESULT_SUMMARY = Path("result/time_to_goal_summary.csv")
 RESULT_DIAG = Path("result/diagnostics.csv")
 LOG_PATH = Path("logs/app.log")
+# Max antal samtidiga simuleringar i processen; övriga sessioner köar
+SIM_WORKERS = int(os.environ.get("MONEYGOAL_SIM_WORKERS", min(4, os.cpu_count() or 1)))
 
-# --- Setup: skapa mappar och enkel fil-loggning en gång per process ---
-Path("data/raw/positions").mkdir(parents=True, exist_ok=True)
-Path("data/raw/transactions").mkdir(parents=True, exist_ok=True)
-RESULT_SUMMARY.parent.mkdir(parents=True, exist_ok=True)
+# --- Setup: skapa mappar och fil-loggning en gång per process ---
+RESULT_DIAG.parent.mkdir(parents=True, exist_ok=True)
 LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-# Initiera logging om inga handlers finns (Streamlit kan köra multipla gånger)
-if not logging.getLogger().handlers:
-    logging.basicConfig(
-        filename=str(LOG_PATH), level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(message)s",
-    )
+# Initiera delad JSON-loggning (idempotent; Streamlit kör om skriptet vid varje interaktion)
+setup_logging(LOG_PATH)
 
 # Grundläggande sidkonfiguration och rubriker
 st.set_page_config(page_title=APP_TITLE, layout="centered")
@@ -46,14 +60,97 @@ st.title(APP_TITLE)
 st.caption("Avanza-CSV → Tid till mål (P10/P50/P90) + XIRR. Inga externa datakällor.")
 
 # --- Hjälpfunktioner ---
-def save_uploaded_file(uf, target: Path) -> None:
-    """Spara en uppladdad Streamlit-fil (uf) till target som bytes."""
-    data = uf.getvalue()  # bytes från filuppladdaren
-    target.write_bytes(data)
-
-def months_to_ym(m: int) -> tuple[int, int]:
-    """Konvertera antal månader till (år, månader)."""
-    return m // 12, m % 12
+@st.cache_resource
+def sim_pool() -> ThreadPoolExecutor:
+    """Processgemensam, begränsad pool för Monte Carlo (numpy släpper GIL)."""
+    return ThreadPoolExecutor(max_workers=SIM_WORKERS, thread_name_prefix="moneygoal-mc")
+
+@st.cache_resource
+def shock_store() -> ShockStore:
+    """Minnesmappade shock banks på disk, delade av alla sessioner."""
+    return ShockStore()
+
+@st.cache_resource
+def diag_lock() -> threading.Lock:
+    """Serialiserar skrivningar till den delade diagnostics.csv."""
+    return threading.Lock()
+
+POLL_SECONDS = 0.15
+
+def simulate_progressive(key: tuple, params: dict, placeholder) -> dict:
+    """
+    Kör Monte Carlo progressivt och returnera slutliga percentiler.
+    (Färdiga resultat memoiseras av pipelinen; hit kommer bara nya nycklar.)
+
+    Steg:
+    1. Pågående körning i sessionen med annan nyckel ⇒ avbryt den
+       (nya parametrar) så att den slutar dra CPU.
+    2. Köa (eller återanslut till) körningen i den delade poolen och rita
+       preliminära percentiler, ±-intervall och förlopp tills den är klar.
+    """
+    bg = st.session_state.get("mc_run")
+    if bg is not None and bg.key != key:
+        bg.cancel()
+        bg = None
+    if bg is None:
+        bg = BackgroundRun(key, executor=sim_pool(), **params)
+        st.session_state["mc_run"] = bg
+
+    while True:
+        snap = bg.latest()
+        if bg.error is not None:
+            raise bg.error
+        if snap is not None:
+            with placeholder.container():
+                st.progress(snap.paths_done / snap.paths_total,
+                            text=f"{snap.paths_done} av {snap.paths_total} banor")
+                st.write(
+                    "  |  ".join(
+                        f"{k.upper()}: {snap.as_dict()[k] // 12} år {snap.as_dict()[k] % 12} mån "
+                        f"(±{snap.ci[k]:.1f} mån)"
+                        for k in ("p10", "p50", "p90")
+                    )
+                )
+                st.caption("Konvergerat" if snap.converged else "Preliminärt – konvergerar …")
+            if snap.done or snap.cancelled:
+                break
+        elif not bg.running:
+            break
+        else:
+            placeholder.info("Väntar på ledig beräkningsplats …")
+        time.sleep(POLL_SECONDS)
+
+    if snap is None or not snap.done:
+        raise RuntimeError("Simuleringen avbröts")
+    st.session_state.pop("mc_run", None)
+    return snap.as_dict()
+
+def progressive_mc(V0, contrib, cagr, vol, maxhorisont, paths, goal, seed, _placeholder) -> dict:
+    """Appens mc-steg: samma indata som standardsteget (lognormal), men progressivt."""
+    params = dict(
+        nuvarde=V0, mean_monthly_contrib=contrib, cagr=cagr, vol=vol,
+        max_months=maxhorisont, paths=paths, goal=goal, seed=seed,
+    )
+    return simulate_progressive(tuple(sorted(params.items())), params, _placeholder)
+
+@st.cache_resource
+def app_pipeline() -> Pipeline:
+    """
+    Processgemensam pipeline (minnescache, LRU) där mc-steget är utbytt mot
+    den progressiva körningen. Delas av alla sessioner.
+    """
+    mc = Stage("mc", progressive_mc, (
+        "V0", "contrib", "cagr", "vol", "maxhorisont", "paths", "goal", "seed", "_placeholder",
+    ))
+    return default_pipeline(max_entries=128).replace(mc)
+
+def session_bank(seed: int, paths: int, months: int) -> WhatIfBank:
+    """En shock bank per session; byts bara när seed, paths eller horisont ändras."""
+    bank = st.session_state.get("whatif_bank")
+    if bank is None or bank.key != (seed, paths, months):
+        bank = WhatIfBank(seed, paths, months, store=shock_store())
+        st.session_state["whatif_bank"] = bank
+    return bank
 
 # --- Inputs: formulär för filuppladdning och parametrar ---
 with st.form("inputs", clear_on_submit=False):
@@ -75,11 +172,15 @@ with st.form("inputs", clear_on_submit=False):
         cagr = st.number_input("CAGR (0–1)", min_value=0.0, max_value=1.0, step=0.01, value=0.06)
         seed = st.number_input("Seed", min_value=0, step=1, value=42)
         maxhor = st.number_input("Max horisont (mån)", min_value=1, step=12, value=600)
+        dividends = st.radio(
+            "Utdelningar", ["reinvest", "cash"], horizontal=True,
+            format_func={"reinvest": "Återinvestera", "cash": "Kontant (uttag)"}.get,
+        )
 
     # Kör-knapp submit: triggar validering och pipeline
     run = st.form_submit_button("Kör")
 
-# --- Actions: validera input, spara filer, kör pipeline, skriv UI ---
+# --- Actions: validera input, kör pipeline, skriv UI ---
 if run:
     # 1) Enkla guards för att ge användaren tidiga, tydliga fel
     errs = []
@@ -104,51 +205,52 @@ if run:
             st.error(e)
         st.stop()
 
-    # 2) Spara uppladdade filer till standardiserade sökvägar
-    save_uploaded_file(trx_file, TRX_PATH)
-    save_uploaded_file(pos_file, POS_PATH)
-
-    # 3) Kör end-to-end-pipeline med robust felhantering
+    # 2) Pipelinens indata: uppladdade bytes (hashas på innehåll) + parametrar
+    pipe = app_pipeline()
+    params = {
+        "positions": pos_file.getvalue(),
+        "transactions": trx_file.getvalue(),
+        "asof": dt.date.today().isoformat(),
+        "goal": float(goal),
+        "cagr": float(cagr),
+        "vol": float(vol),
+        "paths": int(paths),
+        "seed": int(seed),
+        "maxhorisont": int(maxhor),
+        "dividends": dividends,
+        "xirr_monthly": False,
+    }
+
+    # 3) Datakontrakt: visa alla felaktiga rader och stoppa innan något räknas
+    report = pipe.run(["validate"], params)["validate"]
+    if not report.ok:
+        st.error(f"Filerna följer inte datakontraktet ({report.n_errors} fel)")
+        for line in report.summary_lines():
+            st.write(line)
+        st.dataframe(report.to_frame(), use_container_width=True, hide_index=True)
+        if report.truncated:
+            st.caption(f"Visar högst {report.max_per_rule} rader per regel.")
+        st.stop()
+    if report.n_warnings:
+        with st.expander(f"Varningar i indata ({report.n_warnings})"):
+            for line in report.summary_lines():
+                st.write(line)
+
+    # 4) Kör end-to-end-pipeline med robust felhantering
+    new_run_id()
+    inst = Instrument()
     try:
-        # a) Läs och normalisera båda CSV:erna
-        df_pos = read_positions(str(POS_PATH))
-        df_trx = read_transactions(str(TRX_PATH))
-
-        # b) Nuvärde (V0): summa av Marknadsvärde
-        V0 = float(pd.to_numeric(df_pos["Marknadsvärde"]).sum())
-
-        # c) Månatligt snittbidrag: extrahera insättning/uttag → gruppera per månad → medel
-        rows = prepare_contribution_rows(df_trx)
-        mmc = float(mean_monthly_contribution(rows))
-
-        # d) Monte Carlo: simulera tid till att nå mål (mått i månader)
-        mc = time_to_goal_mc(
-            nuvarde=V0,
-            mean_monthly_contrib=mmc,
-            cagr=float(cagr),
-            vol=float(vol),
-            max_months=int(maxhor),
-            paths=int(paths),
-            goal=float(goal),
-            seed=int(seed),
-        )
-
-        # e) Konvertera månader till (år, mån) för P10/P50/P90
-        p10y, p10m = months_to_ym(mc["p10"])
-        p50y, p50m = months_to_ym(mc["p50"])
-        p90y, p90m = months_to_ym(mc["p90"])
-
-        # f) Skriv sammanfattning till result/time_to_goal_summary.csv
-        summary_df = pd.DataFrame({
-            "percentile": ["P10","P50","P90"],
-            "years": [p10y, p50y, p90y],
-            "months": [p10m, p50m, p90m],
-        })
-        summary_df.to_csv(RESULT_SUMMARY, index=False, encoding="utf-8")
+        # a–f) Normalisering → V0, snitt månadsspar, XIRR → Monte Carlo →
+        #       sammanfattning. Oförändrade filer ⇒ bara mc och report körs;
+        #       oförändrat allt ⇒ inget körs.
+        run = pipe.run(["V0", "contrib", "xirr", "mc", "report"],
+                       {**params, "_placeholder": st.empty()}, inst)
+        V0, mmc, mc = run["V0"], run["contrib"], run["mc"]
+        summary_df = run["report"]
 
         # g) Bygg diagnostics-rad med metadata + XIRR
         diag = {
-            "asof": dt.date.today().isoformat(),
+            "asof": params["asof"],
             "stage": "ui",
             "V0": V0,
             "goal": float(goal),
@@ -161,92 +263,101 @@ if run:
             "p10_months": int(mc["p10"]),
             "p50_months": int(mc["p50"]),
             "p90_months": int(mc["p90"]),
-            "positions_path": str(POS_PATH),
-            "transactions_path": str(TRX_PATH),
+            "xirr": run["xirr"]["xirr"],
+            "positions_path": f"upload:{pos_file.name}",
+            "transactions_path": f"upload:{trx_file.name}",
         }
-        # XIRR beräknas från transaktioner + nuvärde (se diagnostics_dict)
-        diag.update(diagnostics_dict(df_trx, df_pos))
-
-        # h) Append till diagnostics.csv och behåll kolumnordning om möjligt
-        cols_order = [
-            "asof","stage","V0","goal","mean_monthly_contrib",
-            "paths","vol","cagr","seed","maxhorisont",
-            "p10_months","p50_months","p90_months","xirr",
-            "positions_path","transactions_path",
-        ]
-
-        if RESULT_DIAG.exists() and RESULT_DIAG.stat().st_size > 0:
-            try:
-                old = pd.read_csv(RESULT_DIAG)
-                new = pd.concat([old, pd.DataFrame([diag])], ignore_index=True)
-                # Prioritera kända kolumner först, lägg ev. nya sist
-                present = [c for c in cols_order if c in new.columns]
-                rest = [c for c in new.columns if c not in present]
-                new = new.reindex(columns=present + rest)
-            except Exception:
-                # Om tidigare fil inte går att läsa, börja om med endast aktuell rad
-                new = pd.DataFrame([diag])
-        else:
-            # Första skrivningen: använd målordning och fyll ev. saknade med Na
-            new = pd.DataFrame([diag]).reindex(columns=cols_order, fill_value=pd.NA)
+        logging.info("stages", extra=inst.to_record())
 
-        new.to_csv(RESULT_DIAG, index=False, encoding="utf-8")
+        # h) Append till delade diagnostics.csv under processlås (ingen omläsning
+        #    av andras rader); sessionens egna rader sparas separat för nedladdning
+        with diag_lock():
+            append_diagnostics(diag, RESULT_DIAG)
+        st.session_state.setdefault("diag_rows", []).append(diag)
 
-        # --- UI Output ---
+        # i) Sessionens resultatobjekt; renderas nedan och överlever omkörningar
+        st.session_state["result"] = {
+            "V0": V0, "mmc": mmc, "mc": mc, "summary": summary_df, "diag": diag,
+        }
+        # Utgångsläge för what-if-reglagen
+        st.session_state["whatif_base"] = {
+            "V0": V0, "mmc": mmc, "cagr": float(cagr), "vol": float(vol), "goal": float(goal),
+            "seed": int(seed), "paths": int(paths), "maxhor": int(maxhor),
+        }
         st.success("Körning klar")
 
-        # Resultatsammanfattning i klartext
-        st.subheader("Tid till mål")
-        st.write(f"P10: {p10y} år {p10m} mån  |  P50: {p50y} år {p50m} mån  |  P90: {p90y} år {p90m} mån")
-
-        # Nyckeltal och spårbarhet
-        st.subheader("Diagnostics")
-        # Visa V0 och månadsspar med svensk sifferstil (mellanslag, komma)
-        st.write(f"Nuvärde (V0): {V0:,.2f} SEK".replace(",", " ").replace(".", ","))
-        st.write(f"Snitt månadsspar: {mmc:,.2f} SEK/mån".replace(",", " ").replace(".", ","))
-        st.write(f"XIRR: {diag['xirr']:.2%}")
-
-        # Visa senaste diagnostics vertikalt
-        try:
-            last = pd.read_csv(RESULT_DIAG).tail(1)
-            order = [
-                "asof","stage","V0","goal","mean_monthly_contrib",
-                "paths","vol","cagr","seed","maxhorisont",
-                "p10_months","p50_months","p90_months","xirr",
-                "positions_path","transactions_path",
-            ]
-            last = last[[c for c in order if c in last.columns]]
-            kv = last.T.reset_index()
-            kv.columns = ["fält", "värde"]
-            st.subheader("Diagnostics (detalj)")
-            st.dataframe(kv, use_container_width=True, hide_index=True)
-        except Exception:
-            pass    # UI ska inte krascha om läsningen fallerar
-
-        # Nedladdningar: gör det enkelt att exportera resultat
-        st.download_button(
-            "Ladda ner summary.csv",
-            summary_df.to_csv(index=False).encode("utf-8"),
-            file_name="time_to_goal_summary.csv"
-        )
-        st.download_button(
-            "Ladda ner diagnostics.csv",
-            Path(RESULT_DIAG).read_bytes(),
-            file_name="diagnostics.csv"
-        )
-
     except Exception as e:
         # Logga stacktrace till fil och visa kort fel i UI
         logging.exception("UI-körning misslyckades")
         st.error(f"ERROR: {e}")
 
+# --- UI Output: sessionens senaste resultat (aldrig delade filer) ---
+res = st.session_state.get("result")
+if res is not None:
+    mc, diag = res["mc"], res["diag"]
+
+    # Resultatsammanfattning i klartext
+    st.subheader("Tid till mål")
+    st.write("  |  ".join(
+        f"{k.upper()}: {mc[k] // 12} år {mc[k] % 12} mån" for k in ("p10", "p50", "p90")
+    ))
+
+    # Nyckeltal och spårbarhet
+    st.subheader("Diagnostics")
+    # Visa V0 och månadsspar med svensk sifferstil (mellanslag, komma)
+    st.write(f"Nuvärde (V0): {res['V0']:,.2f} SEK".replace(",", " ").replace(".", ","))
+    st.write(f"Snitt månadsspar: {res['mmc']:,.2f} SEK/mån".replace(",", " ").replace(".", ","))
+    st.write(f"XIRR: {diag['xirr']:.2%}")
+
+    # Visa sessionens diagnostics-rad vertikalt
+    kv = pd.DataFrame({"fält": list(diag), "värde": [str(v) for v in diag.values()]})
+    st.subheader("Diagnostics (detalj)")
+    st.dataframe(kv, use_container_width=True, hide_index=True)
+
+    # Nedladdningar byggs i minnet ur sessionens egna objekt
+    st.download_button(
+        "Ladda ner summary.csv",
+        res["summary"].to_csv(index=False).encode("utf-8"),
+        file_name="time_to_goal_summary.csv"
+    )
+    st.download_button(
+        "Ladda ner diagnostics.csv",
+        pd.DataFrame(st.session_state.get("diag_rows", [diag])).to_csv(index=False).encode("utf-8"),
+        file_name="diagnostics.csv"
+    )
+
+# --- What-if: reglage som räknar om P10/P50/P90 mot sessionens shock bank ---
+base = st.session_state.get("whatif_base")
+if base is not None:
+    st.divider()
+    st.subheader("What-if")
+    st.caption("Samma slumputfall för alla lägen: skillnader beror bara på reglagen.")
+    w_cagr = st.slider("CAGR", 0.0, 0.20, min(base["cagr"], 0.20), 0.005, format="%.3f")
+    w_vol = st.slider("Årsvolatilitet", 0.0, 0.50, min(base["vol"], 0.50), 0.01)
+    w_mmc = st.slider("Månadsspar (SEK)", 0.0, float(max(10_000.0, 3 * max(base["mmc"], 0.0))),
+                      float(max(base["mmc"], 0.0)), 100.0)
+    w_goal = st.slider("Målbelopp (SEK)", 10_000.0, float(max(base["goal"] * 3, base["V0"] * 2, 20_000.0)),
+                       float(base["goal"]), 10_000.0)
+    try:
+        bank = session_bank(base["seed"], base["paths"], base["maxhor"])
+        w = bank.evaluate(base["V0"], w_mmc, w_cagr, w_vol, w_goal)
+        st.write("  |  ".join(
+            f"{k.upper()}: {w[k] // 12} år {w[k] % 12} mån" for k in ("p10", "p50", "p90")
+        ))
+        st.caption(f"Omräknat på {bank.last_ms:.0f} ms ({base['paths']} banor × {base['maxhor']} mån)")
+    except Exception as e:
+        st.error(f"What-if misslyckades: {e}")
+
 # --- Underhållssektion: liten verktygsknapp för att rensa diagnostics ---
 st.divider()
 with st.expander("Underhåll"):
     if st.button("Rensa diagnostics.csv"):
         try:
-            if RESULT_DIAG.exists():
-                RESULT_DIAG.unlink()
+            with diag_lock():
+                existed = RESULT_DIAG.exists()
+                if existed:
+                    RESULT_DIAG.unlink()
+            if existed:
                 st.success("Diagnostics rensad")
             else:
                 st.info("Ingen diagnostics.csv att rensa")
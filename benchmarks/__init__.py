@@ -0,0 +1,8 @@
+# Benchmarks körs från repots rot (python -m benchmarks.<modul>). Om paketet
+# inte är installerat (pip install -e .) används src/ direkt.
+import importlib.util
+import sys
+from pathlib import Path
+
+if importlib.util.find_spec("moneygoal") is None:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
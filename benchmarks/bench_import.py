@@ -0,0 +1,90 @@
+# -------------------------------------------------------------------
+# Importtidsbenchmark för CLI:n, baserad på `python -X importtime`.
+# Kör en färsk interpretator per mätning (ingen modulcache), tolkar
+# importtime-raderna och rapporterar:
+#   - kumulativ importtid för målmodulen (min över N körningar),
+#   - de tyngsta direkta/transitiva importerna,
+#   - om tunga paket (pandas, numpy) drogs in.
+#
+# Körning:
+#   python -m benchmarks.bench_import [--module moneygoal.cli] [--runs 5] [--json out.json]
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("pandas", "numpy")
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    src = str(ROOT / "src")
+    env["PYTHONPATH"] = src + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    return env
+
+
+def importtime(module: str) -> Dict[str, int]:
+    """
+    Kör `python -X importtime -c "import <module>"` och returnera
+    {modulnamn: kumulativ tid i mikrosekunder}.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    out: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # Format: "import time:   self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        out[name] = int(parts[1].strip())
+    return out
+
+
+def measure(module: str = "moneygoal.cli", runs: int = 5) -> dict:
+    """Minsta kumulativa importtid (ms) över `runs` körningar + tyngsta moduler."""
+    best: Dict[str, int] = {}
+    for _ in range(runs):
+        t = importtime(module)
+        if not best or t.get(module, 0) < best.get(module, 0):
+            best = t
+    top: List[tuple] = sorted(best.items(), key=lambda kv: kv[1], reverse=True)[:10]
+    return {
+        "name": f"import:{module}",
+        "module": module,
+        "cumulative_ms": best.get(module, 0) / 1000.0,
+        "heavy_imported": sorted(h for h in HEAVY if h in best),
+        "top_ms": {k: v / 1000.0 for k, v in top},
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Mät importtid med python -X importtime.")
+    p.add_argument("--module", default="moneygoal.cli")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--json", default=None, help="Skriv resultatet som JSON hit.")
+    args = p.parse_args(argv)
+
+    res = measure(args.module, args.runs)
+    print(f"{res['module']}: {res['cumulative_ms']:.1f} ms (tunga: {res['heavy_imported'] or 'inga'})")
+    for name, ms in res["top_ms"].items():
+        print(f"  {ms:8.1f} ms  {name}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(res, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# -------------------------------------------------------------------
+# Jämför ett benchmarkresultat mot en baslinje (båda JSON från run.py).
+# Ett fall räknas som regression om
+#     current.min_s > baseline.min_s * (1 + tröskel)
+# där tröskeln är global (--threshold) eller per fall/svit via
+# --thresholds-fil ({"mc": 0.3, "e2e/cli/r10000": 0.5, ...}; det mest
+# specifika namnet vinner). Minsta tiden används eftersom den är minst
+# känslig för brus från andra processer.
+#
+# Körning:
+#   python -m benchmarks.compare result/bench/latest.json benchmarks/baseline.json \
+#       [--threshold 0.2] [--thresholds thresholds.json]
+# Exit-kod 1 om någon regression hittas, annars 0.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_THRESHOLD = 0.20
+
+
+def _threshold_for(name: str, suite: str, default: float, overrides: Dict[str, float]) -> float:
+    if name in overrides:
+        return overrides[name]
+    # Längsta prefix först: "io/read_transactions" före "io"
+    for key in sorted(overrides, key=len, reverse=True):
+        if name.startswith(key + "/"):
+            return overrides[key]
+    return overrides.get(suite, default)
+
+
+def compare(
+    current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+    overrides: Optional[Dict[str, float]] = None,
+) -> List[dict]:
+    """
+    Returnerar en rad per fall som finns i båda: namn, tider, kvot, tröskel
+    och om det är en regression. Fall som bara finns i ena filen hoppas över.
+    """
+    overrides = overrides or {}
+    base = {r["name"]: r for r in baseline.get("results", [])}
+    rows = []
+    for r in current.get("results", []):
+        b = base.get(r["name"])
+        if b is None or b["min_s"] <= 0:
+            continue
+        ratio = r["min_s"] / b["min_s"]
+        thr = _threshold_for(r["name"], r.get("suite", ""), threshold, overrides)
+        rows.append({
+            "name": r["name"],
+            "baseline_s": b["min_s"],
+            "current_s": r["min_s"],
+            "ratio": ratio,
+            "threshold": thr,
+            "regression": ratio > 1.0 + thr,
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Jämför benchmarkresultat mot baslinje.")
+    p.add_argument("current")
+    p.add_argument("baseline")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                   help="Tillåten relativ försämring, t.ex. 0.2 = 20 %%.")
+    p.add_argument("--thresholds", default=None, help="JSON med trösklar per svit/fall.")
+    args = p.parse_args(argv)
+
+    cur = json.loads(Path(args.current).read_text(encoding="utf-8"))
+    base = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    overrides = json.loads(Path(args.thresholds).read_text(encoding="utf-8")) if args.thresholds else {}
+
+    rows = compare(cur, base, args.threshold, overrides)
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else "ok"
+        print(f"{r['name']:<45} {r['baseline_s'] * 1000:9.2f} → {r['current_s'] * 1000:9.2f} ms "
+              f"(×{r['ratio']:.2f}, gräns ×{1 + r['threshold']:.2f}) {flag}")
+    n_reg = sum(r["regression"] for r in rows)
+    print(f"{len(rows)} jämförda, {n_reg} regressioner")
+    return 1 if n_reg else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
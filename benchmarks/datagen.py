@@ -0,0 +1,138 @@
+# -------------------------------------------------------------------
+# Seedad generator av syntetiska Avanza-exporter i svenskt format.
+# Tanken är att benchmarks (och tester) ska kunna skapa realistiska
+# positions.csv/transactions.csv i godtycklig storlek utan riktig kunddata:
+#   - separator `;`, decimalkomma, encoding utf-8-sig,
+#   - transactions med Avanzas 13 kolumner och typmix (Insättning, Uttag,
+#     Köp, Sälj, Utdelning, Övrigt m.fl.), ett fåtal tomma Belopp,
+#   - datum inom ett intervall, sorterade fallande som i exporten,
+#   - allt genererat vektoriserat (numpy) så att miljontals rader går fort.
+#
+# Körning:
+#   python -m benchmarks.datagen --rows 100000 --holdings 30 --out data/synth
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+TRX_COLUMNS = [
+    "Datum", "Konto", "Typ av transaktion", "Värdepapper/beskrivning", "Antal", "Kurs",
+    "Belopp", "Transaktionsvaluta", "Courtage", "Valutakurs", "Instrumentvaluta", "ISIN", "Resultat",
+]
+# Typmix ungefär som i en verklig sparares export
+TRX_TYPES = np.array(["Insättning", "Köp", "Utdelning", "Sälj", "Uttag", "Övrigt", "Utländsk källskatt"])
+TRX_WEIGHTS = np.array([0.30, 0.32, 0.18, 0.08, 0.04, 0.04, 0.04])
+
+
+def _sv(x: np.ndarray, decimals: int = 2) -> pd.Series:
+    """Formatera tal med decimalkomma (inga tusentalsavgränsare)."""
+    return pd.Series(np.round(x, decimals)).map(lambda v: f"{v:.{decimals}f}".replace(".", ","))
+
+
+def _isins(rng: np.random.Generator, n: int) -> np.ndarray:
+    digits = rng.integers(0, 10**9, size=n)
+    return np.array([f"SE{d:010d}" for d in digits])
+
+
+def generate_positions(holdings: int = 30, seed: int = 0, total_value: float = 738_273.18) -> pd.DataFrame:
+    """Positioner med kolumnerna Avanza exporterar; Marknadsvärde summerar till total_value."""
+    rng = np.random.default_rng(seed)
+    w = rng.dirichlet(np.ones(holdings))
+    value = w * total_value
+    volym = rng.integers(1, 2000, size=holdings)
+    isin = _isins(rng, holdings)
+    return pd.DataFrame({
+        "Kontonummer": "9552-0000000",
+        "Namn": [f"Innehav {i}" for i in range(holdings)],
+        "Kortnamn": [f"INN{i}" for i in range(holdings)],
+        "Volym": volym.astype(str),
+        "Marknadsvärde": _sv(value),
+        "GAV (SEK)": _sv(value / volym * rng.uniform(0.6, 1.2, holdings)),
+        "GAV": _sv(value / volym),
+        "Valuta": "SEK",
+        "Land": "SE",
+        "ISIN": isin,
+        "Marknad": "XSTO",
+        "Typ": rng.choice(["STOCK", "FUND", "ETF"], size=holdings),
+    })
+
+
+def generate_transactions(
+    rows: int = 10_000,
+    seed: int = 0,
+    start: str = "2014-01-27",
+    end: str = "2025-08-07",
+    nan_share: float = 0.001,
+) -> pd.DataFrame:
+    """Transaktioner (13 kolumner, strängar i svenskt format) sorterade nyast först."""
+    rng = np.random.default_rng(seed)
+    t0, t1 = np.datetime64(start), np.datetime64(end)
+    days = rng.integers(0, int((t1 - t0).astype(int)) + 1, size=rows)
+    dates = np.sort(t0 + days.astype("timedelta64[D]"))[::-1]
+    typ = rng.choice(TRX_TYPES, size=rows, p=TRX_WEIGHTS)
+
+    amount = rng.lognormal(mean=8.0, sigma=1.0, size=rows)
+    sign = np.where(np.isin(typ, ["Insättning", "Sälj", "Utdelning"]), 1.0, -1.0)
+    belopp = _sv(sign * amount)
+    belopp[rng.random(rows) < nan_share] = ""
+
+    is_trade = np.isin(typ, ["Köp", "Sälj", "Utdelning"])
+    isin_pool = _isins(rng, 50)
+    isin = np.where(is_trade, rng.choice(isin_pool, size=rows), "")
+    antal = np.where(is_trade, rng.integers(1, 500, size=rows).astype(str), "")
+    kurs = np.where(is_trade, _sv(rng.uniform(5, 500, size=rows), 4), "")
+    courtage = np.where(np.isin(typ, ["Köp", "Sälj"]), _sv(rng.uniform(0, 99, size=rows)), "")
+
+    return pd.DataFrame({
+        "Datum": pd.Series(dates).astype(str),
+        "Konto": "Syntetisk",
+        "Typ av transaktion": typ,
+        "Värdepapper/beskrivning": np.where(is_trade, "Värdepapper", "Överföring"),
+        "Antal": antal,
+        "Kurs": kurs,
+        "Belopp": belopp,
+        "Transaktionsvaluta": "SEK",
+        "Courtage": courtage,
+        "Valutakurs": "1",
+        "Instrumentvaluta": np.where(is_trade, "SEK", ""),
+        "ISIN": isin,
+        "Resultat": "",
+    }, columns=TRX_COLUMNS)
+
+
+def write_avanza_csv(df: pd.DataFrame, path: str | Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, sep=";", index=False, encoding="utf-8-sig")
+    return path
+
+
+def write_dataset(out_dir: str | Path, rows: int, holdings: int = 30, seed: int = 0) -> Tuple[Path, Path]:
+    """Skriv positions.csv och transactions.csv till out_dir och returnera sökvägarna."""
+    out = Path(out_dir)
+    pos = write_avanza_csv(generate_positions(holdings, seed=seed), out / "positions.csv")
+    trx = write_avanza_csv(generate_transactions(rows, seed=seed), out / "transactions.csv")
+    return pos, trx
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Generera syntetiska Avanza-CSV:er.")
+    p.add_argument("--rows", type=int, default=10_000, help="Antal transaktionsrader.")
+    p.add_argument("--holdings", type=int, default=30, help="Antal innehav i positions.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default="data/synth", help="Målkatalog.")
+    args = p.parse_args(argv)
+    pos, trx = write_dataset(args.out, args.rows, args.holdings, args.seed)
+    print(f"{pos}\n{trx}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+# -------------------------------------------------------------------
+# Benchmark-svit för de varma vägarna:
+#   mc     time_to_goal_mc vid olika paths × horisont
+#   xirr   xirr för 10 … 100k kassaflöden (exakt och månadskomprimerat)
+#   io     read_transactions / normalize_* för 10k … 5M rader
+#   e2e    hela CLI:n som subprocess mot syntetisk data
+#   whatif WhatIfBank.evaluate (reglageomräkning, mål < 100 ms)
+#   multi  time_to_goal_multi, korrelerad simulering per innehav
+#   bootstrap time_to_goal_bootstrap (stationary/moving block)
+#   models engine.time_to_goal per avkastningsmodell (lognormal, student-t, regime)
+#   compact engine.time_to_goal float64 vs compact (float32/uint16) vid stora paths
+#   coarse time_to_goal_mc med step=1/3/12 (Brownian bridge); params har
+#          antal steg och percentilavvikelsen i månader mot månadsstegningen
+#
+# Varje fall körs `repeat` gånger; min och median av väggtiden sparas.
+# Därefter körs fallet en gång till under tracemalloc och toppminnet
+# (peak_bytes, allokeringar via Python och numpy) sparas (--no-memory hoppar över).
+# Resultatet skrivs som JSON ({"meta": ..., "results": [...]}) och kan
+# jämföras mot en baslinje med benchmarks/compare.py.
+#
+# Körning:
+#   python -m benchmarks.run [--profile quick|full] [--only mc,xirr] \
+#       [--out result/bench/latest.json]
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Storlekar per profil. "quick" håller sviten under någon minut (CI),
+# "full" täcker produktionsnära storlekar.
+SIZES = {
+    "quick": {
+        "mc": [(1_000, 120), (5_000, 600)],
+        "xirr": [10, 1_000, 10_000],
+        "io": [10_000, 100_000],
+        "e2e": [10_000],
+        "whatif": [(5_000, 600)],
+        "multi": [(5_000, 600, 10)],
+        "bootstrap": [(5_000, 600)],
+        "models": [(5_000, 600)],
+        "compact": [(200_000, 600)],
+        "coarse": [(20_000, 600)],
+    },
+    "full": {
+        "mc": [(1_000, 120), (5_000, 600), (20_000, 600), (100_000, 600)],
+        "xirr": [10, 1_000, 10_000, 100_000],
+        "io": [10_000, 100_000, 1_000_000, 5_000_000],
+        "e2e": [10_000, 1_000_000],
+        "whatif": [(5_000, 600), (20_000, 600)],
+        "multi": [(5_000, 600, 10), (5_000, 600, 50), (20_000, 600, 50)],
+        "bootstrap": [(5_000, 600), (100_000, 600)],
+        "models": [(5_000, 600), (100_000, 600)],
+        "compact": [(200_000, 600), (1_000_000, 600), (10_000_000, 600)],
+        "coarse": [(20_000, 600), (100_000, 1_200)],
+    },
+}
+
+# Ett fall: (namn, parametrar, funktion utan argument)
+Case = Tuple[str, dict, Callable[[], object]]
+SUITES: Dict[str, Callable[[dict, Path], Iterator[Case]]] = {}
+
+
+def suite(name: str):
+    """Registrera en generator av benchmarkfall under `name`."""
+    def deco(fn):
+        SUITES[name] = fn
+        return fn
+    return deco
+
+
+def time_case(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Kör fn `repeat` gånger och returnera min/median väggtid i sekunder."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"min_s": min(times), "median_s": statistics.median(times), "repeat": repeat}
+
+
+def peak_memory(fn: Callable[[], object]) -> int:
+    """Toppminne (byte) för ett anrop av fn enligt tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@suite("mc")
+def _mc(sizes: dict, work: Path) -> Iterator[Case]:
+    from moneygoal.sim.monte_carlo import time_to_goal_mc
+
+    for paths, months in sizes["mc"]:
+        params = {"paths": paths, "months": months}
+        yield (
+            f"mc/time_to_goal_mc/p{paths}_m{months}", params,
+            lambda p=paths, m=months: time_to_goal_mc(100_000, 2_000, 0.06, 0.15, m, p, goal=5_000_000, seed=42),
+        )
+
+
+@suite("xirr")
+def _xirr(sizes: dict, work: Path) -> Iterator[Case]:
+    import numpy as np
+
+    from moneygoal.models.mwrr import xirr
+
+    for n in sizes["xirr"]:
+        rng = np.random.default_rng(n)
+        start = dt.date(2014, 1, 1)
+        offs = np.sort(rng.integers(0, 365 * 11, size=n - 1))
+        cfs = [(start + dt.timedelta(days=int(d)), -float(a)) for d, a in zip(offs, rng.uniform(100, 5000, n - 1))]
+        cfs.append((dt.date(2025, 8, 7), float(sum(-a for _, a in cfs) * 1.5)))
+        yield f"xirr/xirr/n{n}", {"flows": n}, lambda c=cfs: xirr(c)
+        yield f"xirr/monthly/n{n}", {"flows": n}, lambda c=cfs: xirr(c, compress="month")
+
+
+@suite("io")
+def _io(sizes: dict, work: Path) -> Iterator[Case]:
+    import pandas as pd
+
+    from benchmarks.datagen import generate_positions, generate_transactions, write_avanza_csv
+    from moneygoal.io.avanza_csv import normalize_positions, normalize_transactions, read_transactions
+
+    for n in sizes["io"]:
+        path = write_avanza_csv(generate_transactions(n, seed=1), work / f"trx_{n}.csv")
+        raw = pd.read_csv(path, sep=";", dtype=str, encoding="utf-8-sig")
+        yield f"io/read_transactions/r{n}", {"rows": n}, lambda p=path: read_transactions(p)
+        yield f"io/normalize_transactions/r{n}", {"rows": n}, lambda d=raw: normalize_transactions(d)
+        pos = write_avanza_csv(generate_positions(n, seed=1), work / f"pos_{n}.csv")
+        raw_pos = pd.read_csv(pos, sep=";", dtype=str, encoding="utf-8-sig")
+        yield f"io/normalize_positions/r{n}", {"rows": n}, lambda d=raw_pos: normalize_positions(d)
+
+
+@suite("e2e")
+def _e2e(sizes: dict, work: Path) -> Iterator[Case]:
+    from benchmarks.datagen import write_dataset
+
+    for n in sizes["e2e"]:
+        pos, trx = write_dataset(work / f"e2e_{n}", rows=n, seed=2)
+        cmd = [
+            sys.executable, "-m", "moneygoal.cli", "--positions", str(pos), "--transactions", str(trx),
+            "--goal", "5000000", "--report", str(work / f"e2e_{n}" / "summary.csv"), "--paths", "5000",
+        ]
+        env = {"PYTHONPATH": str(ROOT / "src")}
+
+        def run(c=cmd, d=work / f"e2e_{n}"):
+            import os
+
+            subprocess.run(c, check=True, cwd=d, capture_output=True, env={**os.environ, **env})
+
+        yield f"e2e/cli/r{n}", {"rows": n, "paths": 5000}, run
+
+
+@suite("whatif")
+def _whatif(sizes: dict, work: Path) -> Iterator[Case]:
+    from moneygoal.sim.whatif import WhatIfBank
+
+    for paths, months in sizes.get("whatif", []):
+        bank = WhatIfBank(42, paths, months)
+        yield (
+            f"whatif/evaluate/p{paths}_m{months}", {"paths": paths, "months": months},
+            lambda b=bank: b.evaluate(100_000, 2_000, 0.06, 0.15, 1_000_000),
+        )
+
+
+@suite("multi")
+def _multi(sizes: dict, work: Path) -> Iterator[Case]:
+    import numpy as np
+
+    from moneygoal.sim.multi_asset import AssetAssumptions, time_to_goal_multi
+
+    for paths, months, assets in sizes.get("multi", []):
+        rng = np.random.default_rng(assets)
+        # Slumpad men giltig korrelationsmatris via faktormodell
+        f = rng.normal(size=(assets, 3))
+        cov = f @ f.T + np.eye(assets)
+        d = np.sqrt(np.diag(cov))
+        corr = cov / np.outer(d, d)
+        np.fill_diagonal(corr, 1.0)
+        a = AssetAssumptions(
+            keys=tuple(f"A{i}" for i in range(assets)),
+            cagr=rng.uniform(0.02, 0.09, assets),
+            vol=rng.uniform(0.05, 0.30, assets),
+            corr=corr,
+        )
+        values = rng.dirichlet(np.ones(assets)) * 100_000
+        yield (
+            f"multi/time_to_goal_multi/p{paths}_m{months}_a{assets}",
+            {"paths": paths, "months": months, "assets": assets},
+            lambda v=values, a=a, p=paths, m=months: time_to_goal_multi(
+                v, 2_000, a, m, p, goal=5_000_000, seed=42, rebalance_months=12),
+        )
+
+
+@suite("bootstrap")
+def _bootstrap(sizes: dict, work: Path) -> Iterator[Case]:
+    import numpy as np
+
+    from moneygoal.sim.bootstrap import BlockBootstrap, time_to_goal_bootstrap
+
+    returns = np.random.default_rng(0).normal(0.005, 0.045, 360)  # 30 års månader
+    for paths, months in sizes.get("bootstrap", []):
+        for method in ("stationary", "moving"):
+            bb = BlockBootstrap(returns, block=12, method=method)
+            yield (
+                f"bootstrap/{method}/p{paths}_m{months}", {"paths": paths, "months": months},
+                lambda b=bb, p=paths, m=months: time_to_goal_bootstrap(100_000, 2_000, b, m, p, 5_000_000, seed=42),
+            )
+
+
+@suite("models")
+def _models(sizes: dict, work: Path) -> Iterator[Case]:
+    from moneygoal.sim.engine import time_to_goal
+    from moneygoal.sim.returns import MODELS
+
+    # Ett fall per modell, så att en modell som återinför en per-bana-loop syns direkt
+    for paths, months in sizes.get("models", []):
+        for name, cls in MODELS.items():
+            model = cls(0.06, 0.15)
+            yield (
+                f"models/{name}/p{paths}_m{months}", {"paths": paths, "months": months},
+                lambda md=model, p=paths, m=months: time_to_goal(100_000, 2_000, md, m, p, 5_000_000, seed=42),
+            )
+
+
+@suite("compact")
+def _compact(sizes: dict, work: Path) -> Iterator[Case]:
+    from moneygoal.sim.engine import time_to_goal
+    from moneygoal.sim.returns import Lognormal
+
+    model = Lognormal(0.06, 0.15)
+    for paths, months in sizes.get("compact", []):
+        for compact in (False, True):
+            name = "compact" if compact else "float64"
+            yield (
+                f"compact/{name}/p{paths}_m{months}", {"paths": paths, "months": months, "compact": compact},
+                lambda p=paths, m=months, c=compact: time_to_goal(
+                    100_000, 2_000, model, m, p, 1_000_000, seed=42, compact=c),
+            )
+
+
+@suite("coarse")
+def _coarse(sizes: dict, work: Path) -> Iterator[Case]:
+    from moneygoal.sim.coarse import STEP_MONTHS
+    from moneygoal.sim.monte_carlo import time_to_goal_mc
+
+    for paths, months in sizes.get("coarse", []):
+        args = (100_000, 2_000, 0.06, 0.15, months, paths, 5_000_000, 42)
+        ref = time_to_goal_mc(*args)
+        for name, step in STEP_MONTHS.items():
+            got = ref if step == 1 else time_to_goal_mc(*args, step=step)
+            params = {"paths": paths, "months": months, "step": step, "steps": -(-months // step),
+                      **{f"d{k}_months": got[k] - ref[k] for k in ("p10", "p50", "p90")}}
+            yield (
+                f"coarse/{name}/p{paths}_m{months}", params,
+                lambda a=args, k=step: time_to_goal_mc(*a, step=k),
+            )
+
+
+def run_suite(
+    profile: str = "quick", only: List[str] | None = None, repeat: int = 3, memory: bool = True
+) -> dict:
+    """Kör valda sviter och returnera {"meta", "results"}."""
+    sizes = SIZES[profile]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="moneygoal-bench-") as tmp:
+        work = Path(tmp)
+        for name, gen in SUITES.items():
+            if only and name not in only:
+                continue
+            for case_name, params, fn in gen(sizes, work):
+                r = time_case(fn, repeat)
+                if memory:
+                    r["peak_bytes"] = peak_memory(fn)
+                results.append({"name": case_name, "suite": name, "params": params, **r})
+                mem = f"  peak {r['peak_bytes'] / 2**20:9.1f} MiB" if memory else ""
+                print(f"{case_name:<45} min {r['min_s'] * 1000:10.2f} ms  median {r['median_s'] * 1000:10.2f} ms{mem}")
+    return {
+        "meta": {
+            "profile": profile,
+            "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Kör moneygoals benchmark-svit.")
+    p.add_argument("--profile", choices=sorted(SIZES), default="quick")
+    p.add_argument("--only", default=None, help="Kommaseparerade sviter, t.ex. mc,xirr.")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--out", default="result/bench/latest.json")
+    p.add_argument("--no-memory", action="store_true", help="Hoppa över tracemalloc-mätningen av toppminne.")
+    args = p.parse_args(argv)
+
+    only = [s.strip() for s in args.only.split(",")] if args.only else None
+    res = run_suite(args.profile, only, args.repeat, memory=not args.no_memory)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(res, indent=2), encoding="utf-8")
+    print(f"→ {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
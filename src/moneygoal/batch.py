@@ -0,0 +1,295 @@
+# -------------------------------------------------------------------
+# Batch-läge: många mål/parameter-scenarier mot samma Avanza-export.
+# Tanken är att:
+#   - läsa positions/transactions EN gång och räkna V0, månadsspar och
+#     XIRR en gång (de beror inte på scenariot),
+#   - läsa en scenariofil (CSV, JSON eller TOML) med goal, cagr, vol,
+#     paths, seed och horizon per rad,
+#   - fördela scenarierna över en processpool; arbetarna får bara skalärer
+#     (V0, månadsspar, parametrar), inga DataFrames,
+#   - skriva en samlad rapport (en rad per scenario) och en diagnostics-rad
+#     per scenario,
+#   - med --shock-bank: skapa en minnesmappad shock bank per unik (seed,
+#     horisont, paths) i huvudprocessen innan poolen startar; arbetarna
+#     läser samma filer ur sidcachen i stället för att dra egna chocker
+#     (sim/shockbank.py). Resultaten är identiska med och utan bank.
+#
+# Körning:
+#   moneygoal batch --scenarios scen.toml --positions ... --transactions ... \
+#       --report result/batch_summary.csv [--workers 8] [--shock-bank]
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as dt
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+__all__ = ["read_scenarios", "run_scenarios", "main"]
+
+# Standardvärden = samma som CLI:ns flaggor
+SCENARIO_DEFAULTS = {"cagr": 0.06, "vol": 0.15, "paths": 5000, "seed": 42, "horizon": 600}
+
+REPORT_COLUMNS = [
+    "scenario", "goal", "cagr", "vol", "paths", "seed", "maxhorisont",
+    "p10_months", "p50_months", "p90_months", "error",
+]
+
+
+def _coerce(raw: dict, idx: int) -> dict:
+    """
+    Tolka en scenariorad till rätt typer och fyll i standardvärden.
+    `horizon` är scenariofilens namn för CLI:ns --maxhorisont.
+    Saknat mål ⇒ KeyError; fel format ⇒ ValueError.
+    """
+    row = {str(k).strip().lower(): v for k, v in raw.items() if v not in (None, "")}
+    if "goal" not in row:
+        raise KeyError(f"Scenario {idx}: saknar 'goal'")
+    merged = {**SCENARIO_DEFAULTS, **row}
+    return {
+        "scenario": str(merged.get("name", merged.get("scenario", idx))),
+        "goal": float(merged["goal"]),
+        "cagr": float(merged["cagr"]),
+        "vol": float(merged["vol"]),
+        "paths": int(merged["paths"]),
+        "seed": int(merged["seed"]),
+        "maxhorisont": int(merged.get("maxhorisont", merged["horizon"])),
+    }
+
+
+def read_scenarios(path: str | Path) -> List[dict]:
+    """
+    Läs scenarier från CSV, JSON eller TOML (avgörs av filändelsen).
+
+    Format:
+        CSV:  header med minst `goal`; separator `,` eller `;`.
+        JSON: lista av objekt, eller {"scenarios": [...]}.
+        TOML: [[scenario]]-tabeller (alt. nyckeln `scenarios`); kräver
+              Python 3.11+ eller tomli (annars ValueError).
+
+    Returnerar en lista av dictar med nycklarna
+    scenario, goal, cagr, vol, paths, seed, maxhorisont.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        raw = data.get("scenarios", []) if isinstance(data, dict) else data
+    elif suffix == ".toml":
+        from moneygoal.io.tomlfile import load_toml
+
+        data = load_toml(path)
+        raw = data.get("scenario", data.get("scenarios", []))
+    elif suffix == ".csv":
+        lines = path.read_text(encoding="utf-8-sig").splitlines()
+        if not lines:
+            return []
+        sep = ";" if lines[0].count(";") > lines[0].count(",") else ","
+        raw = list(csv.DictReader(lines, delimiter=sep))
+    else:
+        raise ValueError(f"Okänt scenarioformat: {path.suffix} (stöd: .csv, .json, .toml)")
+    return [_coerce(r, i) for i, r in enumerate(raw, start=1)]
+
+
+def _run_one(job: tuple) -> dict:
+    """
+    Arbetarfunktion (körs i processpoolen). Tar enbart skalärer så att
+    inget DataFrame behöver serialiseras. Fel isoleras per scenario.
+    """
+    from moneygoal.sim.monte_carlo import time_to_goal_mc
+
+    V0, mmc, sc, shocks = job
+    out = dict(sc)
+    try:
+        mc = time_to_goal_mc(
+            nuvarde=V0,
+            mean_monthly_contrib=mmc,
+            cagr=sc["cagr"],
+            vol=sc["vol"],
+            max_months=sc["maxhorisont"],
+            paths=sc["paths"],
+            goal=sc["goal"],
+            seed=sc["seed"],
+            shocks=shocks,
+        )
+        out.update(p10_months=mc["p10"], p50_months=mc["p50"], p90_months=mc["p90"], error="")
+    except Exception as e:  # ett trasigt scenario ska inte fälla hela batchen
+        out.update(p10_months=None, p50_months=None, p90_months=None, error=str(e))
+    return out
+
+
+def _materialize(scenarios: List[dict], shocks) -> None:
+    """Skapa bankerna i förväg så att arbetarna inte genererar samma fil samtidigt."""
+    from moneygoal.sim.engine import DEFAULT_CHUNK
+
+    for seed, months, paths in sorted({(sc["seed"], sc["maxhorisont"], sc["paths"]) for sc in scenarios}):
+        if paths >= 100 and months >= 1:
+            shocks.get(seed, months, paths, block=min(DEFAULT_CHUNK, paths))
+
+
+def run_scenarios(
+    scenarios: List[dict], V0: float, mmc: float, workers: Optional[int] = None, shocks=None
+) -> List[dict]:
+    """
+    Kör alla scenarier och returnera resultat i samma ordning som indata.
+
+    workers:
+        None → os.cpu_count()
+        1    → kör i aktuell process (ingen pool; enkelt att felsöka/testa)
+    shocks:
+        None eller en ShockStore (sim/shockbank.py) som delas av arbetarna.
+    """
+    if shocks is not None:
+        _materialize(scenarios, shocks)
+    jobs = [(V0, mmc, sc, shocks) for sc in scenarios]
+    n = workers or os.cpu_count() or 1
+    if n <= 1 or len(jobs) <= 1:
+        return [_run_one(j) for j in jobs]
+    # chunksize: färre IPC-rundor när scenarierna är många och små
+    chunksize = max(1, len(jobs) // (n * 4))
+    with ProcessPoolExecutor(max_workers=min(n, len(jobs))) as ex:
+        return list(ex.map(_run_one, jobs, chunksize=chunksize))
+
+
+def main(argv=None) -> int:
+    """
+    Batch-ingång. Exit-koder som CLI:n: 0 OK, 1 körfel, 2 argumentfel.
+    Scenarier som fallerar ger tom percentil och ett felmeddelande i
+    rapportens `error`-kolumn men fäller inte körningen.
+    """
+    from moneygoal.cli import param_errors
+
+    p = argparse.ArgumentParser(
+        prog="moneygoal batch",
+        description="Kör många tid-till-mål-scenarier mot samma positions/transactions.",
+    )
+    p.add_argument("--scenarios", required=True, help="Scenariofil (.csv, .json eller .toml).")
+    p.add_argument("--positions", required=True, help="Sökväg till positions.csv (Avanza-export).")
+    p.add_argument("--transactions", required=True, help="Sökväg till transactions.csv (Avanza-export).")
+    p.add_argument("--report", required=True, help="Samlad rapport (CSV), en rad per scenario.")
+    p.add_argument("--dividends", choices=["reinvest", "cash"], default="reinvest",
+                   help="Utdelningar: reinvest (default) eller cash (som CLI:n).")
+    p.add_argument("--workers", type=int, default=None, help="Antal processer (default: antal kärnor).")
+    p.add_argument("--shock-bank", action="store_true",
+                   help="Dela chocker mellan arbetarna via minnesmappade filer i result/shockbank/.")
+    args = p.parse_args(argv)
+
+    # 1) Tidig validering: filer, scenariofil och varje scenarios parametrar
+    errs = []
+    for flag, val in (("--scenarios", args.scenarios), ("--positions", args.positions),
+                      ("--transactions", args.transactions)):
+        if not Path(val).is_file():
+            errs.append(f"{flag} saknas: {val}")
+    if args.workers is not None and args.workers < 1:
+        errs.append("--workers måste vara ≥ 1")
+    scenarios: List[dict] = []
+    if not errs:
+        try:
+            scenarios = read_scenarios(args.scenarios)
+        except (KeyError, ValueError) as e:
+            errs.append(f"--scenarios: {e}")
+        if not errs and not scenarios:
+            errs.append("--scenarios innehåller inga scenarier")
+        for sc in scenarios:
+            for e in param_errors(sc["goal"], sc["paths"], sc["vol"], sc["cagr"], sc["maxhorisont"]):
+                errs.append(f"scenario {sc['scenario']}: {e}")
+    if errs:
+        for e in errs:
+            print(f"ARGERROR: {e}", file=sys.stderr)
+        return 2
+
+    import pandas as pd
+
+    from moneygoal.contrib import mean_monthly_contribution
+    from moneygoal.diagnostics import append_diagnostics, compute_xirr_from_ledger
+    from moneygoal.ledger import build_ledger, contribution_rows
+    from moneygoal.instrument import Instrument
+    from moneygoal.io.avanza_csv import read_positions, read_transactions
+    from moneygoal.logsetup import new_run_id, setup_logging
+
+    setup_logging("logs/app.log")
+    new_run_id()
+    logging.info("Batch start")
+    logging.info(f"scenarios={args.scenarios} n={len(scenarios)} workers={args.workers}")
+    inst = Instrument()
+
+    try:
+        # 2) Läs CSV och räkna scenariooberoende storheter en gång
+        with inst.stage("read"):
+            df_pos = read_positions(args.positions)
+            df_trx = read_transactions(args.transactions)
+        inst.count("rows_positions", len(df_pos))
+        inst.count("rows_transactions", len(df_trx))
+        V0 = float(df_pos["Marknadsvärde"].sum())
+        with inst.stage("contrib"):
+            ledger = build_ledger(df_trx)
+            mmc = mean_monthly_contribution(contribution_rows(ledger, args.dividends))
+        with inst.stage("xirr"):
+            shared: Dict[str, object] = {"xirr": compute_xirr_from_ledger(ledger, V0, dividends=args.dividends)}
+        if args.dividends != "reinvest":
+            shared["dividends"] = args.dividends
+
+        # 3) Fördela scenarierna över processpoolen
+        with inst.stage("mc"):
+            shocks = None
+            if args.shock_bank:
+                from moneygoal.sim.shockbank import ShockStore
+
+                shocks = ShockStore()
+            results = run_scenarios(scenarios, V0, mmc, workers=args.workers, shocks=shocks)
+        inst.count("scenarios", len(results))
+        inst.count("mc_paths", sum(r["paths"] for r in results))
+        inst.rate("mc_paths_per_s", "mc_paths", "mc")
+        inst.rate("scenarios_per_s", "scenarios", "mc")
+
+        # 4) Samlad rapport: en rad per scenario
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(results).reindex(columns=REPORT_COLUMNS).to_csv(
+            args.report, index=False, encoding="utf-8"
+        )
+
+        # 5) En diagnostics-rad per scenario (samma schema som enskild körning)
+        asof = dt.date.today().isoformat()
+        diag_rows = []
+        for r in results:
+            diag_rows.append({
+                "asof": asof,
+                "stage": f"batch:{r['scenario']}",
+                "V0": V0,
+                "goal": r["goal"],
+                "mean_monthly_contrib": mmc,
+                "paths": r["paths"],
+                "vol": r["vol"],
+                "cagr": r["cagr"],
+                "seed": r["seed"],
+                "maxhorisont": r["maxhorisont"],
+                "p10_months": r["p10_months"],
+                "p50_months": r["p50_months"],
+                "p90_months": r["p90_months"],
+                **shared,
+                "positions_path": args.positions,
+                "transactions_path": args.transactions,
+            })
+        append_diagnostics(diag_rows, "result/diagnostics.csv")
+
+        failed = [r for r in results if r["error"]]
+        logging.info("stages", extra=inst.to_record())
+        logging.info(f"Batch OK scenarios={len(results)} failed={len(failed)}")
+        print(f"{len(results)} scenarier klara ({len(failed)} fel) → {args.report}")
+        return 0
+
+    except Exception as e:
+        logging.exception("Batch failed")
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,45 @@
+# Snabb uppstart: modulen importerar bara lätta stdlib-moduler. pandas och
+# motorerna (io, contrib, sim, diagnostics) importeras först i det steg som
+# behöver dem, så att --help och ARGERROR-utgångar inte betalar för dem.
+# Se benchmarks/bench_import.py och tests/test_import_budget.py.
 import argparse, sys, logging
 from pathlib import Path
 import datetime as dt
-import pandas as pd
 
-from moneygoal.io.avanza_csv import read_positions, read_transactions
-from moneygoal.contrib import prepare_contribution_rows, mean_monthly_contribution
-from moneygoal.sim.monte_carlo import time_to_goal_mc
-from moneygoal.diagnostics import diagnostics_dict
+# Underkommandon → modul med main(argv); allt annat tolkas som en enskild körning.
+SUBCOMMANDS = {
+    "batch": "moneygoal.batch",
+    "fleet": "moneygoal.fleet",
+    "serve": "moneygoal.server",
+    "solve": "moneygoal.solve",
+    "watch": "moneygoal.watch",
+}
 
 
-def main(argv=None) -> int:
+def param_errors(goal: float, paths: int, vol: float, cagr: float, maxhorisont: int) -> list[str]:
     """
-    Pedagogik: Detta är CLI-ingången som
-      1) läser in positions/transactions,
-      2) beräknar nuvärde och genomsnittligt månadsspar,
-      3) kör Monte Carlo för tid till mål (P10/P50/P90),
-      4) skriver rapport och diagnostics,
-      5) loggar utfallet och returnerar exit-kod.
-
-    Return:
-        0  → OK
-        1  → Körtidsfel (fångat undantag)
-        2  → Argumentfel (tidig validering)
+    Validera Monte Carlo-parametrar med samma regler som CLI-flaggorna.
+    Returnerar en lista med felmeddelanden (tom lista = OK). Används även
+    av batch-läget för varje scenario.
     """
+    errs = []
+    if goal <= 0:
+        errs.append("--goal måste vara > 0")
+    if paths < 100:
+        errs.append("--paths måste vara ≥ 100")
+    if vol < 0:
+        errs.append("--vol måste vara ≥ 0")
+    if not (0.0 <= cagr <= 1.0):
+        errs.append("--cagr måste ligga i [0,1]")
+    if maxhorisont < 1:
+        errs.append("--maxhorisont måste vara ≥ 1")
+    return errs
+
+
+def build_parser(prog: str | None = None) -> argparse.ArgumentParser:
+    """Flaggorna för en enskild körning (delas med `moneygoal watch`)."""
     # 1) Definiera CLI-argument
-    p = argparse.ArgumentParser(description="Beräkna tid till ekonomiskt mål med Monte Carlo.")
+    p = argparse.ArgumentParser(prog=prog, description="Beräkna tid till ekonomiskt mål med Monte Carlo.")
     p.add_argument("--positions", required=True, help="Sökväg till positions.csv (Avanza-export).")
     p.add_argument("--transactions", required=True, help="Sökväg till transactions.csv (Avanza-export).")
     p.add_argument("--goal", type=float, required=True, help="Målbelopp i SEK.")
@@ -36,93 +51,200 @@ def main(argv=None) -> int:
     p.add_argument("--cagr", type=float, default=0.06, help="Antagen årlig avkastning (CAGR), 0–1.")
     p.add_argument("--seed", type=int, default=42, help="Slumptalsfrö för reproducerbarhet.")
     p.add_argument("--maxhorisont", type=int, default=600, help="Max simlängd i månader.")
+    p.add_argument(
+        "--dividends", choices=["reinvest", "cash"], default="reinvest",
+        help="Utdelningar: reinvest (stannar i portföljen, default) eller cash "
+             "(tas ut: minskar månadssparet och är egna flöden i XIRR).",
+    )
+    p.add_argument(
+        "--assumptions", default=None,
+        help="TOML/JSON med cagr/vol per ISIN eller tillgångsklass + korrelation; "
+             "ger korrelerad simulering per innehav i stället för --cagr/--vol.",
+    )
+    p.add_argument(
+        "--rebalance", type=int, default=0,
+        help="Ombalansera till startvikterna var N:e månad (med --assumptions; 0 = aldrig).",
+    )
+    p.add_argument(
+        "--returns", default=None,
+        help="Lokal CSV med historiska månadsavkastningar; ger block-bootstrap i stället för lognormal.",
+    )
+    p.add_argument("--block", type=int, default=12, help="Blocklängd i månader (med --returns).")
+    p.add_argument(
+        "--bootstrap", choices=["stationary", "moving"], default="stationary",
+        help="Blockschema för --returns: stationary (geometrisk längd) eller moving (fast längd).",
+    )
+
+    # Avkastningsmodell för standardsimuleringen (se moneygoal.sim.returns)
+    g = p.add_argument_group("avkastningsmodell")
+    g.add_argument(
+        "--model", choices=["lognormal", "student-t", "regime"], default="lognormal",
+        help="lognormal (default), student-t (feta svansar) eller regime (normal/bear-Markov).",
+    )
+    g.add_argument("--df", type=float, default=5.0, help="Frihetsgrader för student-t (> 2).")
+    g.add_argument("--bear-cagr", type=float, default=-0.20, help="CAGR i bear-tillståndet (regime).")
+    g.add_argument("--bear-vol", type=float, default=0.30, help="Årsvol i bear-tillståndet (regime).")
+    g.add_argument("--p-bear", type=float, default=0.02, help="P(normal → bear) per månad (regime).")
+    g.add_argument("--p-recover", type=float, default=0.10, help="P(bear → normal) per månad (regime).")
 
-    args = p.parse_args(argv)
+    p.add_argument(
+        "--compact", action="store_true",
+        help="Minnessnålt läge (float32, uint16, återanvända buffertar) för mycket många paths.",
+    )
+    p.add_argument(
+        "--step", choices=["month", "quarter", "year"], default="month",
+        help="Tidssteg i simuleringen: month (default) eller quarter/year med "
+             "Brownian bridge-korrektion (färre steg för långa horisonter; endast lognormal).",
+    )
+    p.add_argument(
+        "--xirr-monthly", action="store_true",
+        help="Lös XIRR på månadsvis komprimerade flöden (snabbt för stora historiker); "
+             "felgränsen mot exakt XIRR skrivs som xirr_error_bound i diagnostics.",
+    )
+    p.add_argument(
+        "--shock-bank", action="store_true",
+        help="Läs lognormala chocker ur en delad, minnesmappad bank i result/shockbank/.",
+    )
+    p.add_argument(
+        "--no-cache", action="store_true",
+        help="Räkna om alla steg i stället för att återanvända result/cache/pipeline/.",
+    )
+    p.add_argument(
+        "--profile", action="store_true",
+        help="Spara cProfile och tracemalloc-topp per steg till result/profile/.",
+    )
 
-    # 3) Tidig argumentvalidering: snabbare fel och tydligare felmeddelanden
+    return p
+
+
+def arg_errors(args: argparse.Namespace) -> list[str]:
+    """
+    Tidig argumentvalidering: snabbare fel och tydligare felmeddelanden.
+    Returnerar en lista med felmeddelanden (tom lista = OK).
+    """
     errs = []
     if not Path(args.positions).is_file():
         errs.append(f"--positions saknas: {args.positions}")
     if not Path(args.transactions).is_file():
         errs.append(f"--transactions saknas: {args.transactions}")
-    if args.goal <= 0:
-        errs.append("--goal måste vara > 0")
-    if args.paths < 100:
-        errs.append("--paths måste vara ≥ 100")
-    if args.vol < 0:
-        errs.append("--vol måste vara ≥ 0")
-    if not (0.0 <= args.cagr <= 1.0):
-        errs.append("--cagr måste ligga i [0,1]")
-    if args.maxhorisont < 1:
-        errs.append("--maxhorisont måste vara ≥ 1")
+    if args.assumptions is not None and not Path(args.assumptions).is_file():
+        errs.append(f"--assumptions saknas: {args.assumptions}")
+    elif args.assumptions is not None and Path(args.assumptions).suffix.lower() == ".toml":
+        from moneygoal.io.tomlfile import toml_available
 
-    if errs:
-        # Samlad utskrift till stderr för enkel CLI-felsökning
-        for e in errs:
-            print(f"ARGERROR: {e}", file=sys.stderr)
-        return 2
+        if not toml_available():
+            errs.append("--assumptions: TOML kräver Python 3.11+ eller paketet tomli (använd annars .json)")
+    if args.rebalance < 0:
+        errs.append("--rebalance måste vara ≥ 0")
+    if args.returns is not None and not Path(args.returns).is_file():
+        errs.append(f"--returns saknas: {args.returns}")
+    if args.returns is not None and args.assumptions is not None:
+        errs.append("--returns och --assumptions kan inte kombineras")
+    if args.block < 1:
+        errs.append("--block måste vara ≥ 1")
+    if args.model != "lognormal" and (args.returns is not None or args.assumptions is not None):
+        errs.append("--model kan inte kombineras med --returns/--assumptions")
+    if args.step != "month" and (
+        args.model != "lognormal" or args.returns is not None or args.assumptions is not None or args.compact
+    ):
+        errs.append("--step quarter/year kräver lognormal-modellen utan --returns/--assumptions/--compact")
+    if args.model == "student-t" and args.df <= 2:
+        errs.append("--df måste vara > 2")
+    if args.model == "regime":
+        if not (0.0 <= args.p_bear <= 1.0 and 0.0 <= args.p_recover <= 1.0):
+            errs.append("--p-bear och --p-recover måste ligga i [0,1]")
+        elif args.p_bear + args.p_recover == 0:
+            errs.append("--p-bear och --p-recover kan inte båda vara 0")
+        if args.bear_cagr <= -1.0 or args.bear_vol < 0:
+            errs.append("--bear-cagr måste vara > -1 och --bear-vol ≥ 0")
+    errs += param_errors(args.goal, args.paths, args.vol, args.cagr, args.maxhorisont)
+    return errs
 
-    # 4) Grundläggande fil-loggning: fångar körningar och parametrar
-    Path("logs").mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename="logs/app.log",
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(message)s",
-    )
-    logging.info("Run start")
-    logging.info(f"positions={args.positions}")
-    logging.info(f"transactions={args.transactions}")
-    logging.info(f"goal={args.goal}")
-    logging.info(
-        f"paths={args.paths} vol={args.vol} cagr={args.cagr} seed={args.seed} maxhorisont={args.maxhorisont}"
-    )
+
+def pipeline_params(args: argparse.Namespace) -> dict:
+    """Pipelinens indata för en körning: filerna (hashas på innehåll) + flaggorna."""
+    shocks = None
+    if args.shock_bank:
+        from moneygoal.sim.shockbank import ShockStore
+
+        shocks = ShockStore()
+    return {
+        "positions": Path(args.positions),
+        "transactions": Path(args.transactions),
+        "asof": dt.date.today().isoformat(),
+        "goal": args.goal,
+        "cagr": args.cagr,
+        "vol": args.vol,
+        "paths": args.paths,
+        "seed": args.seed,
+        "maxhorisont": args.maxhorisont,
+        "model": args.model,
+        "df": args.df,
+        "bear_cagr": args.bear_cagr,
+        "bear_vol": args.bear_vol,
+        "p_bear": args.p_bear,
+        "p_recover": args.p_recover,
+        "returns": None if args.returns is None else Path(args.returns),
+        "block": args.block,
+        "bootstrap": args.bootstrap,
+        "assumptions": None if args.assumptions is None else Path(args.assumptions),
+        "rebalance": args.rebalance,
+        "compact": args.compact,
+        "step": args.step,
+        "dividends": args.dividends,
+        "xirr_monthly": args.xirr_monthly,
+        "_shocks": shocks,
+    }
+
+
+def run_once(args: argparse.Namespace, pipe, stage: str = "run") -> int:
+    """
+    En körning av kedjan på `pipe` (moneygoal.pipeline.Pipeline): validera,
+    räkna, skriv rapport och diagnostics. Returnerar exit-kod (0/1).
+    `stage` hamnar i diagnostics-raden (run, watch, …).
+    """
+    from moneygoal.instrument import Instrument
+
+    # Stegtider och räknare; --profile lägger till cProfile + tracemalloc per steg
+    inst = Instrument(profile=args.profile)
 
     try:
-        # 5) Läs in och normalisera CSV via IO-lagret (se avanza_csv)
-        df_pos = read_positions(args.positions)
-        df_trx = read_transactions(args.transactions)
+        # 5) Pipeline (moneygoal.pipeline): steg med deklarerade indata, memoiserade
+        #    på fingeravtryck (se main); bara steg vars indata ändrats körs.
+        params = pipeline_params(args)
 
-        # 6) Nuvärde: summan av Marknadsvärde över alla tillgångar
-        V0 = float(df_pos["Marknadsvärde"].sum())
+        # 6) Validera hela datakontraktet innan något räknas
+        #    (alla felaktiga rader rapporteras på en gång, se io/contract.py)
+        report = pipe.run(["validate"], params, inst)["validate"]
+        inst.count("contract_errors", report.n_errors)
+        inst.count("contract_warnings", report.n_warnings)
+        if not report.ok:
+            for line in report.summary_lines():
+                print(f"DATAERROR: {line}", file=sys.stderr)
+            for i in report.issues:
+                if i.severity == "error":
+                    where = f"rad {i.row}" if i.row is not None else "fil"
+                    print(f"  {i.source} {where} {i.column}={i.value!r}: {i.rule}", file=sys.stderr)
+            if report.truncated:
+                print(f"  (visar högst {report.max_per_rule} rader per regel)", file=sys.stderr)
+            logging.error("Datakontrakt", extra={"contract": report.summary_lines()})
+            return 1
+        for line in report.summary_lines():
+            print(line, file=sys.stderr)  # endast varningar kvar här
 
-        # 7) Månadsspar: bygg rena rader för insättning/uttag och ta månatligt medel
-        rows = prepare_contribution_rows(df_trx)
-        mmc = mean_monthly_contribution(rows)
+        # 7) Resten av kedjan: normalisering → V0, månadsspar, XIRR → Monte Carlo
+        #    → rapport. Bara steg vars indata ändrats körs.
+        run = pipe.run(["V0", "contrib", "mc", "report", "xirr"], params, inst)
+        V0, mmc, mc = run["V0"], run["contrib"], run["mc"]
         logging.info(f"mean_monthly_contrib={mmc}")
+        logging.info(f"pipeline computed={run.computed} reused={run.reused}")
+        inst.rate("mc_paths_per_s", "mc_paths", "mc")
 
-        # 8) Monte Carlo-simulering av tid till mål
-        #    Input: nuvärde, genomsnittligt månadsspar, CAGR, vol, maxmånader, paths, mål
-        mc = time_to_goal_mc(
-            nuvarde=V0,
-            mean_monthly_contrib=mmc,
-            cagr=args.cagr,
-            vol=args.vol,
-            max_months=args.maxhorisont,
-            paths=args.paths,
-            goal=args.goal,
-            seed=args.seed,
-        )
-
-        # 9) Skriv en kompakt CSV-rapport med P10/P50/P90 i år och månader
-        def y_m(m: int) -> tuple[int, int]:
-            # Hjälpare: konvertera månader → (år, månader)
-            return m // 12, m % 12
-
-        p10y, p10m = y_m(mc["p10"])
-        p50y, p50m = y_m(mc["p50"])
-        p90y, p90m = y_m(mc["p90"])
-
-        out = pd.DataFrame(
-            {
-                "percentile": ["P10", "P50", "P90"],
-                "years": [p10y, p50y, p90y],
-                "months": [p10m, p50m, p90m],
-            }
-        )
+        # 8) Skriv en kompakt CSV-rapport med P10/P50/P90 i år och månader
         Path(args.report).parent.mkdir(parents=True, exist_ok=True)
-        out.to_csv(args.report, index=False, encoding="utf-8")
+        run["report"].to_csv(args.report, index=False, encoding="utf-8")
 
-        # 10) Konsolutskrift: snabb mänsklig läsning i terminalen
+        # 9) Konsolutskrift: snabb mänsklig läsning i terminalen
         def fmt(m: int) -> str:
             return f"{m//12} år {m%12} mån"
 
@@ -132,11 +254,11 @@ def main(argv=None) -> int:
             f"P90: {fmt(mc['p90'])}"
         )
 
-        # 11) Diagnostics: skriv sammanfattning + XIRR till result/diagnostics.csv
+        # 10) Diagnostics: skriv sammanfattning + XIRR till result/diagnostics.csv
         #     - Append-läge med header endast när filen skapas eller är tom.
         diag = {
-            "asof": dt.date.today().isoformat(),
-            "stage": "run",
+            "asof": params["asof"],
+            "stage": stage,
             "V0": V0,
             "goal": args.goal,
             "mean_monthly_contrib": mmc,
@@ -151,31 +273,98 @@ def main(argv=None) -> int:
             "positions_path": args.positions,
             "transactions_path": args.transactions,
         }
-        # diagnostics_dict kan räkna t.ex. XIRR baserat på df_trx/df_pos
-        diag.update(diagnostics_dict(df_trx, df_pos))  # t.ex. {"xirr": ...}
-
-        diag_path = Path("result/diagnostics.csv")
-        diag_path.parent.mkdir(parents=True, exist_ok=True)
-        exists = diag_path.exists()
-        write_header = (not exists) or (diag_path.stat().st_size == 0)
-        pd.DataFrame([diag]).to_csv(
-            diag_path,
-            mode="a" if exists else "w",
-            header=write_header,
-            index=False,
-            encoding="utf-8",
-        )
+        if args.assumptions is not None:
+            diag.update(assumptions_path=args.assumptions, rebalance_months=args.rebalance)
+        if args.returns is not None:
+            diag.update(returns_path=args.returns, bootstrap=f"{args.bootstrap}:{args.block}")
+        if args.model != "lognormal":
+            diag["model"] = args.model
+        if args.dividends != "reinvest":
+            diag["dividends"] = args.dividends
+        if args.step != "month":
+            diag["step"] = args.step
+        diag.update(run["xirr"])  # t.ex. {"xirr": ...}
+
+        # Stegtider och räknare hamnar som extra kolumner i diagnostics-raden
+        diag.update(inst.diag_fields())
+        from moneygoal.diagnostics import append_diagnostics
+        append_diagnostics(diag, "result/diagnostics.csv")
+
+        # Strukturerad JSON-post med stegtider, räknare och ev. minnestoppar
+        logging.info("stages", extra=inst.to_record())
+        inst.write_profiles("result/profile")
 
         logging.info("Run OK")
         return 0
 
     except Exception as e:
-        # 12) Robust felhantering: logga stacktrace och skriv kort fel till stderr
+        # 11) Robust felhantering: logga stacktrace och skriv kort fel till stderr
         logging.exception("Run failed")
         print(f"ERROR: {e}", file=sys.stderr)
         return 1
 
 
+def main(argv=None) -> int:
+    """
+    Pedagogik: Detta är CLI-ingången som
+      1) läser in positions/transactions,
+      2) beräknar nuvärde och genomsnittligt månadsspar,
+      3) kör Monte Carlo för tid till mål (P10/P50/P90),
+      4) skriver rapport och diagnostics,
+      5) loggar utfallet och returnerar exit-kod.
+    Steg 1–3 körs som memoiserade steg i moneygoal.pipeline (samma kedja som
+    appen); steg vars indata inte ändrats sedan förra körningen återanvänds.
+
+    Return:
+        0  → OK
+        1  → Körtidsfel (fångat undantag)
+        2  → Argumentfel (tidig validering)
+
+    Underkommandon (första argumentet):
+        batch  → många scenarier mot samma CSV:er (se moneygoal.batch)
+        fleet  → många kunders portföljer i ett jobb (se moneygoal.fleet)
+        serve  → lokal JSON-server med varma data (se moneygoal.server)
+        solve  → krävt månadsspar/CAGR för mål före deadline (se moneygoal.solve)
+        watch  → räkna om stegvis när nya exporter landar (se moneygoal.watch)
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] in SUBCOMMANDS:
+        import importlib
+        return importlib.import_module(SUBCOMMANDS[argv[0]]).main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+    errs = arg_errors(args)
+
+    if errs:
+        # Samlad utskrift till stderr för enkel CLI-felsökning
+        for e in errs:
+            print(f"ARGERROR: {e}", file=sys.stderr)
+        return 2
+
+    # 4) Fil-loggning: JSON-rader, rotation 5 MB × 3, I/O i bakgrundstråd (logsetup)
+    #    Från och med här är argumenten giltiga; först nu importeras resten.
+    from moneygoal.logsetup import setup_logging, new_run_id
+
+    setup_logging("logs/app.log")
+    new_run_id()
+    logging.info("Run start")
+    logging.info(f"positions={args.positions}")
+    logging.info(f"transactions={args.transactions}")
+    logging.info(f"goal={args.goal}")
+    logging.info(
+        f"paths={args.paths} vol={args.vol} cagr={args.cagr} seed={args.seed} maxhorisont={args.maxhorisont}"
+    )
+
+    # Pipeline: filerna hashas på innehåll; oförändrade filer och parametrar ⇒
+    # stegen hämtas ur result/cache/pipeline/ i stället för att räknas om
+    # (ändrat --goal kör bara om mc och report). --profile och --no-cache
+    # räknar alltid allt.
+    from moneygoal.pipeline import CACHE_DIR, default_pipeline
+
+    pipe = default_pipeline(None if (args.no_cache or args.profile) else CACHE_DIR)
+    return run_once(args, pipe)
+
+
 if __name__ == "__main__":
     # Standardmönster för CLI-moduler
     sys.exit(main())
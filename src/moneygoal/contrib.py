@@ -3,16 +3,17 @@
 # definierat som insättningar (+) och uttag (−), per månad.
 # Flöde:
 #   1) prepare_contribution_rows: filtrerar transaktioner till
-#      Insättning/Uttag, sätter tecken och skapar månadskolumn.
+#      Insättning/Uttag, sätter tecken och skapar månadskolumn
+#      (via kassaflödesliggaren, moneygoal.ledger).
 #   2) monthly_net_contributions: summerar netto per månad.
 #   3) mean_monthly_contribution: tar medelvärde av månadssummorna.
 # ---------------------------------------------------------------
 
 import pandas as pd
 
-CONTRIB_TYPES = {"Insättning", "Uttag"}
+CONTRIB_TYPES = {"Insättning", "Uttag"}  # kategorierna contribution/withdrawal i moneygoal.ledger
 
-def prepare_contribution_rows(df_trx: pd.DataFrame) -> pd.DataFrame:
+def prepare_contribution_rows(df_trx: pd.DataFrame, dividends: str = "reinvest") -> pd.DataFrame:
     
     """
     Filtrera till Insättning/Uttag, skapa teckensatt belopp och månadsnyckel.
@@ -34,36 +35,25 @@ def prepare_contribution_rows(df_trx: pd.DataFrame) -> pd.DataFrame:
             - "Månad": "YYYY-MM" (sträng, enkel att gruppera på)
             - "Typ":   str
             - "Belopp_signed": float (Insättning +, Uttag -)
-        Endast rader där Typ ∈ {"Insättning","Uttag"}.
+        Endast rader där Typ ∈ {"Insättning","Uttag"} (dividends="cash":
+        även Utdelning, som uttag).
+
+    Klassning, tecken och månadsnyckel görs av kassaflödesliggaren
+    (moneygoal.ledger); har du redan en liggare, använd
+    ledger.contribution_rows direkt.
     """
-    # 1) Tom indata: returnera tom struktur med rätt kolumner och dtypes.
+    from moneygoal.ledger import build_ledger, contribution_rows
+
+    # 1) Tom indata: samma kolumner och dtypes som contribution_rows (Månad som "YYYY-MM"-sträng).
     if df_trx.empty:
-        return df_trx.head(0).assign(Belopp_signed=pd.Series(dtype=float), Månad=pd.Series(dtype="period[M]"))
-    
-    # 2) Säkerställ obligatoriska kolumner finns.
-    req = {"Datum","Typ","Belopp"}
-    missing = req - set(df_trx.columns)
-    if missing:
-        raise KeyError(f"Saknar kolumner: {sorted(missing)}")
-
-    # 3) Filtrera till endast Insättning/Uttag.
-    out = df_trx[df_trx["Typ"].isin(CONTRIB_TYPES)].copy()
-
-    # 4) Tvinga korrekta typer. Felaktiga format ger tidiga, tydliga fel.
-    out["Datum"] = pd.to_datetime(out["Datum"])
-    out["Belopp"] = out["Belopp"].astype(float)
-
-    # 5) Sätt entydigt tecken:
-    #    - Insättning → +|Belopp|
-    #    - Uttag      → -|Belopp|
-    sign = out["Typ"].map(lambda t: 1.0 if t == "Insättning" else -1.0)
-    out["Belopp_signed"] = sign * out["Belopp"].abs()
-
-    # 6) Skapa månadsnyckel som "YYYY-MM" för enkel gruppering.
-    out["Månad"] = out["Datum"].dt.to_period("M").astype(str)
-
-    # 7) Returnera en smal, ren tabell med bara det som behövs framåt.
-    return out[["Datum","Månad","Typ","Belopp_signed"]]
+        return pd.DataFrame({
+            "Datum": pd.Series(dtype="datetime64[ns]"), "Månad": pd.Series(dtype=str),
+            "Typ": pd.Series(dtype=str), "Belopp_signed": pd.Series(dtype=float),
+        })
+
+    # 2) Ett svep: klassa, typa och teckensätt alla rader (KeyError om kolumner saknas).
+    # 3) Välj Insättning/Uttag (och ev. utdelningar) ur liggaren.
+    return contribution_rows(build_ledger(df_trx), dividends)
 
 def monthly_net_contributions(rows: pd.DataFrame) -> pd.Series:
     """
@@ -1,8 +1,25 @@
 import datetime as dt
+from pathlib import Path
+from typing import Optional
 import pandas as pd
 from moneygoal.models.mwrr import xirr
 
-def compute_xirr_from_frames(df_trx: pd.DataFrame, df_pos: pd.DataFrame) -> float:
+# Stabil kolumnordning för result/diagnostics.csv. Nya kolumner (t.ex. stegtider)
+# läggs efter dessa i den ordning de först dyker upp.
+DIAG_COLUMNS = [
+    "asof", "stage", "V0", "goal", "mean_monthly_contrib",
+    "paths", "vol", "cagr", "seed", "maxhorisont",
+    "p10_months", "p50_months", "p90_months", "xirr",
+    "positions_path", "transactions_path",
+]
+
+def compute_xirr_from_frames(
+    df_trx: pd.DataFrame,
+    df_pos: pd.DataFrame,
+    stats: Optional[dict] = None,
+    asof: Optional[dt.date] = None,
+    dividends: str = "reinvest",
+) -> float:
     """
     Beräkna XIRR från två DataFrames:
       - df_trx: transaktioner (minst kolumnerna "Datum", "Typ", "Belopp")
@@ -17,39 +34,92 @@ def compute_xirr_from_frames(df_trx: pd.DataFrame, df_pos: pd.DataFrame) -> floa
        Detta följer vanlig XIRR-konvention där startinsats är negativ och slutvärde positivt.
     3) Lägg till ett avslutande kassaflöde på dagens datum motsvarande nuvärdet
        (summa av Marknadsvärde). Detta representerar "försäljning idag".
+    Steg 1–2 görs av kassaflödesliggaren (moneygoal.ledger); med
+    dividends="cash" räknas även utdelningar som positiva flöden.
 
     Skydd:
     - Kräver minst ett negativt och ett positivt flöde, annars kastas ValueError.
+
+    `stats` skickas vidare till xirr (iterationer, NPV-anrop) för instrumentering.
+    `asof` är slutflödets datum (default: idag).
     """
-    # 1) Ta bara insättningar/uttag
-    df = df_trx[df_trx["Typ"].isin(["Insättning", "Uttag"])].copy()
+    from moneygoal.ledger import build_ledger
 
-    # 2) Normalisera tal och bygg tecken:
-    #    - Belopp kan vara formaterat som text → gör numeriskt
-    amt = pd.to_numeric(df["Belopp"]).abs()
-    #    - Mappa transaktionstyp till tecken enligt XIRR-konventionen
-    sign = df["Typ"].map({"Insättning": -1.0, "Uttag": 1.0})
+    ending_value = float(pd.to_numeric(df_pos["Marknadsvärde"]).sum())
+    return compute_xirr_from_ledger(build_ledger(df_trx), ending_value, stats=stats, asof=asof, dividends=dividends)
 
-    # 3) Bygg kassaflödeslista (datum, belopp)
-    amounts = (sign.values * amt.values).tolist()
-    dates = pd.to_datetime(df["Datum"]).dt.date.tolist()
-    cfs = list(zip(dates, amounts))
 
-    # 4) Lägg till nuvärdet som slutflöde idag
-    ending_value = float(pd.to_numeric(df_pos["Marknadsvärde"]).sum())
-    cfs.append((dt.date.today(), ending_value))
+def compute_xirr_from_ledger(
+    ledger: pd.DataFrame,
+    ending_value: float,
+    stats: Optional[dict] = None,
+    asof: Optional[dt.date] = None,
+    dividends: str = "reinvest",
+    compress: Optional[str] = None,
+) -> float:
+    """
+    XIRR direkt ur en kassaflödesliggare (moneygoal.ledger.build_ledger) och V0.
+    Flöden samma dag nettas alltid; compress="month" löser på månadsflöden
+    och lägger felgränsen mot exakt XIRR i stats["error_bound"].
+    """
+    from moneygoal.ledger import xirr_flows
+
+    cfs = xirr_flows(ledger, ending_value, asof or dt.date.today(), dividends)
 
-    # 5) Grundkrav: minst ett negativt och ett positivt flöde
+    # Grundkrav: minst ett negativt och ett positivt flöde
     if not (any(a < 0 for _, a in cfs) and any(a > 0 for _, a in cfs)):
         raise ValueError("xirr kräver både negativa och positiva flöden")
+    return xirr(cfs, stats=stats, compress=compress)
 
-    # 6) Beräkna XIRR
-    return xirr(cfs)
 
-
-def diagnostics_dict(df_trx: pd.DataFrame, df_pos: pd.DataFrame) -> dict:
+def diagnostics_dict(
+    df_trx: pd.DataFrame,
+    df_pos: pd.DataFrame,
+    stats: Optional[dict] = None,
+    asof: Optional[dt.date] = None,
+    dividends: str = "reinvest",
+) -> dict:
     """
     Packa utvalda diagnosmått i en dict.
     Just nu endast XIRR, men utbyggbart med fler nycklar senare.
     """
-    return {"xirr": compute_xirr_from_frames(df_trx, df_pos)}
+    return {"xirr": compute_xirr_from_frames(df_trx, df_pos, stats=stats, asof=asof, dividends=dividends)}
+
+
+def append_diagnostics(
+    row: dict | list[dict], path: str | Path = "result/diagnostics.csv"
+) -> None:
+    """
+    Lägg till en rad (eller flera, t.ex. från batch-läget) i diagnostics.csv
+    med stabil kolumnordning.
+
+    Steg:
+    1. Ny/tom fil: skriv header i DIAG_COLUMNS-ordning (+ ev. extra kolumner).
+    2. Befintlig fil vars header redan täcker radens nycklar: append i headerns
+       ordning (billigt, läser bara första raden).
+    3. Raderna har nya kolumner (t.ex. stegtider från --profile): skriv om filen
+       med unionen av kolumner så att äldre rader får tomma celler.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new = pd.DataFrame(row if isinstance(row, list) else [row])
+
+    if not path.exists() or path.stat().st_size == 0:
+        present = [c for c in DIAG_COLUMNS if c in new.columns]
+        rest = [c for c in new.columns if c not in present]
+        new.reindex(columns=present + rest).to_csv(path, index=False, encoding="utf-8")
+        return
+
+    with path.open("r", encoding="utf-8") as fh:
+        header = fh.readline().rstrip("\r\n").split(",")
+
+    if set(new.columns) <= set(header):
+        new.reindex(columns=header).to_csv(
+            path, mode="a", header=False, index=False, encoding="utf-8"
+        )
+        return
+
+    old = pd.read_csv(path)
+    merged = pd.concat([old, new], ignore_index=True)
+    rest = [c for c in merged.columns if c not in header]
+    merged.reindex(columns=header + rest).to_csv(path, index=False, encoding="utf-8")
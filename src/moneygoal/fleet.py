@@ -0,0 +1,405 @@
+# -------------------------------------------------------------------
+# Fleet-läge: tid till mål och XIRR för många kunders portföljer i ett jobb.
+# Tanken är att:
+#   - hitta kundkataloger under en rotkatalog: varje katalog som innehåller
+#     en positions- och en transactions-export är en kund (id = relativ
+#     sökväg; flera exporter ⇒ senast ändrade används),
+#   - överlappa fil-I/O med beräkning: en trådpool läser filernas bytes
+#     (I/O släpper GIL) och lämnar dem till en processpool så fort de är
+#     lästa; antalet kunder "i luften" är begränsat (max_inflight) så att
+#     minnet inte växer med antal kunder,
+#   - arbetarna är långlivade processer (ingen interpretatorstart per kund)
+#     och får bara bytes + skalära parametrar; de validerar datakontraktet,
+#     normaliserar, bygger kassaflödesliggaren och räknar V0, månadsspar,
+#     XIRR och Monte Carlo,
+#   - fel isoleras per kund: en trasig export ger en rad med `error` men
+#     fäller inte jobbet,
+#   - skriva EN samlad rapport (CSV eller Parquet) med en rad per kund,
+#     inklusive kundens diagnostics (V0, månadsspar, XIRR, antal rader,
+#     varningar, beräkningstid).
+# Med --shock-bank delar alla arbetare samma minnesmappade chocker
+# (sim/shockbank.py): samma seed/horisont/paths för alla kunder ⇒ en fil.
+#
+# Körning:
+#   moneygoal fleet --root kunder/ --goal 1000000 --report result/fleet.csv \
+#       [--goals mal.csv] [--workers 8] [--io-threads 8] [--shock-bank]
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as dt
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+__all__ = ["Client", "discover_clients", "read_goals", "run_fleet", "main"]
+
+POSITIONS_GLOB = "*positions*.csv"
+TRANSACTIONS_GLOB = "*transactions*.csv"
+DEFAULT_IO_THREADS = 8
+
+REPORT_COLUMNS = [
+    "client", "goal", "V0", "mean_monthly_contrib", "xirr", "xirr_error_bound",
+    "p10_months", "p50_months", "p90_months",
+    "rows_positions", "rows_transactions", "n_warnings", "t_client_s",
+    "positions_path", "transactions_path", "error",
+]
+
+
+@dataclass(frozen=True)
+class Client:
+    """En kund: id (relativ katalog) och exporterna (None om filen saknas)."""
+
+    id: str
+    positions: Optional[Path]
+    transactions: Optional[Path]
+
+
+def _newest(paths) -> Optional[Path]:
+    files = [p for p in paths if p.is_file()]
+    return max(files, key=lambda p: p.stat().st_mtime_ns) if files else None
+
+
+def discover_clients(
+    root: str | Path,
+    positions_glob: str = POSITIONS_GLOB,
+    transactions_glob: str = TRANSACTIONS_GLOB,
+) -> List[Client]:
+    """
+    Alla kataloger under `root` (rekursivt, inklusive root) som innehåller
+    minst en fil som matchar något av mönstren, sorterade på id.
+    En katalog med bara den ena exporten blir en kund med None för den andra.
+    """
+    root = Path(root)
+    dirs = {p.parent for g in (positions_glob, transactions_glob) for p in root.rglob(g) if p.is_file()}
+    out = []
+    for d in sorted(dirs):
+        out.append(Client(
+            id=d.relative_to(root).as_posix(),
+            positions=_newest(d.glob(positions_glob)),
+            transactions=_newest(d.glob(transactions_glob)),
+        ))
+    return out
+
+
+def read_goals(path: str | Path) -> Dict[str, float]:
+    """
+    Mål per kund ur en CSV med kolumnerna `client` och `goal`
+    (separator `,` eller `;`). Kunder som saknas får --goal.
+    """
+    text = Path(path).read_text(encoding="utf-8-sig")
+    lines = text.splitlines()
+    if not lines:
+        return {}
+    sep = ";" if lines[0].count(";") > lines[0].count(",") else ","
+    goals = {}
+    for i, row in enumerate(csv.DictReader(lines, delimiter=sep), start=2):
+        row = {str(k).strip().lower(): (v or "").strip() for k, v in row.items()}
+        if "client" not in row or "goal" not in row:
+            raise KeyError("målfilen behöver kolumnerna client och goal")
+        try:
+            goals[row["client"]] = float(row["goal"].replace(" ", "").replace(",", "."))
+        except ValueError:
+            raise ValueError(f"rad {i}: ogiltigt mål {row['goal']!r}") from None
+    return goals
+
+
+def _failure(client: Client, goal: Optional[float], msg: str) -> dict:
+    return {
+        "client": client.id, "goal": goal,
+        "positions_path": str(client.positions or ""), "transactions_path": str(client.transactions or ""),
+        "error": msg,
+    }
+
+
+def _read_client(client: Client) -> tuple:
+    """I/O-steget (körs i trådpoolen): bara bytes, ingen tolkning."""
+    return client.positions.read_bytes(), client.transactions.read_bytes()
+
+
+def _run_client(job: tuple) -> dict:
+    """
+    Arbetarfunktion (körs i processpoolen). Tar bytes och skalärer och
+    returnerar en rapportrad; alla fel fångas och hamnar i `error`.
+
+    Steg:
+    1. Läs bytes rått och validera datakontraktet (fel ⇒ error, varningar räknas).
+    2. Normalisera, bygg kassaflödesliggaren, V0 och snitt månadsspar.
+    3. XIRR (om den inte går att lösa blir den tom; kunden fälls inte).
+    4. Monte Carlo för tid till mål.
+    """
+    client, goal, pos_bytes, trx_bytes, params, shocks = job
+    t0 = time.perf_counter()
+    out = _failure(client, goal, "")
+    try:
+        from moneygoal.contrib import mean_monthly_contribution
+        from moneygoal.diagnostics import compute_xirr_from_ledger
+        from moneygoal.io.avanza_csv import normalize_positions, normalize_transactions, read_raw
+        from moneygoal.io.contract import ContractReport, validate_positions, validate_transactions
+        from moneygoal.ledger import build_ledger, contribution_rows
+        from moneygoal.sim.coarse import STEP_MONTHS
+        from moneygoal.sim.monte_carlo import time_to_goal_mc
+
+        raw_pos, raw_trx = read_raw(io.BytesIO(pos_bytes)), read_raw(io.BytesIO(trx_bytes))
+        report = ContractReport(max_per_rule=1)
+        validate_positions(raw_pos, report)
+        validate_transactions(raw_trx, report)
+        out["n_warnings"] = report.n_warnings
+        if not report.ok:
+            errors = [line for line in report.summary_lines() if line.startswith("ERROR")]
+            raise ValueError("datakontrakt: " + "; ".join(errors[:3]))
+
+        df_pos = normalize_positions(raw_pos)
+        ledger = build_ledger(normalize_transactions(raw_trx))
+        V0 = float(df_pos["Marknadsvärde"].sum())
+        mmc = float(mean_monthly_contribution(contribution_rows(ledger, params["dividends"])))
+        out.update(V0=V0, mean_monthly_contrib=mmc, rows_positions=len(raw_pos), rows_transactions=len(raw_trx))
+        try:
+            stats: dict = {}
+            out["xirr"] = compute_xirr_from_ledger(
+                ledger, V0, stats, asof=dt.date.fromisoformat(params["asof"]), dividends=params["dividends"],
+                compress="month" if params["xirr_monthly"] else None,
+            )
+            out["xirr_error_bound"] = stats.get("error_bound")  # bara med --xirr-monthly
+        except ValueError:
+            out["xirr"] = None
+
+        mc = time_to_goal_mc(
+            V0, mmc, params["cagr"], params["vol"], params["maxhorisont"], params["paths"],
+            goal, params["seed"], shocks=shocks, step=STEP_MONTHS[params.get("step", "month")],
+        )
+        out.update(p10_months=mc["p10"], p50_months=mc["p50"], p90_months=mc["p90"])
+    except Exception as e:  # en trasig kund ska inte fälla hela jobbet
+        out["error"] = f"{type(e).__name__}: {e}"
+    out["t_client_s"] = round(time.perf_counter() - t0, 6)
+    return out
+
+
+def run_fleet(
+    clients: Sequence[Client],
+    params: dict,
+    goals: Optional[Dict[str, float]] = None,
+    workers: Optional[int] = None,
+    io_threads: int = DEFAULT_IO_THREADS,
+    max_inflight: Optional[int] = None,
+    shocks=None,
+) -> List[dict]:
+    """
+    Kör alla kunder och returnera rader i samma ordning som `clients`.
+
+    params:   goal, cagr, vol, paths, seed, maxhorisont, dividends,
+              xirr_monthly, asof, step (som CLI:ns flaggor; goal kan vara None
+              om alla kunder har mål i `goals`).
+    workers:  None → os.cpu_count(); 1 → allt i aktuell process.
+    max_inflight: högst så många kunder lästa men ej färdigräknade
+              (default 4 × workers).
+    """
+    goals = goals or {}
+    results: List[Optional[dict]] = [None] * len(clients)
+    jobs = []
+    for i, c in enumerate(clients):
+        goal = goals.get(c.id, params.get("goal"))
+        if c.positions is None or c.transactions is None:
+            which = "positions" if c.positions is None else "transactions"
+            results[i] = _failure(c, goal, f"saknar {which}-fil")
+        elif goal is None or goal <= 0:
+            results[i] = _failure(c, goal, "saknar mål (> 0)")
+        else:
+            jobs.append((i, c, goal))
+    if shocks is not None and jobs:
+        from moneygoal.sim.engine import DEFAULT_CHUNK
+
+        shocks.get(params["seed"], params["maxhorisont"], params["paths"],
+                   block=min(DEFAULT_CHUNK, params["paths"]))
+
+    n = workers or os.cpu_count() or 1
+    if n <= 1:
+        for i, c, goal in jobs:
+            try:
+                pos_b, trx_b = _read_client(c)
+            except OSError as e:
+                results[i] = _failure(c, goal, f"läsfel: {e}")
+                continue
+            results[i] = _run_client((c, goal, pos_b, trx_b, params, shocks))
+        return results
+
+    # Trådpool (I/O) → processpool (CPU). En semafor begränsar antalet
+    # kunder i luften: läsaren tar en plats, färdig beräkning lämnar den.
+    slots = threading.BoundedSemaphore(max_inflight or 4 * n)
+
+    def read(c: Client) -> tuple:
+        slots.acquire()
+        try:
+            return _read_client(c)
+        except BaseException:
+            slots.release()
+            raise
+
+    with ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="moneygoal-io") as io_pool, \
+            ProcessPoolExecutor(max_workers=n) as cpu_pool:
+        reads = {io_pool.submit(read, c): (i, c, goal) for i, c, goal in jobs}
+        computing: dict = {}
+        pending = set(reads)
+        while pending or computing:
+            done, _ = wait(pending | set(computing), return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in reads:
+                    pending.discard(fut)
+                    i, c, goal = reads.pop(fut)
+                    try:
+                        pos_b, trx_b = fut.result()
+                    except OSError as e:
+                        results[i] = _failure(c, goal, f"läsfel: {e}")
+                        continue
+                    computing[cpu_pool.submit(_run_client, (c, goal, pos_b, trx_b, params, shocks))] = (i, c, goal)
+                else:
+                    i, c, goal = computing.pop(fut)
+                    slots.release()
+                    try:
+                        results[i] = fut.result()
+                    except Exception as e:  # t.ex. en arbetare som dog
+                        results[i] = _failure(c, goal, f"{type(e).__name__}: {e}")
+    return results
+
+
+def _parquet_engine() -> Optional[str]:
+    import importlib.util
+
+    for name in ("pyarrow", "fastparquet"):
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return None
+
+
+def main(argv=None) -> int:
+    """
+    Fleet-ingång. Exit-koder som CLI:n: 0 OK (även om enskilda kunder
+    fallerar), 1 körfel, 2 argumentfel.
+    """
+    from moneygoal.cli import param_errors
+
+    p = argparse.ArgumentParser(
+        prog="moneygoal fleet",
+        description="Tid till mål och XIRR för alla kundkataloger under en rot.",
+    )
+    p.add_argument("--root", required=True, help="Rotkatalog med en underkatalog per kund.")
+    p.add_argument("--report", required=True, help="Samlad rapport, en rad per kund (.csv eller .parquet).")
+    p.add_argument("--goal", type=float, default=None, help="Målbelopp i SEK (för kunder utan rad i --goals).")
+    p.add_argument("--goals", default=None, help="CSV med kolumnerna client och goal.")
+    p.add_argument("--positions-glob", default=POSITIONS_GLOB, help=f"Mönster för positions (default {POSITIONS_GLOB}).")
+    p.add_argument("--transactions-glob", default=TRANSACTIONS_GLOB,
+                   help=f"Mönster för transactions (default {TRANSACTIONS_GLOB}).")
+    p.add_argument("--paths", type=int, default=5000, help="Antal simuleringar per kund.")
+    p.add_argument("--vol", type=float, default=0.15, help="Årsvolatilitet (std) som andel.")
+    p.add_argument("--cagr", type=float, default=0.06, help="Antagen årlig avkastning (CAGR), 0–1.")
+    p.add_argument("--seed", type=int, default=42, help="Slumptalsfrö (samma för alla kunder).")
+    p.add_argument("--maxhorisont", type=int, default=600, help="Max simlängd i månader.")
+    p.add_argument("--dividends", choices=["reinvest", "cash"], default="reinvest",
+                   help="Utdelningar: reinvest (default) eller cash.")
+    p.add_argument("--xirr-monthly", action="store_true", help="Lös XIRR på månadsvis komprimerade flöden.")
+    p.add_argument("--step", choices=["month", "quarter", "year"], default="month",
+                   help="Tidssteg: month (default) eller quarter/year med Brownian bridge-korrektion.")
+    p.add_argument("--workers", type=int, default=None, help="Antal processer (default: antal kärnor).")
+    p.add_argument("--io-threads", type=int, default=DEFAULT_IO_THREADS,
+                   help=f"Trådar för filläsning (default {DEFAULT_IO_THREADS}).")
+    p.add_argument("--shock-bank", action="store_true",
+                   help="Dela chocker mellan arbetarna via minnesmappade filer i result/shockbank/.")
+    args = p.parse_args(argv)
+
+    # 1) Tidig validering
+    errs = []
+    if not Path(args.root).is_dir():
+        errs.append(f"--root saknas: {args.root}")
+    if args.goals is not None and not Path(args.goals).is_file():
+        errs.append(f"--goals saknas: {args.goals}")
+    if args.goal is None and args.goals is None:
+        errs.append("ange --goal och/eller --goals")
+    if args.workers is not None and args.workers < 1:
+        errs.append("--workers måste vara ≥ 1")
+    if args.io_threads < 1:
+        errs.append("--io-threads måste vara ≥ 1")
+    suffix = Path(args.report).suffix.lower()
+    if suffix not in (".csv", ".parquet"):
+        errs.append("--report måste sluta på .csv eller .parquet")
+    elif suffix == ".parquet" and _parquet_engine() is None:
+        errs.append("--report .parquet kräver pyarrow eller fastparquet (använd .csv)")
+    errs += param_errors(args.goal if args.goal is not None else 1.0, args.paths, args.vol, args.cagr,
+                         args.maxhorisont)
+    goals: Dict[str, float] = {}
+    if not errs and args.goals is not None:
+        try:
+            goals = read_goals(args.goals)
+        except (KeyError, ValueError) as e:
+            errs.append(f"--goals: {e}")
+    clients: List[Client] = []
+    if not errs:
+        clients = discover_clients(args.root, args.positions_glob, args.transactions_glob)
+        if not clients:
+            errs.append(f"--root: inga kundkataloger med {args.positions_glob}/{args.transactions_glob}")
+    if errs:
+        for e in errs:
+            print(f"ARGERROR: {e}", file=sys.stderr)
+        return 2
+
+    import pandas as pd
+
+    from moneygoal.instrument import Instrument
+    from moneygoal.logsetup import new_run_id, setup_logging
+
+    setup_logging("logs/app.log")
+    new_run_id()
+    logging.info("Fleet start")
+    logging.info(f"root={args.root} clients={len(clients)} workers={args.workers} io_threads={args.io_threads}")
+    inst = Instrument()
+    params = {
+        "goal": args.goal, "cagr": args.cagr, "vol": args.vol, "paths": args.paths, "seed": args.seed,
+        "maxhorisont": args.maxhorisont, "dividends": args.dividends, "xirr_monthly": args.xirr_monthly,
+        "step": args.step, "asof": dt.date.today().isoformat(),
+    }
+
+    try:
+        shocks = None
+        if args.shock_bank:
+            from moneygoal.sim.shockbank import ShockStore
+
+            shocks = ShockStore()
+        # 2) Läs och räkna alla kunder (I/O överlappar beräkningen)
+        with inst.stage("fleet"):
+            results = run_fleet(clients, params, goals, workers=args.workers,
+                                io_threads=args.io_threads, shocks=shocks)
+        failed = [r for r in results if r["error"]]
+        inst.count("clients", len(results))
+        inst.count("clients_failed", len(failed))
+        inst.rate("clients_per_s", "clients", "fleet")
+
+        # 3) Samlad rapport: en rad per kund
+        df = pd.DataFrame(results).reindex(columns=REPORT_COLUMNS)
+        df.insert(1, "asof", params["asof"])
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        if suffix == ".parquet":
+            df.to_parquet(args.report, index=False, engine=_parquet_engine())
+        else:
+            df.to_csv(args.report, index=False, encoding="utf-8")
+
+        logging.info("stages", extra=inst.to_record())
+        logging.info(f"Fleet OK clients={len(results)} failed={len(failed)}")
+        print(f"{len(results)} kunder klara ({len(failed)} fel) → {args.report}")
+        return 0
+
+    except Exception as e:
+        logging.exception("Fleet failed")
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
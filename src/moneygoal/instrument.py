@@ -0,0 +1,171 @@
+# -------------------------------------------------------------------
+# Lättviktig instrumentering av pipelinens steg.
+# Tanken är att:
+#   - varje steg (CSV-läsning, bidrag, Monte Carlo, XIRR, skrivning)
+#     omsluts av `with inst.stage("namn"):` och får sin väggtid mätt,
+#   - räknare (t.ex. inlästa rader, XIRR-iterationer) samlas i samma objekt,
+#   - resultatet kan skrivas till diagnostics-raden och till en JSON-logg,
+#   - profil-läget (--profile) dessutom fångar cProfile och tracemalloc-topp
+#     per steg och skriver dem till result/profile/.
+# Avstängd instrumentering returnerar en delad no-op-kontext, så kostnaden
+# är ett attributuppslag och ett funktionsanrop per steg.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import contextlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+__all__ = ["Instrument", "NULL_INSTRUMENT"]
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _Stage:
+    """Kontexthanterare som mäter ett steg och (vid profilering) profilerar det."""
+
+    __slots__ = ("_inst", "_name", "_t0", "_prof")
+
+    def __init__(self, inst: "Instrument", name: str) -> None:
+        self._inst = inst
+        self._name = name
+        self._t0 = 0.0
+        self._prof = None
+
+    def __enter__(self) -> "_Stage":
+        if self._inst.profile:
+            import cProfile
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        dt_s = time.perf_counter() - self._t0
+        inst = self._inst
+        inst.timings[self._name] = inst.timings.get(self._name, 0.0) + dt_s
+        if self._prof is not None:
+            import tracemalloc
+
+            self._prof.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            inst.peaks[self._name] = max(inst.peaks.get(self._name, 0), peak)
+            inst._profiles[self._name] = self._prof
+        return False
+
+
+class Instrument:
+    """
+    Samlar stegtider, räknare och (valfritt) profildata för en körning.
+
+    Användning:
+        inst = Instrument()
+        with inst.stage("read"):
+            df = read_transactions(...)
+        inst.count("rows_transactions", len(df))
+        diag.update(inst.diag_fields())
+
+    Parametrar:
+        enabled: False ⇒ stage() och count() gör ingenting (no-op).
+        profile: True ⇒ cProfile + tracemalloc-topp per steg (implicerar enabled).
+    """
+
+    def __init__(self, enabled: bool = True, profile: bool = False) -> None:
+        self.enabled = bool(enabled or profile)
+        self.profile = bool(profile)
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.peaks: Dict[str, int] = {}
+        self.reused_timings: Dict[str, float] = {}
+        self._profiles: Dict[str, object] = {}
+
+    def stage(self, name: str):
+        """Returnera en kontexthanterare som mäter steget `name`."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Öka räknaren `name` med `value`."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def replay(self, stage: str, seconds: float, counters: Dict[str, float]) -> None:
+        """
+        Ett återanvänt (cachat) steg: lägg till räknarna som steget gav när
+        det räknades och spara dess dåvarande tid i reused_timings (blir
+        ingen t_<steg>_s-kolumn, men används av rate()).
+        """
+        if not self.enabled:
+            return
+        for k, v in counters.items():
+            self.count(k, v)
+        self.reused_timings[stage] = self.reused_timings.get(stage, 0.0) + seconds
+
+    def rate(self, name: str, counter: str, stage: str) -> None:
+        """
+        Härled en takt (per sekund) från en räknare och ett stegs tid,
+        t.ex. paths per sekund för Monte Carlo-steget. Är steget återanvänt
+        används tiden från när resultatet räknades.
+        """
+        if not self.enabled:
+            return
+        t = self.timings.get(stage) or self.reused_timings.get(stage, 0.0)
+        n = self.counters.get(counter, 0)
+        if t > 0:
+            self.counters[name] = n / t
+
+    def diag_fields(self) -> Dict[str, float]:
+        """
+        Platta ut mätvärden till diagnostics-kolumner:
+            t_<steg>_s         → sekunder per steg
+            <räknare>          → räknarvärden
+            peak_<steg>_bytes  → tracemalloc-topp (endast vid profilering)
+        """
+        out: Dict[str, float] = {}
+        for k, v in self.timings.items():
+            out[f"t_{k}_s"] = round(v, 6)
+        for k, v in self.counters.items():
+            out[k] = v
+        for k, v in self.peaks.items():
+            out[f"peak_{k}_bytes"] = v
+        return out
+
+    def to_record(self, **extra) -> Dict[str, object]:
+        """Strukturerad post för JSON-loggning."""
+        rec: Dict[str, object] = dict(extra)
+        rec["stages"] = {k: round(v, 6) for k, v in self.timings.items()}
+        rec["counters"] = dict(self.counters)
+        if self.peaks:
+            rec["peaks"] = dict(self.peaks)
+        return rec
+
+    def to_json(self, **extra) -> str:
+        return json.dumps(self.to_record(**extra), ensure_ascii=False, default=str)
+
+    def write_profiles(self, out_dir: str | Path = "result/profile") -> Optional[Path]:
+        """
+        Skriv cProfile-data per steg (<steg>.prof, läsbar med pstats/snakeviz)
+        och en summary.json med tider och minnestoppar. Gör inget utan profil-läge.
+        """
+        if not self.profile:
+            return None
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        for name, prof in self._profiles.items():
+            prof.dump_stats(str(out / f"{name}.prof"))
+        summary = out / "summary.json"
+        summary.write_text(self.to_json(), encoding="utf-8")
+        return summary
+
+
+# Delad avstängd instans för anrop utan instrumentering.
+NULL_INSTRUMENT = Instrument(enabled=False)
@@ -5,9 +5,12 @@
 #   - först läsa in all data som strängar,
 #   - sedan konvertera till rätt datatyper (tal och datum),
 #   - samt säkerställa att de kolumner vi förväntar oss finns.
+# Tolkningen av tal och datum görs vektoriserat per kolumn (se
+# io/contract.py); hela kontraktet kan valideras innan normaliseringen.
 # -------------------------------------------------------------------
 
 from pathlib import Path
+from typing import BinaryIO
 import pandas as pd
 
 
@@ -58,16 +61,20 @@ def normalize_positions(df: pd.DataFrame) -> pd.DataFrame:
     Steg:
     1. Kontrollera att alla dessa kolumner finns, annars kasta KeyError.
     2. Kopiera DataFrame (för att inte ändra originalet).
-    3. Gör om kolumnen "Marknadsvärde" från text (svenskt format) till float.
+    3. Gör om kolumnen "Marknadsvärde" från text (svenskt format) till float
+       (vektoriserat; ogiltiga värden ⇒ ValueError med radnummer).
     4. Returnera den normaliserade kopian.
     """
+    from moneygoal.io.contract import to_number
 
     req = {"Marknadsvärde", "Valuta", "ISIN"}
     missing = req - set(df.columns)
     if missing:
         raise KeyError(f"Saknar kolumner i positions: {sorted(missing)}")
     out = df.copy()
-    out["Marknadsvärde"] = out["Marknadsvärde"].map(parse_number)
+    num, bad = to_number(out["Marknadsvärde"])
+    _raise_if_bad(bad, out["Marknadsvärde"], "positions.Marknadsvärde")
+    out["Marknadsvärde"] = num
     return out
 
 def normalize_transactions(df: pd.DataFrame) -> pd.DataFrame:
@@ -88,10 +95,12 @@ def normalize_transactions(df: pd.DataFrame) -> pd.DataFrame:
     1. Byt namn på kolumnerna till enhetliga rubriker.
     2. Kontrollera att de obligatoriska kolumnerna finns.
     3. Kopiera DataFrame.
-    4. Gör om "Datum" till pd.Timestamp (med parse_date).
-    5. Gör om "Belopp" till float (med parse_number).
+    4. Gör om "Datum" till pd.Timestamp (strikt YYYY-MM-DD, som parse_date).
+    5. Gör om "Belopp" till float (som parse_number; tomt ⇒ NaN).
+       Steg 4–5 är vektoriserade; ogiltiga värden ⇒ ValueError med radnummer.
     6. Returnera kopian.
     """
+    from moneygoal.io.contract import to_date, to_number
 
     out = df.rename(columns={
         "Typ av transaktion": "Typ",
@@ -101,14 +110,31 @@ def normalize_transactions(df: pd.DataFrame) -> pd.DataFrame:
     missing = req - set(out.columns)
     if missing:
         raise KeyError(f"Saknar kolumner i transactions: {sorted(missing)}")
-    out["Datum"] = out["Datum"].map(parse_date)
-    out["Belopp"] = out["Belopp"].map(parse_number)
+    dates, bad = to_date(out["Datum"])
+    _raise_if_bad(bad, out["Datum"], "transactions.Datum")
+    num, bad = to_number(out["Belopp"])
+    _raise_if_bad(bad, out["Belopp"], "transactions.Belopp")
+    out["Datum"] = dates
+    out["Belopp"] = num
     return out
 
+def _raise_if_bad(bad: pd.Series, values: pd.Series, what: str, show: int = 5) -> None:
+    """ValueError med antal och de första raderna (filrad = index + 2) som inte gick att tolka."""
+    if not bad.any():
+        return
+    idx = bad.to_numpy().nonzero()[0]
+    sample = ", ".join(f"rad {i + 2}: {values.iloc[i]!r}" for i in idx[:show])
+    raise ValueError(f"{len(idx)} ogiltiga värden i {what} ({sample})")
+
+def read_raw(path: str | Path | BinaryIO) -> pd.DataFrame:
+    """Läs en Avanza-CSV som strängar (sep=";", utf-8-sig) utan normalisering."""
+    return pd.read_csv(path, sep=";", dtype=str, encoding="utf-8-sig")
+
 # tunna IO-wrappers (CSV -> normalize_*) 
-def read_positions(path: str | Path) -> pd.DataFrame:
+def read_positions(path: str | Path | BinaryIO) -> pd.DataFrame:
     """
-    Läs in positions.csv från disk och normalisera den.
+    Läs in positions.csv från disk (eller ett filobjekt, t.ex. io.BytesIO
+    med uppladdade bytes) och normalisera den.
 
     Steg:
     1. Läs CSV som strängar (sep=";", dtype=str).
@@ -117,12 +143,11 @@ def read_positions(path: str | Path) -> pd.DataFrame:
     3. Returnera resultatet.
     """
 
-    df = pd.read_csv(path, sep=";", dtype=str, encoding="utf-8-sig")
-    return normalize_positions(df)
+    return normalize_positions(read_raw(path))
 
-def read_transactions(path: str | Path) -> pd.DataFrame:
+def read_transactions(path: str | Path | BinaryIO) -> pd.DataFrame:
     """
-    Läs in transactions.csv från disk och normalisera den.
+    Läs in transactions.csv från disk (eller ett filobjekt) och normalisera den.
 
     Steg:
     1. Läs CSV som strängar (sep=";", dtype=str).
@@ -131,5 +156,4 @@ def read_transactions(path: str | Path) -> pd.DataFrame:
     3. Returnera resultatet.
     """
 
-    df = pd.read_csv(path, sep=";", dtype=str, encoding="utf-8-sig")
-    return normalize_transactions(df)
+    return normalize_transactions(read_raw(path))
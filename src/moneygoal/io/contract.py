@@ -0,0 +1,231 @@
+# -------------------------------------------------------------------
+# Validering av datakontraktet (docs/DATA_CONTRACT.md) för Avanza-CSV:er.
+# Tanken är att:
+#   - kontrollera hela filen i ett vektoriserat svep per kolumn i stället
+#     för att stanna på första felaktiga cell djupt inne i en .map,
+#   - samla ALLA avvikelser i en strukturerad rapport (fil, rad, kolumn,
+#     regel, värde, allvarlighetsgrad) så att användaren kan rätta filen
+#     på en gång,
+#   - hålla rapporten liten för stora filer: antal räknas alltid exakt per
+#     regel, men bara de första `max_per_rule` raderna per regel sparas,
+#   - köras på rå-DataFrames (allt som str) innan någon beräkning startar;
+#     samma vektoriserade tolkning (to_number/to_date) används sedan av
+#     normaliseringen i avanza_csv.
+# Radnummer avser raden i filen (header = rad 1, första datarad = rad 2).
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "Issue", "ContractReport", "to_number", "to_date",
+    "validate_positions", "validate_transactions", "validate_files",
+    "TRANSACTION_TYPES", "MAX_PER_RULE",
+]
+
+MAX_PER_RULE = 20
+TRX_COLUMN_COUNT = 13
+# Transaktionstyper som förekommer i Avanzas export; okänd typ är en varning
+TRANSACTION_TYPES = frozenset({
+    "Insättning", "Uttag", "Köp", "Sälj", "Utdelning", "Övrigt",
+    "Utländsk källskatt", "Värdepappersöverföring", "Räntor", "Ränta",
+    "Skatt", "Preliminärskatt", "Avkastningsskatt", "Byte", "Teckningslikvid",
+})
+CONTRIB_TYPES = ("Insättning", "Uttag")
+CURRENCY_PATTERN = r"^[A-Z]{3}$"
+ISIN_PATTERN = r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$"
+
+
+@dataclass(frozen=True)
+class Issue:
+    """En avvikelse. row=None betyder fel på filnivå (t.ex. saknad kolumn)."""
+
+    source: str
+    row: Optional[int]
+    column: str
+    rule: str
+    value: str
+    severity: str  # "error" | "warning"
+
+
+@dataclass
+class ContractReport:
+    """Samlad rapport; `counts` är exakta, `issues` kapas per regel."""
+
+    max_per_rule: int = MAX_PER_RULE
+    issues: List[Issue] = field(default_factory=list)
+    counts: Dict[Tuple[str, str, str, str], int] = field(default_factory=dict)
+    rows: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, source: str, column: str, rule: str, severity: str, mask, values) -> None:
+        """Registrera alla rader där `mask` är sann (vektoriserat)."""
+        mask = np.asarray(mask, dtype=bool)
+        n = int(mask.sum())
+        if n == 0:
+            return
+        key = (source, column, rule, severity)
+        self.counts[key] = self.counts.get(key, 0) + n
+        vals = np.asarray(values, dtype=object)
+        for i in np.flatnonzero(mask)[: self.max_per_rule]:
+            v = vals[i]
+            self.issues.append(Issue(source, int(i) + 2, column, rule, "" if pd.isna(v) else str(v), severity))
+
+    def add_file_issue(self, source: str, column: str, rule: str, severity: str, value: str = "") -> None:
+        key = (source, column, rule, severity)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.issues.append(Issue(source, None, column, rule, value, severity))
+
+    @property
+    def n_errors(self) -> int:
+        return sum(n for (_, _, _, sev), n in self.counts.items() if sev == "error")
+
+    @property
+    def n_warnings(self) -> int:
+        return sum(n for (_, _, _, sev), n in self.counts.items() if sev == "warning")
+
+    @property
+    def ok(self) -> bool:
+        return self.n_errors == 0
+
+    @property
+    def truncated(self) -> bool:
+        return sum(self.counts.values()) > len(self.issues)
+
+    def summary_lines(self) -> List[str]:
+        """En rad per (fil, kolumn, regel) med antal, sorterat fel före varningar."""
+        keys = sorted(self.counts, key=lambda k: (k[3] != "error", k[0], k[1], k[2]))
+        return [f"{sev.upper()}: {src}.{col}: {rule} ({self.counts[(src, col, rule, sev)]} rader)"
+                for src, col, rule, sev in keys]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [vars(i) for i in self.issues],
+            columns=["source", "row", "column", "rule", "value", "severity"],
+        )
+
+
+def to_number(s: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Vektoriserad motsvarighet till parse_number.
+    Returnerar (tal som float, mask för celler som inte gick att tolka).
+    Tomma celler blir NaN men räknas inte som fel.
+    """
+    txt = s.astype("string").str.strip()
+    empty = (txt.isna() | (txt == "")).to_numpy(dtype=bool)
+    cleaned = txt.str.replace("\u00A0", "", regex=False).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
+    num = pd.to_numeric(cleaned, errors="coerce").astype(float)
+    bad = num.isna().to_numpy(dtype=bool) & ~empty
+    return num, pd.Series(bad, index=s.index)
+
+
+def to_date(s: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Vektoriserad motsvarighet till parse_date (strikt YYYY-MM-DD).
+    Returnerar (datum, mask för celler som saknas eller inte går att tolka).
+    """
+    txt = s.astype("string").str.strip()
+    dates = pd.to_datetime(txt, format="%Y-%m-%d", errors="coerce")
+    return dates, pd.Series(dates.isna().to_numpy(dtype=bool), index=s.index)
+
+
+def _check_pattern(report: ContractReport, df: pd.DataFrame, source: str, column: str,
+                   pattern: str, rule: str, severity: str, required: bool) -> None:
+    if column not in df.columns:
+        return
+    txt = df[column].astype("string").str.strip()
+    empty = (txt.isna() | (txt == "")).to_numpy(dtype=bool)
+    bad = ~txt.str.fullmatch(pattern).fillna(False).to_numpy(dtype=bool) & ~empty
+    report.add(source, column, rule, severity, bad, df[column])
+    if required:
+        report.add(source, column, "saknat värde", "error", empty, df[column])
+
+
+def validate_positions(df: pd.DataFrame, report: Optional[ContractReport] = None) -> ContractReport:
+    """
+    Kontrollera rå positions (allt som str).
+
+    Regler:
+    1. Kolumnerna Marknadsvärde, Valuta, ISIN finns (annars filnivåfel).
+    2. Marknadsvärde: ifyllt och tolkbart tal (decimalkomma).
+    3. Valuta: ifylld valutakod med tre versaler (t.ex. SEK).
+    4. ISIN: format CC + 9 tecken + kontrollsiffra (varning).
+    """
+    report = report if report is not None else ContractReport()
+    src = "positions"
+    report.rows[src] = len(df)
+    for col in ("Marknadsvärde", "Valuta", "ISIN"):
+        if col not in df.columns:
+            report.add_file_issue(src, col, "saknad kolumn", "error")
+
+    if "Marknadsvärde" in df.columns:
+        num, bad = to_number(df["Marknadsvärde"])
+        report.add(src, "Marknadsvärde", "ogiltigt tal", "error", bad, df["Marknadsvärde"])
+        report.add(src, "Marknadsvärde", "saknat värde", "error", num.isna() & ~bad, df["Marknadsvärde"])
+    _check_pattern(report, df, src, "Valuta", CURRENCY_PATTERN, "ogiltig valutakod", "error", required=True)
+    _check_pattern(report, df, src, "ISIN", ISIN_PATTERN, "ogiltigt ISIN", "warning", required=False)
+    return report
+
+
+def validate_transactions(df: pd.DataFrame, report: Optional[ContractReport] = None) -> ContractReport:
+    """
+    Kontrollera rå transactions (allt som str; kolumnnamn som i exporten).
+
+    Regler:
+    1. Datum, Typ (Typ av transaktion) och Belopp finns; 13 kolumner (varning).
+    2. Datum: strikt YYYY-MM-DD på varje rad.
+    3. Belopp: tolkbart tal; tomt tillåts utom för Insättning/Uttag.
+    4. Typ: känd transaktionstyp (varning).
+    5. Transaktionsvaluta/Instrumentvaluta: valutakod om ifylld.
+    """
+    report = report if report is not None else ContractReport()
+    src = "transactions"
+    df = df.rename(columns={"Typ av transaktion": "Typ", "Värdepapper/beskrivning": "Beskrivning"})
+    report.rows[src] = len(df)
+    for col in ("Datum", "Typ", "Belopp"):
+        if col not in df.columns:
+            report.add_file_issue(src, col, "saknad kolumn", "error")
+    if len(df.columns) != TRX_COLUMN_COUNT:
+        report.add_file_issue(src, "*", f"förväntade {TRX_COLUMN_COUNT} kolumner", "warning", str(len(df.columns)))
+
+    if "Datum" in df.columns:
+        _, bad = to_date(df["Datum"])
+        report.add(src, "Datum", "ogiltigt datum (YYYY-MM-DD)", "error", bad, df["Datum"])
+    if "Belopp" in df.columns:
+        num, bad = to_number(df["Belopp"])
+        report.add(src, "Belopp", "ogiltigt tal", "error", bad, df["Belopp"])
+        if "Typ" in df.columns:
+            needs = df["Typ"].isin(CONTRIB_TYPES).to_numpy(dtype=bool)
+            report.add(src, "Belopp", "saknat belopp för insättning/uttag", "error",
+                       needs & num.isna().to_numpy(dtype=bool) & ~bad.to_numpy(), df["Belopp"])
+    if "Typ" in df.columns:
+        typ = df["Typ"].astype("string").str.strip()
+        report.add(src, "Typ", "okänd transaktionstyp", "warning",
+                   ~typ.isin(sorted(TRANSACTION_TYPES)).to_numpy(dtype=bool), df["Typ"])
+    for col in ("Transaktionsvaluta", "Instrumentvaluta"):
+        _check_pattern(report, df, src, col, CURRENCY_PATTERN, "ogiltig valutakod", "error", required=False)
+    return report
+
+
+def validate_files(
+    positions: str | Path | BinaryIO,
+    transactions: str | Path | BinaryIO,
+    max_per_rule: int = MAX_PER_RULE,
+) -> Tuple[ContractReport, pd.DataFrame, pd.DataFrame]:
+    """
+    Läs båda filerna rått en gång och validera dem.
+    Returnerar (rapport, rå positions, rå transactions) så att anroparen kan
+    normalisera utan att läsa filerna igen.
+    """
+    from moneygoal.io.avanza_csv import read_raw
+
+    raw_pos, raw_trx = read_raw(positions), read_raw(transactions)
+    report = ContractReport(max_per_rule=max_per_rule)
+    validate_positions(raw_pos, report)
+    validate_transactions(raw_trx, report)
+    return report, raw_pos, raw_trx
@@ -0,0 +1,40 @@
+# -------------------------------------------------------------------
+# Gemensam TOML-läsare (scenariofiler, antagandefiler).
+# Tanken är att:
+#   - tomllib (Python 3.11+) används i första hand, annars tomli
+#     (samma API) om det är installerat,
+#   - saknas båda (Python 3.10 utan tomli) blir det ett ValueError med
+#     tydligt meddelande, så att anroparna (batch, --assumptions) kan visa
+#     det som ARGERROR i stället för en traceback.
+# Syntaxfel i filen (TOMLDecodeError) är också ValueError.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+from pathlib import Path
+
+__all__ = ["load_toml", "toml_available"]
+
+
+def _loader():
+    try:
+        import tomllib
+    except ModuleNotFoundError:
+        try:
+            import tomli as tomllib
+        except ModuleNotFoundError:
+            return None
+    return tomllib
+
+
+def toml_available() -> bool:
+    """True om TOML kan läsas i den här Python-miljön."""
+    return _loader() is not None
+
+
+def load_toml(path: str | Path) -> dict:
+    """Läs en TOML-fil (UTF-8) till en dict; ValueError om TOML-stöd saknas."""
+    lib = _loader()
+    if lib is None:
+        raise ValueError("TOML kräver Python 3.11+ eller paketet tomli (använd annars .json)")
+    return lib.loads(Path(path).read_text(encoding="utf-8"))
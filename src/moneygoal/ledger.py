@@ -0,0 +1,151 @@
+# -------------------------------------------------------------------
+# Kassaflödesliggare: varje transaktion klassas EN gång.
+# Tanken är att:
+#   - normaliserade transaktioner (io.avanza_csv.normalize_transactions)
+#     läses i ett vektoriserat svep: Typ → kategori via en uppslagstabell,
+#     och beloppet läggs i en kolumn per kategori (contribution, withdrawal,
+#     dividend, trade, fee; 0.0 i övriga kolumner),
+#   - datum och månadsnyckel tolkas bara här; allt nedströms (månadsspar,
+#     XIRR-flöden, utdelningar) är filter och summor över liggarens kolumner,
+#     utan ny to_datetime/to_numeric och utan egna teckenmappningar,
+#   - utdelningar hanteras med ett val (DIVIDEND_MODES):
+#       reinvest (default): utdelningen stannar i portföljen och syns bara
+#                           indirekt via V0 (samma som tidigare),
+#       cash:               utdelningen tas ut som kontanter: den lämnar
+#                           portföljen som ett uttag i månadssparet och är
+#                           ett positivt flöde till investeraren i XIRR.
+#
+# Teckenkonvention (portföljens perspektiv, pengar IN = +):
+#   contribution = +|Belopp|, withdrawal = −|Belopp| (oavsett exportens tecken),
+#   dividend, trade och fee behåller exportens tecken (köp −, sälj +,
+#   skatt/avgift normalt −, räntor ±).
+# Typer utan kategori (t.ex. Övrigt) får kategorin "other" och 0.0 överallt.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import datetime as dt
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    "CATEGORIES", "CATEGORY_BY_TYPE", "DIVIDEND_MODES",
+    "build_ledger", "contribution_rows", "xirr_flows", "dividends_per_month",
+]
+
+CATEGORIES = ("contribution", "withdrawal", "dividend", "trade", "fee")
+CATEGORY_BY_TYPE = {
+    "Insättning": "contribution",
+    "Uttag": "withdrawal",
+    "Utdelning": "dividend",
+    "Köp": "trade",
+    "Sälj": "trade",
+    "Byte": "trade",
+    "Teckningslikvid": "trade",
+    "Värdepappersöverföring": "trade",
+    "Utländsk källskatt": "fee",
+    "Skatt": "fee",
+    "Preliminärskatt": "fee",
+    "Avkastningsskatt": "fee",
+    "Räntor": "fee",
+    "Ränta": "fee",
+}
+DIVIDEND_MODES = ("reinvest", "cash")
+LEDGER_COLUMNS = ["Datum", "Månad", "Typ", "category", *CATEGORIES]
+
+
+def build_ledger(df_trx: pd.DataFrame) -> pd.DataFrame:
+    """
+    Klassa alla transaktioner i ett svep.
+
+    Input:
+        Normaliserade transaktioner med "Datum", "Typ" och "Belopp".
+        Datum som redan är datetime64 och Belopp som redan är float
+        används som de är (ingen ny tolkning).
+
+    Output:
+        DataFrame med kolumnerna Datum (Timestamp), Månad ("YYYY-MM"), Typ,
+        category och en float-kolumn per kategori i CATEGORIES.
+
+    Steg:
+    1. Kontrollera obligatoriska kolumner.
+    2. Datum/Belopp till datetime64/float om de inte redan är det.
+    3. Kategori per rad via CATEGORY_BY_TYPE ("other" om typen saknas).
+    4. Ett teckensatt belopp per rad, utspritt på kategorikolumnerna.
+    """
+    req = {"Datum", "Typ", "Belopp"}
+    missing = req - set(df_trx.columns)
+    if missing:
+        raise KeyError(f"Saknar kolumner: {sorted(missing)}")
+
+    dates = df_trx["Datum"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    amount = df_trx["Belopp"]
+    if not pd.api.types.is_float_dtype(amount):
+        amount = amount.astype(float)
+    amount = amount.to_numpy()
+
+    typ = df_trx["Typ"]
+    category = typ.map(CATEGORY_BY_TYPE).fillna("other").to_numpy(dtype=object)
+    signed = np.where(category == "contribution", np.abs(amount),
+                      np.where(category == "withdrawal", -np.abs(amount), amount))
+
+    out = pd.DataFrame({
+        "Datum": dates.to_numpy(),
+        "Månad": dates.dt.strftime("%Y-%m").to_numpy(dtype=object),
+        "Typ": typ.to_numpy(),
+        "category": category,
+    }, index=df_trx.index)
+    for c in CATEGORIES:
+        out[c] = np.where(category == c, signed, 0.0)
+    return out[LEDGER_COLUMNS]
+
+
+def _check_mode(dividends: str) -> None:
+    if dividends not in DIVIDEND_MODES:
+        raise ValueError(f"Okänt utdelningsläge: {dividends} (stöd: {', '.join(DIVIDEND_MODES)})")
+
+
+def contribution_rows(ledger: pd.DataFrame, dividends: str = "reinvest") -> pd.DataFrame:
+    """
+    Månadsspar-rader ur liggaren: Datum, Månad, Typ, Belopp_signed
+    (Insättning +, Uttag −). Med dividends="cash" ingår utdelningar som
+    uttag (−utdelning), eftersom de lämnar portföljen.
+    """
+    _check_mode(dividends)
+    cats = ["contribution", "withdrawal"] + (["dividend"] if dividends == "cash" else [])
+    rows = ledger[ledger["category"].isin(cats)]
+    signed = rows["contribution"] + rows["withdrawal"] - rows["dividend"]
+    return pd.DataFrame({
+        "Datum": rows["Datum"], "Månad": rows["Månad"], "Typ": rows["Typ"], "Belopp_signed": signed,
+    })
+
+
+def xirr_flows(
+    ledger: pd.DataFrame,
+    ending_value: float,
+    asof: dt.date,
+    dividends: str = "reinvest",
+) -> List[Tuple[dt.date, float]]:
+    """
+    Kassaflöden för XIRR ur investerarens perspektiv: insättning −, uttag +,
+    (dividends="cash": utdelning +) och nuvärdet som slutflöde på `asof`.
+    """
+    _check_mode(dividends)
+    cats = ["contribution", "withdrawal"] + (["dividend"] if dividends == "cash" else [])
+    rows = ledger[ledger["category"].isin(cats)]
+    amounts = -(rows["contribution"] + rows["withdrawal"]) + rows["dividend"]
+    cfs = list(zip(rows["Datum"].dt.date.tolist(), amounts.tolist()))
+    cfs.append((asof, float(ending_value)))
+    return cfs
+
+
+def dividends_per_month(ledger: pd.DataFrame) -> pd.Series:
+    """Summa utdelningar per månad ("YYYY-MM"), tom serie om inga finns."""
+    rows = ledger[ledger["category"] == "dividend"]
+    if rows.empty:
+        return pd.Series(dtype=float)
+    return rows.groupby("Månad", sort=True)["dividend"].sum()
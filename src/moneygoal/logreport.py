@@ -0,0 +1,103 @@
+# -------------------------------------------------------------------
+# Liten läsare för JSON-loggen (logs/app.log + roterade app.log.1..N).
+# Plockar ut "stages"-poster (se moneygoal.instrument / logsetup) och
+# summerar latens per steg över alla loggade körningar: antal, P50,
+# P90, P99 och max i sekunder.
+#
+# Körning:
+#   python -m moneygoal.logreport [logs/app.log]
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+__all__ = ["iter_stage_records", "stage_latency_summary"]
+
+
+def _log_files(log_path: Path) -> List[Path]:
+    """Loggfilen plus roterade kopior, äldst först (app.log.3, .2, .1, app.log)."""
+    rotated = sorted(
+        log_path.parent.glob(log_path.name + ".*"),
+        key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0,
+        reverse=True,
+    )
+    files = [p for p in rotated if p.suffix[1:].isdigit()]
+    if log_path.exists():
+        files.append(log_path)
+    return files
+
+
+def iter_stage_records(log_path: str | Path = "logs/app.log") -> Iterator[dict]:
+    """
+    Iterera över loggposter som innehåller stegtider ("stages").
+    Rader som inte är JSON (t.ex. från äldre textformat) hoppas över.
+    """
+    for f in _log_files(Path(log_path)):
+        with f.open("r", encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line.startswith("{"):
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(rec.get("stages"), dict):
+                    yield rec
+
+
+def _pct(sorted_vals: List[float], p: float) -> float:
+    """Percentil med närmaste rang (samma idé som i monte_carlo.pct)."""
+    k = max(0, min(len(sorted_vals) - 1, int(math.ceil(p / 100.0 * len(sorted_vals))) - 1))
+    return sorted_vals[k]
+
+
+def stage_latency_summary(log_path: str | Path = "logs/app.log") -> Dict[str, Dict[str, float]]:
+    """
+    Returnerar {steg: {"n", "p50", "p90", "p99", "max"}} i sekunder,
+    beräknat över alla körningar i loggen (inklusive roterade filer).
+    """
+    samples: Dict[str, List[float]] = {}
+    for rec in iter_stage_records(log_path):
+        for stage, secs in rec["stages"].items():
+            samples.setdefault(stage, []).append(float(secs))
+
+    out: Dict[str, Dict[str, float]] = {}
+    for stage, vals in samples.items():
+        vals.sort()
+        out[stage] = {
+            "n": len(vals),
+            "p50": _pct(vals, 50),
+            "p90": _pct(vals, 90),
+            "p99": _pct(vals, 99),
+            "max": vals[-1],
+        }
+    return out
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Summera stegtider (latenspercentiler) från JSON-loggen.")
+    p.add_argument("log", nargs="?", default="logs/app.log", help="Loggfil (roterade kopior tas med).")
+    args = p.parse_args(argv)
+
+    summary = stage_latency_summary(args.log)
+    if not summary:
+        print(f"Inga stegposter i {args.log}", file=sys.stderr)
+        return 1
+    print(f"{'steg':<10} {'n':>6} {'p50_s':>10} {'p90_s':>10} {'p99_s':>10} {'max_s':>10}")
+    for stage, s in summary.items():
+        print(
+            f"{stage:<10} {s['n']:>6} {s['p50']:>10.4f} {s['p90']:>10.4f} "
+            f"{s['p99']:>10.4f} {s['max']:>10.4f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
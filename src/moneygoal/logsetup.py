@@ -0,0 +1,163 @@
+# -------------------------------------------------------------------
+# Gemensam loggning för CLI och Streamlit-app enligt docs/LOGGING.md.
+# Tanken är att:
+#   - alla poster skrivs som JSON-rader (en post per rad) till logs/app.log,
+#   - filen roteras vid 5 MB och 3 gamla filer behålls,
+#   - själva fil-I/O:n sker i en bakgrundstråd (QueueHandler → QueueListener),
+#     så att logganrop på den varma vägen bara lägger en post i en kö,
+#   - varje post bär ett run_id så att poster från samma körning kan grupperas,
+#   - stegtider från moneygoal.instrument skickas som strukturerade fält.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import copy
+import datetime as dt
+import json
+import logging
+import logging.handlers
+import queue
+import uuid
+from pathlib import Path
+from typing import Optional
+
+__all__ = ["setup_logging", "flush_logging", "new_run_id", "current_run_id", "JsonFormatter"]
+
+LOG_PATH = Path("logs/app.log")
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+_RUN_ID: contextvars.ContextVar[str] = contextvars.ContextVar("moneygoal_run_id", default="-")
+
+# Attribut som alltid finns på en LogRecord; allt annat räknas som "extra"-fält.
+_STD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "run_id"}
+
+# Aktiv konfiguration (processglobal): (loggfil, queue-handler, listener)
+_ACTIVE: Optional[tuple[Path, logging.Handler, logging.handlers.QueueListener]] = None
+
+
+def new_run_id() -> str:
+    """Skapa och aktivera ett nytt run_id för aktuell kontext (tråd/körning)."""
+    rid = uuid.uuid4().hex[:12]
+    _RUN_ID.set(rid)
+    return rid
+
+
+def current_run_id() -> str:
+    return _RUN_ID.get()
+
+
+class _RunIdFilter(logging.Filter):
+    """Stämpla run_id på posten i anroparens tråd, innan den läggs i kön."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "run_id"):
+            record.run_id = _RUN_ID.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatera en post som en JSON-rad:
+        {"ts", "level", "name", "run_id", "message", ...extra, "exc"?}
+    Extra-fält (t.ex. stages/counters från Instrument.to_record) följer med.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        rec = {
+            "ts": dt.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "name": record.name,
+            "run_id": getattr(record, "run_id", "-"),
+            "message": record.getMessage(),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _STD_ATTRS and not k.startswith("_"):
+                rec[k] = v
+        if record.exc_info:
+            rec["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            rec["exc"] = record.exc_text
+        return json.dumps(rec, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler som behåller extra-fält och stacktrace separat.
+    Standardvarianten formaterar in stacktracen i meddelandet, vilket
+    skulle göra JSON-fältet "message" flerradigt.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(
+    log_path: str | Path = LOG_PATH,
+    level: int = logging.INFO,
+    max_bytes: int = MAX_BYTES,
+    backup_count: int = BACKUP_COUNT,
+) -> logging.handlers.QueueListener:
+    """
+    Konfigurera rotlogger med kö + roterande JSON-fil. Idempotent per loggfil.
+
+    Steg:
+    1. Om samma loggfil redan är konfigurerad: returnera befintlig listener
+       (Streamlit kör om skriptet vid varje interaktion).
+    2. Annars: stoppa ev. tidigare listener och ta bort dess QueueHandler.
+    3. Skapa RotatingFileHandler (5 MB, 3 filer) med JsonFormatter bakom en
+       QueueListener i bakgrundstråd, och en QueueHandler på rotloggern.
+    4. Registrera stopp vid processens slut så att kön töms till disk.
+    """
+    global _ACTIVE
+    path = Path(log_path).resolve()
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    if _ACTIVE is not None:
+        active_path, qh, listener = _ACTIVE
+        if active_path == path:
+            return listener
+        listener.stop()
+        for h in listener.handlers:
+            h.close()
+        root.removeHandler(qh)
+        _ACTIVE = None
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fh = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    fh.setFormatter(JsonFormatter())
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    qh = _QueueHandler(q)
+    qh.addFilter(_RunIdFilter())
+    listener = logging.handlers.QueueListener(q, fh, respect_handler_level=False)
+    listener.start()
+    root.addHandler(qh)
+
+    _ACTIVE = (path, qh, listener)
+    return listener
+
+
+def flush_logging() -> None:
+    """Töm kön till disk (stoppar och startar om listenern)."""
+    if _ACTIVE is not None:
+        listener = _ACTIVE[2]
+        listener.stop()
+        listener.start()
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _ACTIVE is not None:
+        _ACTIVE[2].stop()
@@ -8,10 +8,13 @@
 
 from __future__ import annotations
 import datetime as dt
-from typing import Iterable, Tuple, List
+import math
+from typing import Dict, Iterable, Tuple, List, Optional
 
 DateAmount = Tuple[dt.date, float]
-__all__ = ["xirr"]
+__all__ = ["xirr", "net_flows", "monthly_flows", "COMPRESS_MODES"]
+
+COMPRESS_MODES = ("month",)
 
 def _is_leap(y: int) -> bool:
     """Skottårsregel: vart 4:e år, ej sekelskifte, utom vart 400:e."""
@@ -67,7 +70,75 @@ def _npv(rate: float, cfs: List[DateAmount]) -> float:
     t0 = cfs[0][0]
     return sum(a / (1.0 + rate) ** _years(t0, d) for d, a in cfs)
 
-def xirr(cashflows: Iterable[DateAmount]) -> float:
+def _npv_t(rate: float, ts: List[float], amounts: List[float]) -> float:
+    """Som _npv, men med årsfraktionerna förberäknade (samma uttryck per flöde)."""
+    return sum(a / (1.0 + rate) ** t for t, a in zip(ts, amounts))
+
+# -------------------------------------------------------------------
+# Komprimering av flöden
+# Tanken är att NPV-kostnaden ska skala med antal datum (eller månader),
+# inte med antal transaktioner:
+#   - net_flows: flöden samma dag slås ihop EXAKT (math.fsum). NPV är
+#     linjär i beloppen och alla flöden samma dag har samma diskontering,
+#     så roten är oförändrad; datum vars netto blir 0 behålls (t0 ändras inte),
+#   - monthly_flows (opt-in, compress="month"): ett flöde per kalendermånad
+#     på månadens |belopp|-viktade medeldag. Månader med ett enda datum
+#     (t.ex. slutflödet) flyttas inte. Felet rapporteras som en garanterad
+#     gräns: det exakta NPV byter tecken inom r ± error_bound.
+# -------------------------------------------------------------------
+
+def net_flows(cashflows: Iterable[DateAmount]) -> List[DateAmount]:
+    """Ett flöde per datum (exakt summa), sorterat stigande."""
+    by_date: Dict[dt.date, List[float]] = {}
+    for d, a in cashflows:
+        by_date.setdefault(d, []).append(float(a))
+    return [(d, math.fsum(by_date[d])) for d in sorted(by_date)]
+
+def monthly_flows(cashflows: Iterable[DateAmount]) -> List[DateAmount]:
+    """
+    Ett flöde per månad: nettot placerat på månadens |belopp|-viktade
+    medeldag (avrundad). Indata nettas först per datum (net_flows).
+    """
+    buckets: Dict[Tuple[int, int], List[DateAmount]] = {}
+    for d, a in net_flows(cashflows):
+        buckets.setdefault((d.year, d.month), []).append((d, a))
+    out: List[DateAmount] = []
+    for key in sorted(buckets):
+        flows = buckets[key]
+        total = math.fsum(a for _, a in flows)
+        weight = math.fsum(abs(a) for _, a in flows)
+        if len(flows) == 1 or weight == 0.0:
+            out.append((flows[0][0], total))
+            continue
+        day = math.fsum(d.day * abs(a) for d, a in flows) / weight
+        out.append((dt.date(key[0], key[1], int(round(day))), total))
+    return out
+
+def _error_bound(r: float, ts: List[float], amounts: List[float], counter: dict) -> Optional[float]:
+    """
+    Minsta e (ur en geometrisk följd) sådan att exakt NPV byter tecken inom
+    [r − e, r + e]; startgissning = ett Newtonsteg |NPV/NPV'| i r.
+    None om ingen teckenväxling hittas (t.ex. vid fallback utan rot).
+    """
+    f = _npv_t(r, ts, amounts)
+    df = sum(-t * a / (1.0 + r) ** (t + 1.0) for t, a in zip(ts, amounts))
+    counter["npv_evals"] += 2
+    if f == 0.0:
+        return 0.0
+    e = max(abs(f / df) if df != 0.0 else 1e-6, 1e-12) * 1.01
+    for _ in range(60):
+        lo, hi = max(r - e, -0.9999999), r + e
+        counter["npv_evals"] += 2
+        if _npv_t(lo, ts, amounts) * _npv_t(hi, ts, amounts) <= 0:
+            return e
+        e *= 2.0
+    return None
+
+def xirr(
+    cashflows: Iterable[DateAmount],
+    stats: Optional[dict] = None,
+    compress: Optional[str] = None,
+) -> float:
     """
     Beräkna årlig internränta (XIRR) för daterade kassaflöden.
 
@@ -76,7 +147,8 @@ def xirr(cashflows: Iterable[DateAmount]) -> float:
         - Datum i valfri ordning; sorteras internt stigande.
 
     Algoritm:
-        1) Sortera flödena.
+        1) Sortera flödena och netta flöden samma dag exakt (net_flows);
+           med compress="month" dessutom ett flöde per månad (monthly_flows).
         2) Bygg ett startintervall [lo, hi] med teckenväxling i NPV.
            Starta med lo ≈ -1 och hi = 10.0. Expandera vid behov.
         3) Kör bisektion tills NPV nära 0 eller intervallet är litet.
@@ -86,26 +158,62 @@ def xirr(cashflows: Iterable[DateAmount]) -> float:
     Precision:
         - Avbryter när |NPV| < 1e-12 eller intervallbredd < 1e-12.
 
+    Instrumentering:
+        - Om `stats` ges fylls den med "iterations" (bisektionssteg),
+          "npv_evals" (antal NPV-utvärderingar), "n_flows" (indata),
+          "n_dates" (efter nettning) och, med compress, "n_buckets" och
+          "error_bound" (exakt rot ligger inom r ± error_bound; None om
+          gränsen inte kunde fastställas).
+
     Obs:
         - lo kan inte gå ≤ -1 eftersom (1+rate) måste vara > 0.
         - Mycket extrema flöden kan ge orimligt stor hi; expansion bryts
           efter fast antal steg av robusthetsskäl.
     """
-    # 1) Sortera och validera teckenblandning.
-
-    cfs = sorted(list(cashflows), key=lambda x: x[0])
+    if compress is not None and compress not in COMPRESS_MODES:
+        raise ValueError(f"Okänt komprimeringsläge: {compress} (stöd: {', '.join(COMPRESS_MODES)})")
+    raw = list(cashflows)
+    cfs = net_flows(raw)
+    counter = {"iterations": 0, "npv_evals": 0}
+    extra: dict = {"n_flows": len(raw), "n_dates": len(cfs)}
+    if compress is None:
+        r = _solve(cfs, counter)
+    else:
+        buckets = monthly_flows(cfs)
+        r = _solve(buckets, counter)
+        t0 = cfs[0][0]
+        ts = [_years(t0, d) for d, _ in cfs]
+        extra.update(n_buckets=len(buckets), error_bound=_error_bound(r, ts, [a for _, a in cfs], counter))
+    if stats is not None:
+        stats.update(counter)
+        stats.update(extra)
+    return r
+
+
+def _solve(cfs: List[DateAmount], counter: dict) -> float:
+    """Bisektionskärnan i xirr. `counter` räknar iterationer och NPV-anrop."""
+    # 1) Validera teckenblandning (flödena är redan sorterade; tom lista ⇒ fel).
     if not (any(a < 0 for _, a in cfs) and any(a > 0 for _, a in cfs)):
         raise ValueError("xirr kräver både negativa och positiva flöden")
 
+    # Årsfraktionerna beror inte på räntan: räkna dem en gång
+    t0 = cfs[0][0]
+    ts = [_years(t0, d) for d, _ in cfs]
+    amounts = [a for _, a in cfs]
+
+    def npv(rate: float) -> float:
+        counter["npv_evals"] += 1
+        return _npv_t(rate, ts, amounts)
+
     # 2) Startintervall. lo nära -1 (men > -1), hi moderat hög.
     lo, hi = -0.999999, 10.0
-    f_lo, f_hi = _npv(lo, cfs), _npv(hi, cfs)
+    f_lo, f_hi = npv(lo), npv(hi)
 
     # 2a) Om ingen teckenväxling: expandera hi uppåt.
     if f_lo * f_hi > 0:
         for _ in range(60):
             hi *= 1.5
-            f_hi = _npv(hi, cfs)
+            f_hi = npv(hi)
             if f_lo * f_hi <= 0:
                 break
 
@@ -116,7 +224,7 @@ def xirr(cashflows: Iterable[DateAmount]) -> float:
             lo = (lo - 1.0) * 1.5 + 1.0  # går mot -inf men > -1
             if lo <= -0.9999999:
                 lo = -0.9999999
-            f_lo = _npv(lo, cfs)
+            f_lo = npv(lo)
             if f_lo * f_hi <= 0:
                 break
 
@@ -127,8 +235,9 @@ def xirr(cashflows: Iterable[DateAmount]) -> float:
 
     # 4) Bisektion: halvera intervallet tills precision uppnås.
     for _ in range(200):
+        counter["iterations"] += 1
         mid = (lo + hi) / 2.0
-        f_mid = _npv(mid, cfs)
+        f_mid = npv(mid)
         # Avbryt på tillräcklig NPV-noggrannhet eller litet intervall.
         if abs(f_mid) < 1e-12 or (hi - lo) < 1e-12:
             return mid
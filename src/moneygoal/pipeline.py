@@ -0,0 +1,494 @@
+# -------------------------------------------------------------------
+# Gemensam, memoiserad pipeline för CLI:n och Streamlit-appen.
+# Tanken är att:
+#   - kedjan rådata → validering → normalisering → kassaflödesliggare →
+#     V0/månadsspar/XIRR → Monte Carlo → rapport beskrivs EN gång, som steg
+#     med deklarerade indata (parametrar eller tidigare steg),
+#   - varje steg får ett fingeravtryck = hash av stegets namn, version,
+#     kodens avtryck och indatas avtryck (Merkle-stil): filer hashas på
+#     innehåll, övriga parametrar på repr, och steg ärver sina indatas avtryck,
+#   - kodens avtryck (code_fingerprint) täcker all källkod i paketet
+#     moneygoal, så en uppgradering eller ändrad numerik aldrig ger gamla
+#     cachade tal,
+#   - ett steg vars avtryck redan finns i minnet (eller på disk) räknas inte
+#     om, och dess indata laddas inte ens; ändrat --goal ändrar bara mc och
+#     report, så bara de körs,
+#   - positions och transactions är separata grenar: en ny positions-fil rör
+#     inte månadssparet, och små skalära steg (V0, månadsspar) har
+#     by_value=True ("early cutoff"): nedströms ser värdets avtryck, så
+#     Monte Carlo körs bara om V0 faktiskt ändrades,
+#   - parametrar med "_"-prefix (t.ex. Instrument, Streamlit-platshållare)
+#     skickas till stegen men hashas inte (samma konvention som st.cache_data),
+#   - ett steg kan bytas ut (Pipeline.replace), t.ex. appens progressiva
+#     Monte Carlo, utan att resten av kedjan ändras.
+# Minnescachen är en processgemensam LRU (trådsäker). Med cache_dir sparas
+# steg med persist=True som pickle-filer, så att en ny CLI-körning med samma
+# filer återanvänder dem; högst DISK_KEEP filer per steg behålls.
+# Varje post sparar också räknare och tid från när den räknades, för steget
+# och alla steg uppströms (t.ex. rows_positions, mc_paths). Vid
+# återanvändning spelas de upp i Instrument (replay), en gång per steg och
+# körning, så diagnostics-kolumnerna finns även när uppströmssteg aldrig
+# laddas.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "Stage", "Pipeline", "PipelineRun", "fingerprint", "code_fingerprint",
+    "default_pipeline", "STAGES", "MC_DEFAULTS", "CACHE_DIR",
+]
+
+CACHE_DIR = Path("result/cache/pipeline")
+MAX_ENTRIES = 64
+DISK_KEEP = 8
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    Ett steg: fn anropas med ett nyckelordsargument per namn i `inputs`.
+
+    version:  höjs när stegets logik ändras utanför paketet (t.ex. ett utbytt
+              steg i appen); ändringar i moneygoal fångas av code_fingerprint.
+    persist:  spara resultatet i cache_dir (billiga eller ej picklebara steg: False).
+    by_value: nedströms avtryck = avtryck av värdet (för små resultat, t.ex. V0),
+              så att en omräkning som ger samma värde inte sprider sig vidare.
+    timer:    namn i Instrument (default: name); flera steg kan dela en tidtagning.
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...]
+    version: int = 1
+    persist: bool = True
+    by_value: bool = False
+    timer: Optional[str] = None
+
+
+@dataclass
+class PipelineRun:
+    """Resultat av Pipeline.run: värden för målen + vilka steg som kördes/återanvändes."""
+
+    values: Dict[str, Any]
+    computed: List[str] = field(default_factory=list)
+    reused: List[str] = field(default_factory=list)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[name]
+
+
+def fingerprint(value: Any) -> str:
+    """
+    Fingeravtryck för en parameter.
+    Path → SHA-256 av filinnehållet; bytes → SHA-256; övrigt → SHA-256 av repr.
+    """
+    if isinstance(value, Path):
+        return "file:" + hashlib.sha256(value.read_bytes()).hexdigest()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes:" + hashlib.sha256(value).hexdigest()
+    return "repr:" + hashlib.sha256(repr(value).encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def code_fingerprint() -> str:
+    """
+    Avtryck för koden som räknar: SHA-256 av alla .py-filer i paketet
+    moneygoal (sorterade på relativ sökväg), dvs. ändras vid varje ny version
+    eller lokal ändring. Räknas en gång per process; ingår i varje stegs
+    cachenyckel. (importlib.metadata undviks: uppslaget kostar ~40 ms.)
+    """
+    root = Path(__file__).resolve().parent
+    h = hashlib.sha256(b"moneygoal")
+    for path in sorted(root.rglob("*.py")):
+        h.update(path.relative_to(root).as_posix().encode("utf-8"))
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+class Pipeline:
+    """
+    Steg i beroendeordning; indata som inte är ett tidigare steg är parametrar.
+
+    Användning:
+        pipe = default_pipeline()
+        run = pipe.run(["mc", "report"], params, inst)
+        run["report"], run.computed, run.reused
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[Stage],
+        cache_dir: str | Path | None = None,
+        max_entries: int = MAX_ENTRIES,
+    ) -> None:
+        self.stages: Dict[str, Stage] = {}
+        for s in stages:
+            if s.name in self.stages:
+                raise ValueError(f"Dubblerat steg: {s.name}")
+            self.stages[s.name] = s
+        # Ett steg får bara bero på tidigare steg (inga cykler)
+        names = list(self.stages)
+        for pos, s in enumerate(self.stages.values()):
+            later = [i for i in s.inputs if i in self.stages and names.index(i) >= pos]
+            if later:
+                raise ValueError(f"Steget {s.name} beror på senare steg: {later}")
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_entries = max_entries
+        self._memo: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def replace(self, stage: Stage) -> "Pipeline":
+        """Ny pipeline med `stage` i stället för steget med samma namn (egen minnescache)."""
+        if stage.name not in self.stages:
+            raise KeyError(f"Okänt steg: {stage.name}")
+        stages = [stage if s.name == stage.name else s for s in self.stages.values()]
+        return Pipeline(stages, self.cache_dir, self.max_entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memo.clear()
+
+    def run(self, targets: Sequence[str], params: Dict[str, Any], inst=None) -> PipelineRun:
+        """
+        Beräkna `targets` och returnera deras värden.
+
+        Steg:
+        1. Fingeravtryck för alla steg som målen beror på (parametrar hashas
+           en gång per körning; steg ärver indatas avtryck, by_value-steg
+           räknas/hämtas först och ger värdets avtryck).
+        2. För varje mål: minnescache → diskcache → annars räkna, rekursivt
+           bara de indata som faktiskt behövs.
+        3. Beräknade steg mäts med inst.stage(namn); `_inst` skickas till
+           stegen, och antalet återanvända steg räknas som pipeline_reused.
+           Återanvända steg spelar upp sparade räknare för sig och sina
+           uppströmssteg (inst.replay), högst en gång per steg.
+        """
+        from moneygoal.instrument import NULL_INSTRUMENT
+
+        inst = inst if inst is not None else NULL_INSTRUMENT
+        params = {"_inst": inst, **params}
+        keys: Dict[str, str] = {}
+        fps: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+        lineage: Dict[str, Dict[str, dict]] = {}  # steg → {uppströmssteg: meta}
+        counted: set = set()
+        out = PipelineRun(values={})
+
+        def account(lin: Dict[str, dict]) -> None:
+            for n, meta in lin.items():
+                if n not in counted:
+                    counted.add(n)
+                    inst.replay(self.stages[n].timer or n, meta["seconds"], meta["counters"])
+
+        def key_fp(name: str) -> str:
+            """Stegets cachenyckel: namn, version, kodens avtryck och indatas avtryck."""
+            if name not in keys:
+                stage = self.stages[name]
+                h = hashlib.sha256(f"{stage.name}:{stage.version}:{code_fingerprint()}".encode("utf-8"))
+                for i in stage.inputs:
+                    if not i.startswith("_"):
+                        h.update(f"|{i}={fp(i)}".encode("utf-8"))
+                keys[name] = h.hexdigest()
+            return keys[name]
+
+        def fp(name: str) -> str:
+            """Avtrycket som nedströms steg ser."""
+            if name in fps:
+                return fps[name]
+            stage = self.stages.get(name)
+            if stage is None:
+                if name not in params:
+                    raise KeyError(f"Pipeline saknar parametern {name!r}")
+                fps[name] = fingerprint(params[name])
+            elif stage.by_value:
+                fps[name] = "value:" + hashlib.sha256(
+                    pickle.dumps(value(name), protocol=pickle.HIGHEST_PROTOCOL)
+                ).hexdigest()
+            else:
+                fps[name] = key_fp(name)
+            return fps[name]
+
+        def value(name: str) -> Any:
+            if name in values:
+                return values[name]
+            stage = self.stages.get(name)
+            if stage is None:
+                if name not in params:
+                    raise KeyError(f"Pipeline saknar parametern {name!r}")
+                return params[name]
+            key = (name, key_fp(name))
+            hit, entry = self._lookup(stage, key)
+            if hit:
+                v, lineage[name] = entry
+                account(lineage[name])
+                out.reused.append(name)
+            else:
+                args = {i: value(i) for i in stage.inputs}
+                before = dict(inst.counters)
+                t0 = time.perf_counter()
+                with inst.stage(stage.timer or name):
+                    v = stage.fn(**args)
+                meta = {
+                    "seconds": time.perf_counter() - t0,
+                    "counters": {k: n - before.get(k, 0) for k, n in inst.counters.items()
+                                 if n != before.get(k, 0)},
+                }
+                counted.add(name)
+                lineage[name] = {name: meta}
+                for i in stage.inputs:
+                    if i in self.stages:
+                        lineage[name].update(lineage[i])
+                out.computed.append(name)
+                self._store(stage, key, (v, lineage[name]))
+            values[name] = v
+            return v
+
+        for t in targets:
+            if t not in self.stages:
+                raise KeyError(f"Okänt steg: {t}")
+            out.values[t] = value(t)
+        inst.count("pipeline_reused", len(out.reused))
+        return out
+
+    # --- cache ---
+
+    def _disk_path(self, key: Tuple[str, str]) -> Path:
+        return self.cache_dir / f"{key[0]}-{key[1][:40]}.pkl"
+
+    def _lookup(self, stage: Stage, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return True, self._memo[key]
+        if stage.persist and self.cache_dir is not None:
+            path = self._disk_path(key)
+            try:
+                with path.open("rb") as fh:
+                    entry = pickle.load(fh)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                return False, None
+            if not (isinstance(entry, tuple) and len(entry) == 2 and isinstance(entry[1], dict)):
+                return False, None  # äldre format (bara värdet): räkna om
+            self._remember(key, entry)
+            return True, entry
+        return False, None
+
+    def _remember(self, key: Tuple[str, str], v: Any) -> None:
+        with self._lock:
+            self._memo[key] = v
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+
+    def _store(self, stage: Stage, key: Tuple[str, str], v: Any) -> None:
+        self._remember(key, v)
+        if not stage.persist or self.cache_dir is None:
+            return
+        # Atomisk skrivning (tmp + replace); cachen är ett hjälpmedel, så fel ignoreras
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._disk_path(key)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with tmp.open("wb") as fh:
+                pickle.dump(v, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            old = sorted(self.cache_dir.glob(f"{stage.name}-*.pkl"), key=lambda p: p.stat().st_mtime_ns)
+            for p in old[:-DISK_KEEP]:
+                p.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+# --- Standardstegen (tunga importer sker först i stegen) ---
+
+def _source(src):
+    """Sökväg eller uppladdade bytes → något som read_raw kan läsa."""
+    return io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src
+
+
+def _raw_file(src):
+    from moneygoal.io.avanza_csv import read_raw
+
+    return read_raw(_source(src))
+
+
+def _validate(raw_positions, raw_transactions):
+    """Datakontraktet (se io/contract.py); anroparen avgör vad fel innebär."""
+    from moneygoal.io.contract import ContractReport, validate_positions, validate_transactions
+
+    report = ContractReport()
+    validate_positions(raw_positions, report)
+    validate_transactions(raw_transactions, report)
+    return report
+
+
+def _read_positions(raw_positions, _inst):
+    from moneygoal.io.avanza_csv import normalize_positions
+
+    df = normalize_positions(raw_positions)
+    _inst.count("rows_positions", len(df))
+    return df
+
+
+def _read_transactions(raw_transactions, _inst):
+    from moneygoal.io.avanza_csv import normalize_transactions
+
+    df = normalize_transactions(raw_transactions)
+    _inst.count("rows_transactions", len(df))
+    return df
+
+
+def _v0(read_positions):
+    """Nuvärde: summan av Marknadsvärde över alla tillgångar."""
+    return float(read_positions["Marknadsvärde"].sum())
+
+
+def _ledger(read_transactions):
+    """Kassaflödesliggare: varje transaktion klassad en gång (moneygoal.ledger)."""
+    from moneygoal.ledger import build_ledger
+
+    return build_ledger(read_transactions)
+
+
+def _contrib(ledger, dividends):
+    """Genomsnittligt månadsspar ur Insättning/Uttag (och utdelningar vid dividends="cash")."""
+    from moneygoal.contrib import mean_monthly_contribution
+    from moneygoal.ledger import contribution_rows
+
+    return float(mean_monthly_contribution(contribution_rows(ledger, dividends)))
+
+
+def _holdings(read_positions, assumptions):
+    """Värde per antagandenyckel för --assumptions (None utan antagandefil)."""
+    if assumptions is None:
+        return None
+    from moneygoal.sim.multi_asset import asset_values, read_assumptions
+
+    return asset_values(read_positions, read_assumptions(assumptions))
+
+
+def _xirr(V0, ledger, asof, dividends, xirr_monthly, _inst):
+    """
+    Diagnosmått (XIRR); beror på dagens datum via slutflödet.
+    xirr_monthly: lös på månadsvis komprimerade flöden och rapportera
+    felgränsen mot exakt XIRR som xirr_error_bound.
+    """
+    import datetime as dt
+
+    from moneygoal.diagnostics import compute_xirr_from_ledger
+
+    stats: dict = {}
+    out = {"xirr": compute_xirr_from_ledger(ledger, V0, stats=stats, asof=dt.date.fromisoformat(asof),
+                                            dividends=dividends, compress="month" if xirr_monthly else None)}
+    if xirr_monthly:
+        out["xirr_error_bound"] = stats.get("error_bound")
+    _inst.count("xirr_iterations", stats.get("iterations", 0))
+    _inst.count("xirr_npv_evals", stats.get("npv_evals", 0))
+    _inst.count("xirr_flows", stats.get("n_buckets", stats.get("n_dates", 0)))
+    return out
+
+
+def _mc(V0, contrib, holdings, goal, cagr, vol, paths, seed, maxhorisont,
+        model, df, bear_cagr, bear_vol, p_bear, p_recover,
+        returns, block, bootstrap, rebalance, compact, step, _inst, _shocks=None):
+    """
+    Monte Carlo för tid till mål.
+    Med holdings (--assumptions): korrelerad simulering per innehav (multi_asset);
+    med returns: block-bootstrap av lokal avkastningsserie (bootstrap);
+    annars time_to_goal_mc med vald avkastningsmodell (step: "month",
+    "quarter" eller "year", se sim/coarse.py).
+    _shocks (ShockStore) hashas inte: resultatet är detsamma med och utan bank.
+    """
+    if returns is not None:
+        from moneygoal.sim.bootstrap import BlockBootstrap, read_monthly_returns, time_to_goal_bootstrap
+
+        m = BlockBootstrap(read_monthly_returns(returns), block, bootstrap)
+        mc = time_to_goal_bootstrap(V0, contrib, m, maxhorisont, paths, goal, seed)
+    elif holdings is not None:
+        from moneygoal.sim.multi_asset import time_to_goal_multi
+
+        a, values = holdings
+        _inst.count("mc_assets", len(values))
+        mc = time_to_goal_multi(values, contrib, a, maxhorisont, paths, goal, seed, rebalance)
+    else:
+        from moneygoal.sim.coarse import STEP_MONTHS
+        from moneygoal.sim.monte_carlo import time_to_goal_mc
+        from moneygoal.sim.returns import RegimeSwitching, StudentT
+
+        m = None  # lognormal
+        if model == "student-t":
+            m = StudentT(cagr, vol, df)
+        elif model == "regime":
+            m = RegimeSwitching(cagr, vol, bear_cagr, bear_vol, p_bear, p_recover)
+        mc = time_to_goal_mc(
+            V0, contrib, cagr, vol, maxhorisont, paths, goal, seed, model=m, compact=compact, shocks=_shocks,
+            step=STEP_MONTHS[step],
+        )
+    _inst.count("mc_paths", paths)
+    return mc
+
+
+def _report(mc):
+    """P10/P50/P90 i år och månader (rapport-CSV:ns innehåll)."""
+    import pandas as pd
+
+    return pd.DataFrame({
+        "percentile": ["P10", "P50", "P90"],
+        "years": [mc[k] // 12 for k in ("p10", "p50", "p90")],
+        "months": [mc[k] % 12 for k in ("p10", "p50", "p90")],
+    })
+
+
+def _raw_positions(positions):
+    return _raw_file(positions)
+
+
+def _raw_transactions(transactions):
+    return _raw_file(transactions)
+
+
+# positions och transactions är separata grenar; timer slår ihop deras tider
+# till samma diagnostics-kolumner (t_raw_s, t_read_s) som tidigare.
+STAGES = (
+    Stage("raw_positions", _raw_positions, ("positions",), persist=False, timer="raw"),
+    Stage("raw_transactions", _raw_transactions, ("transactions",), persist=False, timer="raw"),
+    Stage("validate", _validate, ("raw_positions", "raw_transactions")),
+    Stage("read_positions", _read_positions, ("raw_positions", "_inst"), timer="read"),
+    Stage("read_transactions", _read_transactions, ("raw_transactions", "_inst"), timer="read"),
+    Stage("V0", _v0, ("read_positions",), by_value=True),
+    Stage("ledger", _ledger, ("read_transactions",)),
+    Stage("contrib", _contrib, ("ledger", "dividends"), by_value=True),
+    Stage("holdings", _holdings, ("read_positions", "assumptions"), by_value=True),
+    Stage("xirr", _xirr, ("V0", "ledger", "asof", "dividends", "xirr_monthly", "_inst")),
+    Stage("mc", _mc, (
+        "V0", "contrib", "holdings", "goal", "cagr", "vol", "paths", "seed", "maxhorisont",
+        "model", "df", "bear_cagr", "bear_vol", "p_bear", "p_recover",
+        "returns", "block", "bootstrap", "rebalance", "compact", "step", "_inst", "_shocks",
+    )),
+    Stage("report", _report, ("mc",), persist=False),
+)
+
+# Standardvärden för mc-stegets modellparametrar (samma som CLI-flaggorna)
+MC_DEFAULTS = {
+    "model": "lognormal", "df": 5.0, "bear_cagr": -0.20, "bear_vol": 0.30,
+    "p_bear": 0.02, "p_recover": 0.10, "returns": None, "block": 12,
+    "bootstrap": "stationary", "assumptions": None, "rebalance": 0, "compact": False, "step": "month",
+    "dividends": "reinvest", "xirr_monthly": False, "_shocks": None,
+}
+
+
+def default_pipeline(cache_dir: str | Path | None = None, max_entries: int = MAX_ENTRIES) -> Pipeline:
+    """Standardkedjan (STAGES); cache_dir=None ⇒ bara minnescache."""
+    return Pipeline(STAGES, cache_dir, max_entries)
@@ -0,0 +1,359 @@
+# -------------------------------------------------------------------
+# Lokal HTTP/JSON-server som håller data och motorer varma.
+# Tanken är att:
+#   - interpretatorn, pandas och CSV-parsningen betalas EN gång per
+#     portfölj i stället för per CLI-anrop,
+#   - portföljer laddas via POST /portfolios och cachas (LRU, högst
+#     PORTFOLIO_CACHE_SIZE) på (sökväg, mtime, storlek) så att en ny export
+#     automatiskt ger en ny portfölj; en utträngd portfölj ger 404 och
+#     laddas om med samma anrop,
+#   - V0, månadsspar och XIRR räknas en gång per portfölj,
+#   - Monte Carlo (CPU-bundet) skickas till en processpool och resultatet
+#     cachas (LRU) på (portfölj, parametrar); samtidiga identiska anrop
+#     delar samma Future,
+#   - ThreadingHTTPServer svarar på många anrop samtidigt.
+#
+# Endpoints (JSON in/ut):
+#   GET  /health
+#   POST /portfolios    {"positions": path, "transactions": path}
+#   POST /time-to-goal  {"portfolio": id, "goal", "cagr"?, "vol"?, "paths"?, "seed"?, "horizon"?,
+#                        "dividends"?}
+#   POST /xirr          {"portfolio": id, "dividends"?}
+# dividends: "reinvest" (default) eller "cash", som CLI:ns --dividends.
+#
+# Körning:
+#   moneygoal serve [--host 127.0.0.1] [--port 8765] [--workers N]
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+__all__ = ["Portfolio", "MoneygoalService", "make_server", "main"]
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+RESULT_CACHE_SIZE = 1024
+PORTFOLIO_CACHE_SIZE = 64
+
+
+class RequestError(Exception):
+    """Fel i anropet (ger HTTP-status `status` och ett JSON-felmeddelande)."""
+
+    def __init__(self, msg: str, status: int = 400) -> None:
+        super().__init__(msg)
+        self.status = status
+
+
+@dataclass
+class Portfolio:
+    """En laddad portfölj: normaliserade frames + härledda, scenariooberoende mått."""
+
+    id: str
+    positions_path: str
+    transactions_path: str
+    df_pos: object
+    ledger: object
+    V0: float
+    mmc: float
+    _mmc: Dict[str, float] = field(default_factory=dict, repr=False)
+    _xirr: Dict[str, float] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def contrib(self, dividends: str = "reinvest") -> float:
+        """Snitt månadsspar för utdelningsläget (mmc = reinvest)."""
+        if dividends == "reinvest":
+            return self.mmc
+        with self._lock:
+            if dividends not in self._mmc:
+                from moneygoal.contrib import mean_monthly_contribution
+                from moneygoal.ledger import contribution_rows
+
+                self._mmc[dividends] = mean_monthly_contribution(contribution_rows(self.ledger, dividends))
+            return self._mmc[dividends]
+
+    def xirr(self, dividends: str = "reinvest") -> float:
+        """XIRR räknas vid första anropet per utdelningsläge och återanvänds sedan."""
+        with self._lock:
+            if dividends not in self._xirr:
+                from moneygoal.diagnostics import compute_xirr_from_ledger
+
+                self._xirr[dividends] = compute_xirr_from_ledger(self.ledger, self.V0, dividends=dividends)
+            return self._xirr[dividends]
+
+
+def _file_key(path: str) -> Tuple[str, int, int]:
+    p = Path(path)
+    if not p.is_file():
+        raise RequestError(f"fil saknas: {path}", status=404)
+    st = p.stat()
+    return str(p.resolve()), st.st_mtime_ns, st.st_size
+
+
+def _simulate(V0: float, mmc: float, params: dict) -> Dict[str, int]:
+    """Arbetarfunktion för processpoolen (tar bara skalärer)."""
+    from moneygoal.sim.monte_carlo import time_to_goal_mc
+
+    return time_to_goal_mc(
+        nuvarde=V0,
+        mean_monthly_contrib=mmc,
+        cagr=params["cagr"],
+        vol=params["vol"],
+        max_months=params["maxhorisont"],
+        paths=params["paths"],
+        goal=params["goal"],
+        seed=params["seed"],
+    )
+
+
+class MoneygoalService:
+    """
+    Trådsäker tjänst bakom HTTP-lagret: portföljcache, resultatcache och pool.
+    Kan också användas direkt (utan HTTP) från Python.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None, workers: Optional[int] = None,
+                 cache_size: int = RESULT_CACHE_SIZE,
+                 portfolio_cache_size: int = PORTFOLIO_CACHE_SIZE) -> None:
+        self._executor = executor or ProcessPoolExecutor(max_workers=workers)
+        self._own_executor = executor is None
+        self._portfolios: "OrderedDict[str, Portfolio]" = OrderedDict()
+        self._results: "OrderedDict[tuple, Future]" = OrderedDict()
+        self._cache_size = cache_size
+        self._portfolio_cache_size = portfolio_cache_size
+        self._lock = threading.Lock()
+
+    # --- portföljer ---
+    def load(self, positions: str, transactions: str) -> Portfolio:
+        """
+        Ladda (eller hämta cachad) portfölj. Nyckeln bygger på filernas
+        absoluta sökväg, mtime och storlek, så en ny export ger nytt id.
+        """
+        key = (_file_key(positions), _file_key(transactions))
+        pid = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            cached = self._portfolios.get(pid)
+            if cached is not None:
+                self._portfolios.move_to_end(pid)
+        if cached is not None:
+            return cached
+
+        from moneygoal.contrib import mean_monthly_contribution
+        from moneygoal.io.avanza_csv import read_positions, read_transactions
+        from moneygoal.ledger import build_ledger, contribution_rows
+
+        df_pos = read_positions(positions)
+        ledger = build_ledger(read_transactions(transactions))
+        pf = Portfolio(
+            id=pid,
+            positions_path=positions,
+            transactions_path=transactions,
+            df_pos=df_pos,
+            ledger=ledger,
+            V0=float(df_pos["Marknadsvärde"].sum()),
+            mmc=mean_monthly_contribution(contribution_rows(ledger)),
+        )
+        with self._lock:
+            # Två samtidiga laddningar av samma filer: behåll den första
+            pf = self._portfolios.setdefault(pid, pf)
+            self._portfolios.move_to_end(pid)
+            while len(self._portfolios) > self._portfolio_cache_size:
+                self._portfolios.popitem(last=False)
+            return pf
+
+    def get(self, pid: str) -> Portfolio:
+        with self._lock:
+            pf = self._portfolios.get(pid)
+            if pf is not None:
+                self._portfolios.move_to_end(pid)
+        if pf is None:
+            raise RequestError(f"okänd portfölj: {pid}", status=404)
+        return pf
+
+    # --- beräkningar ---
+    def time_to_goal(self, pid: str, params: dict) -> Tuple[Dict[str, int], bool]:
+        """
+        Returnerar (percentiler, cachad?). Identiska parametrar för samma
+        portfölj delar resultat, även när anropen pågår samtidigt.
+        """
+        from moneygoal.cli import param_errors
+
+        errs = param_errors(params["goal"], params["paths"], params["vol"],
+                            params["cagr"], params["maxhorisont"])
+        if errs:
+            raise RequestError("; ".join(errs))
+        pf = self.get(pid)
+        mmc = pf.contrib(params.get("dividends", "reinvest"))
+        key = (pid,) + tuple(sorted(params.items()))
+        with self._lock:
+            fut = self._results.get(key)
+            hit = fut is not None
+            if hit:
+                self._results.move_to_end(key)
+            else:
+                fut = self._executor.submit(_simulate, pf.V0, mmc, params)
+                self._results[key] = fut
+                while len(self._results) > self._cache_size:
+                    self._results.popitem(last=False)
+        try:
+            return fut.result(), hit
+        except Exception:
+            with self._lock:
+                self._results.pop(key, None)  # cacha inte fel
+            raise
+
+    def close(self) -> None:
+        if self._own_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _dividends_from(body: dict) -> str:
+    from moneygoal.ledger import DIVIDEND_MODES
+
+    mode = body.get("dividends", "reinvest")
+    if mode not in DIVIDEND_MODES:
+        raise RequestError(f"okänt utdelningsläge: {mode} (stöd: {', '.join(DIVIDEND_MODES)})")
+    return mode
+
+
+def _params_from(body: dict) -> dict:
+    """Plocka ut och typa simuleringsparametrar (default som CLI:n)."""
+    try:
+        return {
+            "goal": float(body["goal"]),
+            "cagr": float(body.get("cagr", 0.06)),
+            "vol": float(body.get("vol", 0.15)),
+            "paths": int(body.get("paths", 5000)),
+            "seed": int(body.get("seed", 42)),
+            "maxhorisont": int(body.get("horizon", body.get("maxhorisont", 600))),
+            "dividends": _dividends_from(body),
+        }
+    except KeyError as e:
+        raise RequestError(f"saknar fält: {e.args[0]}")
+    except (TypeError, ValueError) as e:
+        raise RequestError(f"ogiltigt värde: {e}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "moneygoal/0.1"
+    service: MoneygoalService  # sätts av make_server
+
+    def log_message(self, fmt: str, *args) -> None:  # via logging i stället för stderr
+        logging.getLogger("moneygoal.server").info(fmt, *args)
+
+    def _send(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        if n == 0:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(n))
+        except ValueError:
+            raise RequestError("ogiltig JSON")
+        if not isinstance(body, dict):
+            raise RequestError("JSON-objekt förväntas")
+        return body
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": f"okänd sökväg: {self.path}"})
+
+    def do_POST(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            body = self._body()
+            if self.path == "/portfolios":
+                if "positions" not in body or "transactions" not in body:
+                    raise RequestError("kräver 'positions' och 'transactions'")
+                pf = self.service.load(str(body["positions"]), str(body["transactions"]))
+                out = {"portfolio": pf.id, "V0": pf.V0, "mean_monthly_contrib": pf.mmc}
+            elif self.path == "/time-to-goal":
+                pid = str(body.get("portfolio", ""))
+                mc, cached = self.service.time_to_goal(pid, _params_from(body))
+                out = {"portfolio": pid, **mc, "cached": cached}
+            elif self.path == "/xirr":
+                dividends = _dividends_from(body)
+                pf = self.service.get(str(body.get("portfolio", "")))
+                out = {"portfolio": pf.id, "xirr": pf.xirr(dividends), "dividends": dividends}
+            else:
+                raise RequestError(f"okänd sökväg: {self.path}", status=404)
+        except RequestError as e:
+            self._send(e.status, {"error": str(e)})
+            return
+        except (KeyError, ValueError) as e:
+            self._send(422, {"error": str(e)})
+            return
+        except Exception as e:
+            logging.getLogger("moneygoal.server").exception("Anrop misslyckades")
+            self._send(500, {"error": str(e)})
+            return
+        out["ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        self._send(200, out)
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                service: Optional[MoneygoalService] = None,
+                workers: Optional[int] = None) -> ThreadingHTTPServer:
+    """
+    Bygg (men starta inte) servern. port=0 ⇒ ledig port väljs (bra i tester);
+    den faktiska porten finns i `server.server_address[1]`.
+    """
+    svc = service or MoneygoalService(workers=workers)
+    handler = type("Handler", (_Handler,), {"service": svc})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    httpd.service = svc  # type: ignore[attr-defined]
+    return httpd
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="moneygoal serve", description="Lokal JSON-server för tid till mål och XIRR.")
+    p.add_argument("--host", default=DEFAULT_HOST, help="Adress att lyssna på (default endast lokalt).")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port (0 = valfri ledig).")
+    p.add_argument("--workers", type=int, default=None, help="Processer för simulering (default: antal kärnor).")
+    args = p.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        print("ARGERROR: --workers måste vara ≥ 1", file=sys.stderr)
+        return 2
+
+    from moneygoal.logsetup import setup_logging
+
+    setup_logging("logs/app.log")
+    httpd = make_server(args.host, args.port, workers=args.workers)
+    host, port = httpd.server_address[:2]
+    logging.info(f"Serve start http://{host}:{port}")
+    print(f"moneygoal lyssnar på http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.service.close()
+        logging.info("Serve stop")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# -------------------------------------------------------------------
+# Block-bootstrap av historiska månadsavkastningar för tid till mål.
+# Tanken är att:
+#   - läsa en lokal CSV med månadsavkastningar (ingen extern data),
+#   - dra block av på varandra följande månader så att volatilitetskluster
+#     och utdragna nedgångar följer med (lognormala chocker underskattar dem),
+#   - stödja två scheman:
+#       stationary  blocklängd ~ Geometrisk(1/L), start likformig, cirkulär
+#                   (Politis & Romano); stationär serie i genomsnitt L mån/block
+#       moving      fasta block om L månader, start likformig i [0, T−L]
+#   - bygga index för alla banor på en gång: för varje (månad, bana) hittas
+#     senaste blockstart med np.maximum.accumulate, och index = start + offset.
+#     Ingen Python-loop per bana.
+# Resultatet är tillväxtfaktorer (1 + r) med form (månader, paths);
+# BlockBootstrap uppfyller ReturnModel-protokollet (sim/returns.py) och
+# kan ges direkt till engine.time_to_goal.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+__all__ = ["read_monthly_returns", "BlockBootstrap", "time_to_goal_bootstrap"]
+
+METHODS = ("stationary", "moving")
+# Kolumnnamn som tolkas som avkastning (skiftlägesokänsligt), annars sista kolumnen
+RETURN_COLUMNS = ("return", "returns", "avkastning", "r")
+
+
+def _parse_return(s: str) -> float:
+    """'1,5%' → 0.015, '-0,02' → -0.02, '0.01' → 0.01."""
+    s = str(s).strip().replace("\u00A0", "").replace(" ", "").replace(",", ".")
+    if s.endswith("%"):
+        return float(s[:-1]) / 100.0
+    return float(s)
+
+
+def read_monthly_returns(path: str | Path) -> np.ndarray:
+    """
+    Läs månadsavkastningar (decimal, t.ex. 0.012 = 1,2 %) från en lokal CSV.
+
+    Steg:
+    1. Läs som strängar; separator `,` eller `;` detekteras.
+    2. Välj kolumnen return/avkastning, annars den sista kolumnen.
+    3. Tolka svenskt decimalkomma och ev. %-tecken; tomma rader hoppas över.
+    4. Kräv minst 12 observationer och alla avkastningar > −100 %.
+    """
+    import pandas as pd
+
+    path = Path(path)
+    head = path.read_text(encoding="utf-8-sig").splitlines()[0]
+    sep = ";" if head.count(";") > head.count(",") else ","
+    df = pd.read_csv(path, sep=sep, dtype=str, encoding="utf-8-sig")
+    cols = {c.strip().lower(): c for c in df.columns}
+    col = next((cols[c] for c in RETURN_COLUMNS if c in cols), df.columns[-1])
+    raw = df[col].dropna()
+    raw = raw[raw.str.strip() != ""]
+    try:
+        r = np.array([_parse_return(v) for v in raw], dtype=float)
+    except ValueError as e:
+        raise ValueError(f"Kunde inte tolka avkastning i {path.name}: {e}") from None
+    if len(r) < 12:
+        raise ValueError(f"För kort avkastningsserie ({len(r)} mån, kräver ≥ 12)")
+    if np.any(r <= -1.0):
+        raise ValueError("Avkastningar måste vara > -100 %")
+    return r
+
+
+class BlockBootstrap:
+    """
+    Blockbootstrap över en serie månadsavkastningar.
+
+    factors(rng, months, paths) ger tillväxtfaktorer med form (months, paths).
+    """
+
+    def __init__(self, returns: np.ndarray, block: int = 12, method: str = "stationary") -> None:
+        returns = np.asarray(returns, dtype=float)
+        if method not in METHODS:
+            raise ValueError(f"Okänd bootstrap-metod: {method} (stöd: {', '.join(METHODS)})")
+        if block < 1:
+            raise ValueError("block måste vara ≥ 1")
+        if method == "moving" and block > len(returns):
+            raise ValueError("block får inte vara längre än serien")
+        self.block = int(block)
+        self.method = method
+        self.gross = 1.0 + returns          # tillväxtfaktor per historisk månad
+        self.n_obs = len(returns)
+        self._offsets: Optional[np.ndarray] = None  # förberäknat 0..M-1 (kolumnvektor)
+
+    def _offset_column(self, months: int) -> np.ndarray:
+        if self._offsets is None or len(self._offsets) < months:
+            self._offsets = np.arange(months, dtype=np.int64)[:, None]
+        return self._offsets[:months]
+
+    def indices(self, rng: np.random.Generator, months: int, paths: int) -> np.ndarray:
+        """
+        Index i serien, form (months, paths).
+
+        Steg:
+        1. Markera blockstarter: moving var L:e månad, stationary med
+           sannolikhet 1/L per månad (första månaden är alltid en start).
+        2. Dra en startposition per (månad, bana); bara blockstarternas används.
+        3. Senaste blockstart t0 per cell via maximum.accumulate över månader;
+           index = start[t0] + (t − t0), cirkulärt för stationary.
+        """
+        t = self._offset_column(months)
+        if self.method == "moving":
+            new = np.broadcast_to(t % self.block == 0, (months, paths))
+            start = rng.integers(0, self.n_obs - self.block + 1, size=(months, paths))
+        else:
+            new = rng.random((months, paths)) < 1.0 / self.block
+            new[0] = True
+            start = rng.integers(0, self.n_obs, size=(months, paths))
+        t0 = np.maximum.accumulate(np.where(new, t, 0), axis=0)
+        idx = np.take_along_axis(start, t0, axis=0) + (t - t0)
+        if self.method == "stationary":
+            idx %= self.n_obs
+        return idx
+
+    def factors(self, rng: np.random.Generator, months: int, paths: int) -> np.ndarray:
+        return self.gross[self.indices(rng, months, paths)]
+
+
+def time_to_goal_bootstrap(
+    nuvarde: float,
+    mean_monthly_contrib: float,
+    model: BlockBootstrap,
+    max_months: int,
+    paths: int,
+    goal: float,
+    seed: Optional[int] = None,
+    chunk: int = 10_000,
+) -> Dict[str, int]:
+    """Som time_to_goal_mc men med bootstrappade faktorer (se engine.time_to_goal)."""
+    from moneygoal.sim.engine import time_to_goal
+
+    return time_to_goal(nuvarde, mean_monthly_contrib, model, max_months, paths, goal, seed, chunk)
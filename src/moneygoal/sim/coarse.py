@@ -0,0 +1,126 @@
+# -------------------------------------------------------------------
+# Grova tidssteg (kvartal/år) med Brownian bridge-korrektion.
+# Tanken är att:
+#   - stega den lognormala modellen `step` månader i taget i stället för
+#     en månad: stegets marknadsavkastning är exakt
+#       ln F ~ N(k·mu, k·sigma²)        (summan av k månaders log-avkastning),
+#     och månadsspar under steget läggs till som om de växte längs
+#     bryggans medelbana: c · Σ_{j<k} F^{j/k} (sluten form, ingen loop),
+#   - bara banor som kan ha nått målet under steget förfinas. För en bana
+#     under målet i båda ändpunkterna är sannolikheten att en Brownian
+#     bridge (log-förmögenhet, varians k·sigma²) korsat b = ln(goal)
+#       P = exp(−2 (b − x0)(b − x1) / (k·sigma²)),
+#     och banor med slutvärde ≥ goal eller P ≥ eps förfinas,
+#   - förfiningen drar stegets k månadschocker villkorat på summan
+#     (w − mean(w) + z/√k, exakt fördelning för normala chocker) och räknar
+#     månadsförmögenheten i sluten form V_j = P_j (V_0 + c Σ_{i≤j} 1/P_i),
+#     så träffmånaden bestäms med samma månadsvisa kontroll som motorn och
+#     den förfinade banan fortsätter från sitt exakta slutvärde,
+#   - träffade banor plockas bort efter varje steg, så arbetet krymper.
+# Antal sekventiella steg: ceil(M/step) i stället för M (3× resp. 12×).
+#
+# Tolerans mot månadsmotorn (time_to_goal_mc, samma parametrar, olika
+# slumpström): P10/P50/P90 inom TOLERANCE_MONTHS plus Monte Carlo-bruset
+# för antalet paths. Felet kommer från (a) banor med P < eps som inte
+# förfinas (varje sådan bana missar en träff med sannolikhet < eps per steg
+# och träffar då normalt steget efter) och (b) att månadssparets spridning
+# inom ett steg ersätts av bryggans medelbana (andra ordningens effekt,
+# relativt ≈ sigma²·k/8 av sparets bidrag). Verifieras i
+# tests/test_coarse.py och sviten `coarse` i benchmarks/run.py.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+import numpy as np
+
+from moneygoal.sim.kernel import lognormal_params
+
+__all__ = ["hitting_months_bridge", "STEP_MONTHS", "BRIDGE_EPS", "TOLERANCE_MONTHS"]
+
+STEP_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+BRIDGE_EPS = 1e-4
+TOLERANCE_MONTHS = 2
+
+
+def hitting_months_bridge(
+    nuvarde: float,
+    mean_monthly_contrib: float,
+    cagr: float,
+    vol: float,
+    goal: float,
+    months: int,
+    paths: int,
+    step: int,
+    rng: np.random.Generator,
+    eps: float = BRIDGE_EPS,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Träffmånad (1..M, M+1 = ej nått) per bana med grova steg om `step` månader.
+
+    Steg (per tidssteg om k = min(step, kvarvarande) månader):
+    1. Dra en chock per levande bana: ln F = k·mu + sigma·√k·z.
+    2. Grovt slutvärde V·F + c·Σ F^{j/k}.
+    3. Bryggsannolikhet P för korsning inom steget; välj banor att förfina.
+    4. Förfina: villkorade månadschocker → månadsförmögenhet → första
+       månad ≥ goal; exakt slutvärde för förfinade banor.
+    5. Ta bort träffade banor.
+    """
+    if step < 1:
+        raise ValueError("step måste vara ≥ 1")
+    if out is None or out.shape != (paths,):
+        out = np.empty(paths, dtype=np.int64)
+    out.fill(months + 1)
+    if nuvarde >= goal:
+        out.fill(0)
+        return out
+
+    mu, sigma = lognormal_params(cagr, vol)
+    c = float(mean_monthly_contrib)
+    b = math.log(goal)
+    v = np.full(paths, float(nuvarde))
+    live = np.arange(paths)
+    t = 0
+    while t < months and live.size:
+        k = min(step, months - t)
+        n = live.size
+        z = rng.standard_normal(n)
+        log_f = k * mu + sigma * math.sqrt(k) * z
+        if k == 1:
+            v_end = v * np.exp(log_f) + c
+            done = np.flatnonzero(v_end >= goal)
+            out[live[done]] = t + 1
+        else:
+            # c · Σ_{j<k} F^{j/k} = c · (F − 1) / (F^{1/k} − 1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                annuity = np.where(np.abs(log_f) > 1e-12, np.expm1(log_f) / np.expm1(log_f / k), float(k))
+            v_end = v * np.exp(log_f) + c * annuity
+
+            refine = v_end >= goal
+            if sigma > 0.0:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    gap0, gap1 = b - np.log(v), b - np.log(v_end)
+                    p = np.exp(-2.0 * gap0 * gap1 / (k * sigma * sigma))
+                refine |= p >= eps
+            ri = np.flatnonzero(refine)
+            done = ri[:0]
+            if ri.size:
+                w = rng.standard_normal((k, ri.size))
+                w -= w.mean(axis=0)
+                w += z[ri] / math.sqrt(k)
+                log_p = np.cumsum(mu + sigma * w, axis=0)
+                growth = np.exp(log_p)
+                wealth = growth * (v[ri] + c * np.cumsum(1.0 / growth, axis=0))
+                above = wealth >= goal
+                hit = above.any(axis=0)
+                done = ri[hit]
+                out[live[done]] = t + above[:, hit].argmax(axis=0) + 1
+                v_end[ri] = wealth[-1]
+        keep = np.ones(n, dtype=bool)
+        keep[done] = False
+        v, live = v_end[keep], live[keep]
+        t += k
+    return out
@@ -0,0 +1,149 @@
+# -------------------------------------------------------------------
+# Modellagnostisk motor för tid till mål.
+# Tanken är att:
+#   - motorn bara tar emot en ReturnModel (sim/returns.py) och ber den om
+#     tillväxtfaktorer för ett block av banor,
+#   - faktorerna matas in i den vektoriserade kärnan (kernel.hitting_months),
+#   - banorna körs i bitar om `chunk` så att minnet är begränsat även vid
+#     100k+ paths (faktormatrisen per bit är months × chunk),
+#   - percentilerna beräknas med samma indexregel som tidigare
+#     (kernel.percentiles), och bana som inte når målet räknas som M+1.
+#
+# Kompakt läge (compact=True) för mycket stora körningar:
+#   - faktorbuffert (M × chunk, float32), förmögenhet (float32), uint16
+#     träffmånader och bool-masker allokeras en gång och återanvänds för
+#     varje bit; modeller med fill() skriver faktorerna direkt i bufferten,
+#   - träffmånaderna summeras i ett histogram (M+2 räknare) per bit, så
+#     minnet beror på chunk och horisont men inte på antal paths,
+#   - noggrannhet mot float64: percentiler inom ±1 månad som empirisk
+#     tolerans (mätt i tests/test_compact.py, ingen garanti; se kernel.py).
+#
+# Delad shock bank (shocks=ShockStore, sim/shockbank.py): för lognormal-
+# modellen med seed läses chockerna ur en minnesmappad .npy i stället för
+# att dras. Banken har samma blocklayout som bitarna här, så resultatet är
+# bit-identiskt med och utan bank; faktorerna räknas månad för månad direkt
+# ur mappningen (kernel.hitting_months_lognormal), utan kopia.
+#
+# Grova tidssteg (step=3/12, endast lognormal): sim/coarse.py stegar ett
+# kvartal/år i taget och förfinar bara banor som kan ha korsat målet inom
+# steget (Brownian bridge). Ingen faktormatris; tolerans i coarse.py.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from moneygoal.sim.kernel import (
+    COMPACT_MAX_MONTHS, hitting_months, hitting_months_compact, hitting_months_lognormal,
+    percentiles, percentiles_from_counts,
+)
+from moneygoal.sim.coarse import hitting_months_bridge
+from moneygoal.sim.returns import Lognormal, ReturnModel
+
+__all__ = ["time_to_goal", "DEFAULT_CHUNK"]
+
+DEFAULT_CHUNK = 10_000
+
+
+def time_to_goal(
+    nuvarde: float,
+    mean_monthly_contrib: float,
+    model: ReturnModel,
+    max_months: int,
+    paths: int,
+    goal: float,
+    seed: Optional[int] = None,
+    chunk: int = DEFAULT_CHUNK,
+    compact: bool = False,
+    shocks=None,
+    step: int = 1,
+) -> Dict[str, int]:
+    """
+    Returnerar {"p10": månader, "p50": månader, "p90": månader}.
+
+    Steg:
+    1. Validera indata och kortslut {0,0,0} om nuvarde ≥ goal.
+    2. För varje bit av banor: model.factors(rng, max_months, n) → kärnan
+       (compact=True: float32-buffertar och histogram; shocks: chocker ur
+       delad bank; step > 1: grova steg, se modulhuvudet).
+    3. Percentiler över alla banors träffmånader.
+    """
+    if nuvarde < 0:
+        raise ValueError("nuvarde måste vara ≥ 0")
+    if mean_monthly_contrib < 0:
+        raise ValueError("mean_monthly_contrib måste vara ≥ 0")
+    if paths < 100:
+        raise ValueError("paths måste vara ≥ 100")
+    if max_months < 1:
+        raise ValueError("max_months måste vara ≥ 1")
+    if goal <= 0.0:
+        raise ValueError("goal måste vara > 0")
+    if compact and max_months > COMPACT_MAX_MONTHS:
+        raise ValueError(f"max_months får vara högst {COMPACT_MAX_MONTHS} i kompakt läge")
+    if step < 1:
+        raise ValueError("step måste vara ≥ 1")
+    if step > 1 and (compact or type(model) is not Lognormal):
+        raise ValueError("step > 1 kräver lognormal-modellen och kan inte kombineras med kompakt läge")
+    if nuvarde >= goal:
+        return {"p10": 0, "p50": 0, "p90": 0}
+
+    rng = np.random.default_rng(seed)
+    if step > 1:
+        months = hitting_months_bridge(
+            nuvarde, mean_monthly_contrib, model.cagr, model.vol, goal, max_months, paths, step, rng
+        )
+        return percentiles(months)
+    if compact:
+        return _time_to_goal_compact(nuvarde, mean_monthly_contrib, model, max_months, paths, goal, rng, chunk)
+    months = np.empty(paths, dtype=np.int64)
+    z = None
+    if shocks is not None and type(model) is Lognormal:
+        z = shocks.get(seed, max_months, paths, block=min(chunk, paths))
+    if z is not None:
+        buf = np.empty(min(chunk, paths))
+        for lo in range(0, paths, chunk):
+            n = min(chunk, paths - lo)
+            months[lo:lo + n] = hitting_months_lognormal(
+                nuvarde, mean_monthly_contrib, z[:, lo:lo + n], model.cagr, model.vol, goal, buf[:n]
+            )
+        return percentiles(months)
+    for lo in range(0, paths, chunk):
+        n = min(chunk, paths - lo)
+        f = model.factors(rng, max_months, n)
+        months[lo:lo + n] = hitting_months(nuvarde, mean_monthly_contrib, f, goal)
+    return percentiles(months)
+
+
+def _time_to_goal_compact(
+    nuvarde: float,
+    mean_monthly_contrib: float,
+    model: ReturnModel,
+    max_months: int,
+    paths: int,
+    goal: float,
+    rng: np.random.Generator,
+    chunk: int,
+) -> Dict[str, int]:
+    """Kompakt läge: alla buffertar allokeras här, en gång, och återanvänds."""
+    size = min(chunk, paths)
+    f_buf = np.empty((max_months, size), dtype=np.float32)
+    out = np.empty(size, dtype=np.uint16)
+    v = np.empty(size, dtype=np.float32)
+    live = np.empty(size, dtype=bool)
+    hit = np.empty(size, dtype=bool)
+    counts = np.zeros(max_months + 2, dtype=np.int64)
+    fill = getattr(model, "fill", None)
+
+    for lo in range(0, paths, size):
+        n = min(size, paths - lo)
+        # Sista biten kan vara kortare: sammanhängande vy över samma minne
+        f = f_buf if n == size else f_buf.reshape(-1)[: max_months * n].reshape(max_months, n)
+        if fill is not None:
+            fill(rng, f)
+        else:
+            np.copyto(f, model.factors(rng, max_months, n), casting="same_kind")
+        hitting_months_compact(nuvarde, mean_monthly_contrib, f, goal, out[:n], v[:n], live[:n], hit[:n])
+        counts += np.bincount(out[:n], minlength=max_months + 2)
+    return percentiles_from_counts(counts)
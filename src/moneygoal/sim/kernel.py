@@ -0,0 +1,208 @@
+# -------------------------------------------------------------------
+# Vektoriserad simuleringskärna (numpy) för tid till mål.
+# Samma modell som time_to_goal_mc:
+#   sigma = vol / sqrt(12)
+#   mu    = ln(1+CAGR)/12 - 0.5*sigma^2
+#   V_m   = V_{m-1} * exp(mu + sigma*z_m) + månadsspar
+# men alla banor uppdateras samtidigt, månad för månad, och slumpen kan
+# ges utifrån som en fast "shock bank" (standardnormala z, form
+# (månader, paths)). Med en fast bank blir resultatet en deterministisk
+# och monoton funktion av parametrarna, vilket inverslösaren och
+# what-if-reglagen bygger på.
+#
+# Kompakt läge (hitting_months_compact): float32-förmögenhet, uint16
+# träffmånader och buffertar som anroparen allokerar en gång. Noggrannhet
+# jämfört med float64 på samma faktorer: faktorn, multiplikationen och
+# additionen avrundas till 2^-24 varje månad, så förmögenhetens relativa fel
+# efter M månader är av storleksordningen 3·M·2^-24 (≈ 10^-4 vid M = 600).
+# Det ger INGEN garanti för träffmånaden: en bana som ligger inom det bandet
+# kring målet i flera månader kan få sin träffmånad flyttad godtyckligt
+# långt. Toleransen ±1 månad för percentilerna är därför empirisk: den mäts
+# i tests/test_compact.py för flera parameteruppsättningar (där ingen bana
+# av 20 000 byter träffmånad).
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+__all__ = [
+    "shock_bank", "lognormal_params", "lognormal_factors",
+    "hitting_months", "hitting_months_lognormal", "hitting_months_compact",
+    "percentiles", "percentiles_from_counts", "COMPACT_MAX_MONTHS",
+]
+
+# Största horisont i kompakt läge: M+1 ("ej nått") måste rymmas i uint16
+COMPACT_MAX_MONTHS = int(np.iinfo(np.uint16).max) - 1
+
+
+def shock_bank(seed: Optional[int], paths: int, months: int) -> np.ndarray:
+    """Standardnormala chocker, form (months, paths), månad-major för snabb radåtkomst."""
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((months, paths))
+
+
+def lognormal_params(cagr: float, vol: float) -> tuple[float, float]:
+    """(mu, sigma) per månad för den lognormala modellen."""
+    sigma = vol / (12.0 ** 0.5)
+    mu = math.log(1.0 + cagr) / 12.0 - 0.5 * sigma * sigma
+    return mu, sigma
+
+
+def lognormal_factors(z: np.ndarray, cagr: float, vol: float) -> np.ndarray:
+    """Månadsfaktorer exp(mu + sigma*z) för en shock bank z (samma form som z)."""
+    mu, sigma = lognormal_params(cagr, vol)
+    if sigma == 0.0:
+        return np.full(z.shape, math.exp(mu))
+    return np.exp(mu + sigma * z)
+
+
+def hitting_months(
+    nuvarde: float, mean_monthly_contrib: float, factors: np.ndarray, goal: float
+) -> np.ndarray:
+    """
+    Första månad (1..M) då varje bana når goal, annars M+1.
+
+    Input:
+        factors: tillväxtfaktorer, form (M, paths).
+
+    Steg:
+    1. Starta alla banor i nuvarde; markera banor som redan nått målet (0).
+    2. För varje månad: uppdatera alla banor i ett vektorsteg och
+       registrera nya träffar.
+    3. Avbryt tidigt när alla banor nått målet.
+    """
+    M, n = factors.shape
+    out = np.full(n, M + 1, dtype=np.int64)
+    if nuvarde >= goal:
+        out[:] = 0
+        return out
+    v = np.full(n, float(nuvarde))
+    live = np.ones(n, dtype=bool)
+    for m in range(M):
+        v *= factors[m]
+        v += mean_monthly_contrib
+        hit = live & (v >= goal)
+        if hit.any():
+            out[hit] = m + 1
+            live &= ~hit
+            if not live.any():
+                break
+    return out
+
+
+def hitting_months_lognormal(
+    nuvarde: float,
+    mean_monthly_contrib: float,
+    z: np.ndarray,
+    cagr: float,
+    vol: float,
+    goal: float,
+    buf: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Som hitting_months(nuvarde, c, lognormal_factors(z, cagr, vol), goal) men
+    utan att materialisera hela faktormatrisen: faktorerna för månad m räknas
+    in-place i `buf` (längd paths) först när månaden behövs. Vid tidigt
+    avslut (alla banor i mål) räknas resten av z aldrig.
+    """
+    M, n = z.shape
+    out = np.full(n, M + 1, dtype=np.int64)
+    if nuvarde >= goal:
+        out[:] = 0
+        return out
+    mu, sigma = lognormal_params(cagr, vol)
+    if buf is None or buf.shape != (n,):
+        buf = np.empty(n)
+    v = np.full(n, float(nuvarde))
+    live = np.ones(n, dtype=bool)
+    growth = math.exp(mu)
+    for m in range(M):
+        if sigma == 0.0:
+            v *= growth
+        else:
+            np.multiply(z[m], sigma, out=buf)
+            buf += mu
+            np.exp(buf, out=buf)
+            v *= buf
+        v += mean_monthly_contrib
+        hit = live & (v >= goal)
+        if hit.any():
+            out[hit] = m + 1
+            live &= ~hit
+            if not live.any():
+                break
+    return out
+
+
+def hitting_months_compact(
+    nuvarde: float,
+    mean_monthly_contrib: float,
+    factors: np.ndarray,
+    goal: float,
+    out: np.ndarray,
+    v: np.ndarray,
+    live: np.ndarray,
+    hit: np.ndarray,
+) -> np.ndarray:
+    """
+    Som hitting_months men helt in-place i förallokerade buffertar:
+        factors: float32, form (M, n)
+        out:     uint16, längd n (resultat; M+1 = ej nått)
+        v:       float32, längd n (förmögenhet)
+        live, hit: bool, längd n
+    Ingen ny array skapas per månad. Returnerar `out`.
+    """
+    M = factors.shape[0]
+    out.fill(M + 1)
+    if nuvarde >= goal:
+        out.fill(0)
+        return out
+    g = np.float32(goal)
+    c = np.float32(mean_monthly_contrib)
+    v.fill(nuvarde)
+    live.fill(True)
+    for m in range(M):
+        v *= factors[m]
+        v += c
+        np.greater_equal(v, g, out=hit)
+        hit &= live
+        if hit.any():
+            out[hit] = m + 1
+            live ^= hit
+            if not live.any():
+                break
+    return out
+
+
+def percentiles_from_counts(counts: np.ndarray) -> Dict[str, int]:
+    """
+    P10/P50/P90 ur ett histogram över träffmånader (counts[m] = antal banor
+    med månad m), med samma indexregel som percentiles().
+    """
+    cum = np.cumsum(counts)
+    n = int(cum[-1])
+
+    def pct(p: int) -> int:
+        k = max(0, min(n - 1, int(round((p / 100.0) * (n - 1)))))
+        return int(np.searchsorted(cum, k, side="right"))
+
+    return {"p10": pct(10), "p50": pct(50), "p90": pct(90)}
+
+
+def percentiles(months: np.ndarray) -> Dict[str, int]:
+    """
+    P10/P50/P90 med samma indexregel som time_to_goal_mc:
+    k = round(p/100 * (n-1)) i sorterad ordning.
+    """
+    vals = np.sort(np.asarray(months))
+    n = len(vals)
+
+    def pct(p: int) -> int:
+        k = max(0, min(n - 1, int(round((p / 100.0) * (n - 1)))))
+        return int(vals[k])
+
+    return {"p10": pct(10), "p50": pct(50), "p90": pct(90)}
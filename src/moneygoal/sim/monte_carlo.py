@@ -1,8 +1,9 @@
 from __future__ import annotations
-import math
-import random
 from typing import Dict, Optional
 
+from moneygoal.sim.engine import time_to_goal
+from moneygoal.sim.returns import Lognormal, ReturnModel
+
 def time_to_goal_mc(
     nuvarde: float,
     mean_monthly_contrib: float,
@@ -12,14 +13,27 @@ def time_to_goal_mc(
     paths: int,
     goal: float,
     seed: Optional[int] = None,
+    model: Optional[ReturnModel] = None,
+    compact: bool = False,
+    shocks=None,
+    step: int = 1,
 ) -> Dict[str, int]:
     """
     Returnerar {"p10": månader, "p50": månader, "p90": månader}.
-    Modell: månadsfaktor ~ lognormal med
+    Modell (default): månadsfaktor ~ lognormal med
       sigma = vol / sqrt(12)
       mu = ln(1+CAGR)/12 - 0.5*sigma^2
     Om vol=0 används deterministisk månadsfaktor (1+CAGR)^(1/12).
+    Med `model` (se sim/returns.py, t.ex. StudentT eller RegimeSwitching)
+    används den i stället; cagr/vol valideras ändå men styr då inte slumpen.
     Stoppar bana när värde >= goal eller när max_months nåtts.
+    Simuleringen körs vektoriserat av engine.time_to_goal (numpy);
+    compact=True ger float32/uint16-läget för mycket många paths.
+    shocks (sim/shockbank.ShockStore) läser lognormala chocker ur en delad,
+    minnesmappad bank i stället för att dra dem; resultatet är identiskt.
+    step=3/12 stegar kvartals-/årsvis med Brownian bridge-korrektion
+    (sim/coarse.py, endast lognormal); percentiler inom en dokumenterad
+    tolerans från månadsstegningen.
     """
     # --- validering ---
     if nuvarde < 0:
@@ -37,43 +51,9 @@ def time_to_goal_mc(
     if goal <= 0.0:
         raise ValueError("goal måste vara > 0")
 
-    # snabbavslut
-    if nuvarde >= goal:
-        return {"p10": 0, "p50": 0, "p90": 0}
-
-    rng = random.Random(seed)
-
-    # --- simulering ---
-    vals = []
-
-    if vol <= 0.0:
-        # deterministiskt scenario
-        growth = (1.0 + cagr) ** (1.0 / 12.0) if cagr != 0.0 else 1.0
-        for _ in range(paths):
-            v = nuvarde
-            m = 0
-            while m < max_months and v < goal:
-                v = v * growth + mean_monthly_contrib
-                m += 1
-            vals.append(m if v >= goal else max_months + 1)
-    else:
-        sigma = vol / (12.0 ** 0.5)
-        mu = math.log(1.0 + cagr) / 12.0 - 0.5 * sigma * sigma
-        for _ in range(paths):
-            v = nuvarde
-            m = 0
-            while m < max_months and v < goal:
-                z = rng.gauss(0.0, 1.0)  # N(0,1)
-                factor = math.exp(mu + sigma * z)
-                v = v * factor + mean_monthly_contrib
-                m += 1
-            vals.append(m if v >= goal else max_months + 1)
-
-    vals.sort()
-
-    def pct(p: int) -> int:
-        # enkel percentil via index
-        k = max(0, min(len(vals) - 1, int(round((p / 100.0) * (len(vals) - 1)))))
-        return int(vals[k])
-
-    return {"p10": pct(10), "p50": pct(50), "p90": pct(90)}
+    # --- simulering: motorn är agnostisk; modellen ger tillväxtfaktorerna ---
+    if model is None:
+        model = Lognormal(cagr, vol)
+    return time_to_goal(
+        nuvarde, mean_monthly_contrib, model, max_months, paths, goal, seed, compact=compact, shocks=shocks, step=step,
+    )
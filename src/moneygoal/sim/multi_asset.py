@@ -0,0 +1,222 @@
+# -------------------------------------------------------------------
+# Korrelerad simulering per innehav (ISIN) för tid till mål.
+# Tanken är att:
+#   - läsa antaganden (CAGR, vol per ISIN eller tillgångsklass) och en
+#     korrelationsmatris från en lokal fil (TOML eller JSON),
+#   - slå ihop innehaven i positions.csv till en vikt per antagandenyckel,
+#     så att simuleringen bara har lika många dimensioner som nycklar,
+#   - simulera korrelerade lognormala avkastningar via en Cholesky-faktor:
+#       log-avkastning_m = mu + z_m @ B,   B = L.T * sigma,  L L.T = korr,
+#     vektoriserat över (banor × tillgångar), en matrismultiplikation per månad,
+#   - fördela månadsspar efter startvikterna och (valfritt) ombalansera
+#     till dem var k:e månad,
+#   - komprimera bort banor som nått målet, så att sena månader blir billiga.
+# Per tillgång är modellen densamma som time_to_goal_mc (lognormal, samma
+# mu/sigma), och percentilerna beräknas med samma indexregel.
+#
+# Filformat (TOML; JSON med samma nycklar fungerar också):
+#   default = "STOCK"                  # valfri reservnyckel
+#   correlation = [[1.0, 0.6],         # i samma ordning som [[asset]];
+#                  [0.6, 1.0]]         # utelämnad ⇒ okorrelerat
+#   [[asset]]
+#   key = "SE0000108656"               # ISIN, eller värde i kolumnen Typ
+#   cagr = 0.07
+#   vol = 0.20
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from moneygoal.sim.kernel import percentiles
+
+__all__ = [
+    "AssetAssumptions", "read_assumptions", "asset_values",
+    "correlation_factor", "time_to_goal_multi",
+]
+
+
+@dataclass(frozen=True)
+class AssetAssumptions:
+    """Antaganden per nyckel (ISIN eller tillgångsklass) + korrelationsmatris."""
+
+    keys: Tuple[str, ...]
+    cagr: np.ndarray
+    vol: np.ndarray
+    corr: np.ndarray
+    default: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        n = len(self.keys)
+        if n == 0:
+            raise ValueError("Antagandefilen saknar tillgångar")
+        if len(set(self.keys)) != n:
+            raise ValueError("Dubblerade nycklar i antagandefilen")
+        if self.cagr.shape != (n,) or self.vol.shape != (n,):
+            raise ValueError("cagr/vol måste finnas för varje tillgång")
+        if np.any(self.cagr <= -1.0) or np.any(self.vol < 0.0):
+            raise ValueError("cagr måste vara > -1 och vol ≥ 0")
+        if self.corr.shape != (n, n):
+            raise ValueError(f"Korrelationsmatrisen måste vara {n}×{n}")
+        if not np.allclose(self.corr, self.corr.T) or not np.allclose(np.diag(self.corr), 1.0):
+            raise ValueError("Korrelationsmatrisen måste vara symmetrisk med ettor på diagonalen")
+        if np.any(np.abs(self.corr) > 1.0 + 1e-12):
+            raise ValueError("Korrelationer måste ligga i [-1,1]")
+        if self.default is not None and self.default not in self.keys:
+            raise ValueError(f"default={self.default!r} saknas bland tillgångarna")
+
+    def subset(self, keys: Tuple[str, ...]) -> "AssetAssumptions":
+        """Antaganden begränsade till `keys` (i den ordningen)."""
+        idx = [self.keys.index(k) for k in keys]
+        return AssetAssumptions(
+            keys=tuple(keys),
+            cagr=self.cagr[idx],
+            vol=self.vol[idx],
+            corr=self.corr[np.ix_(idx, idx)],
+        )
+
+
+def read_assumptions(path: str | Path) -> AssetAssumptions:
+    """Läs antaganden från TOML eller JSON (avgörs av filändelsen)."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".toml":
+        from moneygoal.io.tomlfile import load_toml
+
+        data = load_toml(path)
+    elif suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        raise ValueError(f"Okänt antagandeformat: {path.suffix} (stöd: .toml, .json)")
+
+    assets = data.get("asset", data.get("assets", []))
+    try:
+        keys = tuple(str(a["key"]).strip() for a in assets)
+        cagr = np.array([float(a["cagr"]) for a in assets])
+        vol = np.array([float(a["vol"]) for a in assets])
+    except KeyError as e:
+        raise ValueError(f"Tillgång saknar fältet {e.args[0]!r}") from None
+    corr = data.get("correlation")
+    corr = np.eye(len(keys)) if corr is None else np.asarray(corr, dtype=float)
+    return AssetAssumptions(keys, cagr, vol, corr, data.get("default"))
+
+
+def asset_values(df_pos, assumptions: AssetAssumptions) -> Tuple[AssetAssumptions, np.ndarray]:
+    """
+    Slå ihop Marknadsvärde per antagandenyckel.
+
+    Steg:
+    1. Varje rad matchas på ISIN, annars på kolumnen Typ (om den finns),
+       annars på filens default-nyckel.
+    2. Rader som inte matchar något ger KeyError med de okända ISIN:en.
+    3. Returnera (antaganden för använda nycklar, värde per nyckel).
+    """
+    keys = set(assumptions.keys)
+    isin = df_pos["ISIN"].astype(str).str.strip()
+    key = isin.where(isin.isin(keys))
+    if "Typ" in df_pos.columns:
+        typ = df_pos["Typ"].astype(str).str.strip()
+        key = key.fillna(typ.where(typ.isin(keys)))
+    if assumptions.default is not None:
+        key = key.fillna(assumptions.default)
+    if key.isna().any():
+        unknown = sorted(isin[key.isna()].unique())
+        raise KeyError(f"Saknar antaganden för ISIN: {unknown}")
+
+    sums = df_pos["Marknadsvärde"].groupby(key.to_numpy()).sum()
+    used = tuple(k for k in assumptions.keys if k in sums.index)
+    return assumptions.subset(used), sums.reindex(list(used)).to_numpy(dtype=float)
+
+
+def correlation_factor(corr: np.ndarray) -> np.ndarray:
+    """
+    Faktor L med L @ L.T = corr. Cholesky i första hand; för positivt
+    semidefinita matriser (t.ex. korrelation 1 mellan två tillgångar) används
+    egenvärdesuppdelning. Ej semidefinit ⇒ ValueError.
+    """
+    try:
+        return np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        w, v = np.linalg.eigh(corr)
+        if w.min() < -1e-10:
+            raise ValueError("Korrelationsmatrisen är inte positivt semidefinit") from None
+        return v * np.sqrt(np.clip(w, 0.0, None))
+
+
+def time_to_goal_multi(
+    values: np.ndarray,
+    mean_monthly_contrib: float,
+    assumptions: AssetAssumptions,
+    max_months: int,
+    paths: int,
+    goal: float,
+    seed: Optional[int] = None,
+    rebalance_months: int = 0,
+) -> Dict[str, int]:
+    """
+    Returnerar {"p10": månader, "p50": månader, "p90": månader} för en
+    portfölj med startvärde `values` per tillgång (samma ordning som
+    assumptions.keys). Bana som inte når målet räknas som max_months+1.
+
+    rebalance_months: ombalansera till startvikterna var k:e månad (0 = aldrig).
+    """
+    values = np.asarray(values, dtype=float)
+    A = len(assumptions.keys)
+    if values.shape != (A,):
+        raise ValueError("values måste ha ett värde per tillgång")
+    if np.any(values < 0):
+        raise ValueError("values måste vara ≥ 0")
+    if mean_monthly_contrib < 0:
+        raise ValueError("mean_monthly_contrib måste vara ≥ 0")
+    if paths < 100:
+        raise ValueError("paths måste vara ≥ 100")
+    if max_months < 1:
+        raise ValueError("max_months måste vara ≥ 1")
+    if goal <= 0.0:
+        raise ValueError("goal måste vara > 0")
+    if rebalance_months < 0:
+        raise ValueError("rebalance_months måste vara ≥ 0")
+
+    V0 = float(values.sum())
+    if V0 >= goal:
+        return {"p10": 0, "p50": 0, "p90": 0}
+
+    # Startvikter styr både månadsspar och ombalansering
+    w = values / V0 if V0 > 0 else np.full(A, 1.0 / A)
+    contrib = mean_monthly_contrib * w
+
+    # Samma per-tillgångsmodell som time_to_goal_mc
+    sigma = assumptions.vol / np.sqrt(12.0)
+    mu = np.log1p(assumptions.cagr) / 12.0 - 0.5 * sigma * sigma
+    B = correlation_factor(assumptions.corr).T * sigma  # (A, A)
+
+    rng = np.random.default_rng(seed)
+    out = np.full(paths, max_months + 1, dtype=np.int64)
+    idx = np.arange(paths)                 # levande banors ursprungsindex
+    V = np.tile(values, (paths, 1))        # (levande banor, A)
+    # Förallokerade buffertar; de första n raderna används när banor fallit bort
+    z_buf, r_buf = np.empty((paths, A)), np.empty((paths, A))
+    for m in range(max_months):
+        n = len(idx)
+        z, r = z_buf[:n], r_buf[:n]
+        rng.standard_normal(out=z)
+        np.matmul(z, B, out=r)
+        r += mu
+        np.exp(r, out=r)
+        V *= r
+        V += contrib
+        if rebalance_months and (m + 1) % rebalance_months == 0:
+            V[:] = V.sum(axis=1, keepdims=True) * w
+        hit = V.sum(axis=1) >= goal
+        if hit.any():
+            out[idx[hit]] = m + 1
+            keep = ~hit
+            idx, V = idx[keep], V[keep]
+            if len(idx) == 0:
+                break
+    return percentiles(out)
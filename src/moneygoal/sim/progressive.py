@@ -0,0 +1,202 @@
+# -------------------------------------------------------------------
+# Progressiv, avbrytbar Monte Carlo för tid till mål.
+# Tanken är att:
+#   - köra simuleringen i bitar (chunks) av banor med den vektoriserade
+#     kärnan, med växande bitstorlek så att första svaret kommer snabbt,
+#   - efter varje bit publicera preliminära P10/P50/P90 tillsammans med
+#     ett konvergensmått (95 %-intervall för varje percentil i månader),
+#   - kunna avbrytas mellan bitar (cancel-event) och självdö om ingen
+#     längre läser resultatet (övergiven UI-session),
+#   - hålla minnet konstant: träffmånader ackumuleras i ett histogram
+#     (månad 0..M+1) i stället för att alla banor sparas.
+# Resultatet är deterministiskt för givet seed och bitschema.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from moneygoal.sim.kernel import hitting_months
+from moneygoal.sim.returns import Lognormal, ReturnModel
+
+__all__ = ["Progress", "iter_time_to_goal", "BackgroundRun"]
+
+PERCENTILES = (10, 50, 90)
+
+
+@dataclass
+class Progress:
+    """Ögonblicksbild efter en färdig bit."""
+
+    paths_done: int
+    paths_total: int
+    p10: int
+    p50: int
+    p90: int
+    ci: Dict[str, float] = field(default_factory=dict)  # halv bredd (mån) per percentil
+    converged: bool = False
+    done: bool = False
+    cancelled: bool = False
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"p10": self.p10, "p50": self.p50, "p90": self.p90}
+
+
+def _hist_value(cum: np.ndarray, rank: int) -> int:
+    """Värdet med 0-indexerad rang `rank` ur kumulativa histogramräkningar."""
+    return int(np.searchsorted(cum, rank, side="right"))
+
+
+def _snapshot(hist: np.ndarray, done: int, total: int, tol_months: float) -> Progress:
+    """
+    Percentiler med samma indexregel som time_to_goal_mc (k = round(p(n-1))).
+    Konvergens: 95 %-intervall för percentilen via binomial rangapproximation,
+    k± = n·p ± 1.96·sqrt(n·p·(1−p)); halv bredd = (x[k+] − x[k−]) / 2.
+    """
+    cum = np.cumsum(hist)
+    n = done
+    vals, ci = {}, {}
+    for p in PERCENTILES:
+        q = p / 100.0
+        k = max(0, min(n - 1, int(round(q * (n - 1)))))
+        vals[f"p{p}"] = _hist_value(cum, k)
+        spread = 1.96 * math.sqrt(n * q * (1.0 - q))
+        k_lo = max(0, int(math.floor(q * n - spread)))
+        k_hi = min(n - 1, int(math.ceil(q * n + spread)))
+        ci[f"p{p}"] = (_hist_value(cum, k_hi) - _hist_value(cum, k_lo)) / 2.0
+    return Progress(
+        paths_done=done,
+        paths_total=total,
+        ci=ci,
+        converged=all(v <= tol_months for v in ci.values()),
+        done=done >= total,
+        **vals,
+    )
+
+
+def iter_time_to_goal(
+    nuvarde: float,
+    mean_monthly_contrib: float,
+    cagr: float,
+    vol: float,
+    max_months: int,
+    paths: int,
+    goal: float,
+    seed: Optional[int] = None,
+    first_chunk: int = 500,
+    max_chunk: int = 20_000,
+    tol_months: float = 1.0,
+    cancel: Optional[threading.Event] = None,
+    model: Optional[ReturnModel] = None,
+) -> Iterator[Progress]:
+    """
+    Generator som ger en Progress per färdig bit. Sista posten har done=True
+    (eller cancelled=True om `cancel` sattes). Bitstorleken fördubblas från
+    `first_chunk` upp till `max_chunk`. `model` ersätter lognormalmodellen
+    (se sim/returns.py).
+    """
+    if nuvarde < 0:
+        raise ValueError("nuvarde måste vara ≥ 0")
+    if mean_monthly_contrib < 0:
+        raise ValueError("mean_monthly_contrib måste vara ≥ 0")
+    if not (0.0 <= cagr <= 1.0):
+        raise ValueError("cagr måste ligga i [0,1]")
+    if vol < 0.0:
+        raise ValueError("vol måste vara ≥ 0")
+    if paths < 100:
+        raise ValueError("paths måste vara ≥ 100")
+    if max_months < 1:
+        raise ValueError("max_months måste vara ≥ 1")
+    if goal <= 0.0:
+        raise ValueError("goal måste vara > 0")
+
+    if model is None:
+        model = Lognormal(cagr, vol)
+    rng = np.random.default_rng(seed)
+    hist = np.zeros(max_months + 2, dtype=np.int64)
+    done, chunk = 0, max(1, first_chunk)
+    while done < paths:
+        if cancel is not None and cancel.is_set():
+            snap = _snapshot(hist, done, paths, tol_months) if done else Progress(0, paths, 0, 0, 0)
+            snap.cancelled = True
+            yield snap
+            return
+        n = min(chunk, paths - done)
+        months = hitting_months(nuvarde, mean_monthly_contrib, model.factors(rng, max_months, n), goal)
+        hist += np.bincount(months, minlength=max_months + 2)
+        done += n
+        chunk = min(chunk * 2, max_chunk)
+        yield _snapshot(hist, done, paths, tol_months)
+
+
+class BackgroundRun:
+    """
+    Kör iter_time_to_goal i bakgrunden och exponerar senaste Progress.
+
+    Utan `executor` får körningen en egen tråd. Med en delad, begränsad
+    pool (t.ex. ThreadPoolExecutor(max_workers=antal kärnor)) köas
+    körningar från många sessioner i stället för att alla startar samtidigt;
+    numpy släpper GIL i de tunga stegen, så trådar räcker.
+
+    - cancel(): avbryt mellan bitar (t.ex. när parametrarna ändras).
+    - latest(): senaste ögonblicksbild; räknas som "livstecken".
+    - idle_timeout: om ingen anropat latest() på så många sekunder avbryts
+      körningen av sig själv, så att övergivna sessioner slutar dra CPU.
+    """
+
+    def __init__(self, key: object, idle_timeout: float = 30.0,
+                 executor: Optional[Executor] = None, **params) -> None:
+        self.key = key
+        self.idle_timeout = idle_timeout
+        self.error: Optional[BaseException] = None
+        self._cancel = threading.Event()
+        self._latest: Optional[Progress] = None
+        self._last_poll = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._future: Optional[Future] = None
+        if executor is not None:
+            self._future = executor.submit(self._run, params)
+        else:
+            self._thread = threading.Thread(target=self._run, args=(params,), daemon=True)
+            self._thread.start()
+
+    def _run(self, params: dict) -> None:
+        try:
+            for snap in iter_time_to_goal(cancel=self._cancel, **params):
+                with self._lock:
+                    self._latest = snap
+                if time.monotonic() - self._last_poll > self.idle_timeout:
+                    self._cancel.set()
+        except BaseException as e:  # visas i UI i stället för att försvinna i tråden
+            self.error = e
+
+    def latest(self) -> Optional[Progress]:
+        self._last_poll = time.monotonic()
+        with self._lock:
+            return self._latest
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def running(self) -> bool:
+        if self._future is not None:
+            return not self._future.done()
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._future is not None:
+            try:
+                self._future.result(timeout)
+            except Exception:
+                pass  # fel exponeras via self.error
+        elif self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,144 @@
+# -------------------------------------------------------------------
+# Avkastningsmodeller för tid-till-mål-motorn.
+# Tanken är att:
+#   - motorn (sim/engine.py) bara känner till protokollet ReturnModel:
+#       factors(rng, months, paths) -> tillväxtfaktorer, form (months, paths)
+#     och aldrig vet vilken fördelning som ligger bakom,
+#   - varje modell genererar hela blocket av banor vektoriserat (ingen
+#     Python-loop per bana; högst en loop över månader),
+#   - alla modeller använder samma rng (np.random.Generator) så att seed
+#     ger reproducerbara resultat oavsett modell.
+# Modeller:
+#   Lognormal        standardmodellen (samma mu/sigma som tidigare)
+#   StudentT         feta svansar, skalad så att log-avkastningens std = vol/√12
+#   RegimeSwitching  två tillstånd (normal/bear) med Markov-övergångar per månad
+# BlockBootstrap (sim/bootstrap.py) uppfyller samma protokoll.
+#
+# Valfritt: fill(rng, out) fyller en förallokerad buffert (t.ex. float32)
+# in-place. Motorns kompakta läge använder den när den finns och faller
+# annars tillbaka på factors() + kopiering in i bufferten.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Protocol, runtime_checkable
+
+import numpy as np
+
+from moneygoal.sim.kernel import lognormal_factors, lognormal_params
+
+__all__ = ["ReturnModel", "Lognormal", "StudentT", "RegimeSwitching", "MODELS"]
+
+
+@runtime_checkable
+class ReturnModel(Protocol):
+    """Allt motorn behöver: ett block tillväxtfaktorer per anrop."""
+
+    def factors(self, rng: np.random.Generator, months: int, paths: int) -> np.ndarray:
+        ...
+
+
+@dataclass(frozen=True)
+class Lognormal:
+    """
+    exp(mu + sigma*z), z ~ N(0,1):
+      sigma = vol / sqrt(12)
+      mu    = ln(1+CAGR)/12 - 0.5*sigma^2
+    """
+
+    cagr: float
+    vol: float
+
+    def factors(self, rng: np.random.Generator, months: int, paths: int) -> np.ndarray:
+        z = rng.standard_normal((months, paths))
+        return lognormal_factors(z, self.cagr, self.vol)
+
+    def fill(self, rng: np.random.Generator, out: np.ndarray) -> np.ndarray:
+        """Skriv faktorer direkt i `out` (float32 eller float64) utan temporära arrayer."""
+        mu, sigma = lognormal_params(self.cagr, self.vol)
+        rng.standard_normal(out=out, dtype=out.dtype)
+        out *= sigma
+        out += mu
+        return np.exp(out, out=out)
+
+
+@dataclass(frozen=True)
+class StudentT:
+    """
+    Som Lognormal men med Student-t (df frihetsgrader) i stället för z.
+    t skalas med sqrt((df-2)/df) så att variansen blir 1; vol betyder alltså
+    samma sak som i lognormalmodellen, men svansarna är tyngre.
+    """
+
+    cagr: float
+    vol: float
+    df: float = 5.0
+
+    def __post_init__(self) -> None:
+        if self.df <= 2.0:
+            raise ValueError("df måste vara > 2 (ändlig varians)")
+
+    def factors(self, rng: np.random.Generator, months: int, paths: int) -> np.ndarray:
+        mu, sigma = lognormal_params(self.cagr, self.vol)
+        t = rng.standard_t(self.df, size=(months, paths))
+        t *= sigma * math.sqrt((self.df - 2.0) / self.df)
+        t += mu
+        return np.exp(t, out=t)
+
+
+@dataclass(frozen=True)
+class RegimeSwitching:
+    """
+    Två-tillstånds Markov-modell: normal (cagr, vol) och bear (bear_cagr,
+    bear_vol), lognormal inom varje tillstånd.
+
+    p_bear:    sannolikhet per månad att gå från normal till bear
+    p_recover: sannolikhet per månad att gå från bear till normal
+    Starttillståndet dras ur den stationära fördelningen
+    P(bear) = p_bear / (p_bear + p_recover).
+    """
+
+    cagr: float
+    vol: float
+    bear_cagr: float = -0.20
+    bear_vol: float = 0.30
+    p_bear: float = 0.02
+    p_recover: float = 0.10
+
+    def __post_init__(self) -> None:
+        if not (0.0 <= self.p_bear <= 1.0 and 0.0 <= self.p_recover <= 1.0):
+            raise ValueError("p_bear och p_recover måste ligga i [0,1]")
+        if self.p_bear + self.p_recover == 0.0:
+            raise ValueError("p_bear och p_recover kan inte båda vara 0")
+        if self.bear_cagr <= -1.0 or self.bear_vol < 0.0:
+            raise ValueError("bear_cagr måste vara > -1 och bear_vol ≥ 0")
+
+    def factors(self, rng: np.random.Generator, months: int, paths: int) -> np.ndarray:
+        """
+        Steg:
+        1. Dra alla z och alla likformiga övergångstal i två stora anrop.
+        2. Stega tillståndsvektorn (en bool per bana) månad för månad.
+        3. Välj mu/sigma per cell efter tillstånd och räkna exp i ett svep.
+        """
+        mu0, s0 = lognormal_params(self.cagr, self.vol)
+        mu1, s1 = lognormal_params(self.bear_cagr, self.bear_vol)
+        z = rng.standard_normal((months, paths))
+        u = rng.random((months, paths))
+
+        bear = np.empty((months, paths), dtype=bool)
+        state = u[0] < self.p_bear / (self.p_bear + self.p_recover)
+        bear[0] = state
+        for m in range(1, months):
+            # normal → bear med p_bear, bear → normal med p_recover
+            state = np.where(state, u[m] >= self.p_recover, u[m] < self.p_bear)
+            bear[m] = state
+
+        z *= np.where(bear, s1, s0)
+        z += np.where(bear, mu1, mu0)
+        return np.exp(z, out=z)
+
+
+# Namn → modellklass (CLI:ns --model)
+MODELS = {"lognormal": Lognormal, "student-t": StudentT, "regime": RegimeSwitching}
@@ -0,0 +1,176 @@
+# -------------------------------------------------------------------
+# Minnesmappad shock bank på disk, delad mellan processer och körningar.
+# Tanken är att:
+#   - standardnormala chocker för (seed, horisont, paths) dras EN gång och
+#     sparas som en .npy-fil under result/shockbank/,
+#   - alla som behöver samma chocker (processpoolens arbetare, batch-
+#     scenarier, nya körningar) öppnar filen med np.load(mmap_mode="r") och
+#     läser skivor direkt ur sidcachen: ingen RNG, ingen kopia, en delad
+#     kopia i minnet oavsett antal processer,
+#   - layouten är exakt den som motorn (engine.time_to_goal) annars drar:
+#     kolumnblock om `block` banor, vart och ett dragna i följd ur samma
+#     rng(seed). Därför ger en körning med bank bit-identiskt samma resultat
+#     som utan; block = paths motsvarar kernel.shock_bank (what-if),
+#   - storleken begränsas: en enskild bank får vara högst max_bank_bytes
+#     (annars None ⇒ anroparen drar som vanligt), och alla banker tillsammans
+#     högst max_total_bytes; äldst använda filer (mtime, uppdateras vid
+#     varje get) tas bort först.
+# Skrivning sker till en temporär fil som byts in atomiskt (os.replace), så
+# samtidiga processer kan skapa samma bank utan att läsa halvskrivna filer.
+# En borttagen fil som redan är mappad förblir giltig för den som läser.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+__all__ = ["ShockStore", "SAMPLERS", "DEFAULT_ROOT"]
+
+DEFAULT_ROOT = Path("result/shockbank")
+MAX_BANK_BYTES = 1 << 30        # 1 GiB per bank (≈ 220 000 paths × 600 mån)
+MAX_TOTAL_BYTES = 4 << 30       # 4 GiB totalt
+SLAB_BYTES = 64 << 20           # genereringen skriver i skivor om ≈ 64 MiB
+
+# Namn → fyll en (rader, banor)-array med dragningar ur rng, i C-ordning
+SAMPLERS: Dict[str, Callable[[np.random.Generator, tuple], np.ndarray]] = {
+    "normal": lambda rng, shape: rng.standard_normal(shape),
+}
+
+
+class ShockStore:
+    """
+    Katalog med minnesmappade shock banks.
+
+    Användning:
+        store = ShockStore()
+        z = store.get(seed=42, months=600, paths=5000)   # (600, 5000), skrivskyddad memmap
+    """
+
+    def __init__(
+        self,
+        root: str | Path = DEFAULT_ROOT,
+        max_bank_bytes: int = MAX_BANK_BYTES,
+        max_total_bytes: int = MAX_TOTAL_BYTES,
+    ) -> None:
+        if max_bank_bytes <= 0 or max_total_bytes < max_bank_bytes:
+            raise ValueError("kräver 0 < max_bank_bytes ≤ max_total_bytes")
+        self.root = Path(root)
+        self.max_bank_bytes = int(max_bank_bytes)
+        self.max_total_bytes = int(max_total_bytes)
+
+    def path(self, seed: int, months: int, paths: int, block: int, sampler: str = "normal") -> Path:
+        return self.root / f"{sampler}-s{seed}-{months}x{paths}-b{block}.npy"
+
+    def get(
+        self,
+        seed: Optional[int],
+        months: int,
+        paths: int,
+        block: Optional[int] = None,
+        sampler: str = "normal",
+    ) -> Optional[np.ndarray]:
+        """
+        Skrivskyddad memmap, form (months, paths), eller None om banken inte
+        får plats (max_bank_bytes) eller seed saknas (ingen reproducerbar nyckel).
+
+        Steg:
+        1. Nyckel = (sampler, seed, form, blockstorlek) → filnamn.
+        2. Finns filen med rätt form: öppna mappad och markera som använd.
+        3. Annars: gör plats (evict), generera till temporär fil, byt in atomiskt.
+        """
+        if sampler not in SAMPLERS:
+            raise ValueError(f"Okänd sampler: {sampler} (stöd: {', '.join(SAMPLERS)})")
+        if seed is None:
+            return None
+        block = paths if block is None else max(1, min(int(block), paths))
+        nbytes = months * paths * np.dtype(np.float64).itemsize
+        if nbytes > self.max_bank_bytes:
+            return None
+
+        path = self.path(seed, months, paths, block, sampler)
+        z = self._open(path, (months, paths))
+        if z is not None:
+            return z
+        self.evict(nbytes)
+        self._generate(path, seed, months, paths, block, sampler)
+        return self._open(path, (months, paths))
+
+    def _open(self, path: Path, shape: tuple) -> Optional[np.ndarray]:
+        try:
+            z = np.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        if z.shape != shape or z.dtype != np.float64:
+            return None
+        try:
+            os.utime(path)  # LRU: senast använd
+        except OSError:
+            pass
+        return z
+
+    def _generate(self, path: Path, seed: int, months: int, paths: int, block: int, sampler: str) -> None:
+        """
+        Skriv banken kolumnblock för kolumnblock, precis som motorn drar dem:
+        block j = draw(rng, (months, n_j)), i följd ur samma rng. Varje block
+        dras i radskivor (samma ström som ett enda anrop) så att minnet är
+        begränsat till SLAB_BYTES.
+        """
+        draw = SAMPLERS[sampler]
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npy")
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64, shape=(months, paths))
+        try:
+            rng = np.random.default_rng(seed)
+            for lo in range(0, paths, block):
+                n = min(block, paths - lo)
+                rows = max(1, SLAB_BYTES // (8 * n))
+                for r0 in range(0, months, rows):
+                    r1 = min(months, r0 + rows)
+                    out[r0:r1, lo:lo + n] = draw(rng, (r1 - r0, n))
+            out.flush()
+        except BaseException:
+            del out
+            tmp.unlink(missing_ok=True)
+            raise
+        del out
+        os.replace(tmp, path)
+
+    def usage(self) -> int:
+        """Totalt antal byte i banker på disk."""
+        return sum(p.stat().st_size for p in self.root.glob("*.npy") if not p.name.endswith(".tmp.npy"))
+
+    def evict(self, incoming: int = 0) -> int:
+        """
+        Ta bort äldst använda banker tills usage() + incoming ≤ max_total_bytes.
+        Returnerar antalet borttagna filer.
+        """
+        if not self.root.is_dir():
+            return 0
+        files = []
+        for p in self.root.glob("*.npy"):
+            if p.name.endswith(".tmp.npy"):
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, p))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, p in files:
+            if total + incoming <= self.max_total_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        for p in self.root.glob("*.npy"):
+            p.unlink(missing_ok=True)
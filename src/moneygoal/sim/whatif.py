@@ -0,0 +1,70 @@
+# -------------------------------------------------------------------
+# What-if: snabb omräkning av P10/P50/P90 när cagr, vol, månadsspar
+# eller mål ändras (reglage i appen).
+# Tanken är att:
+#   - slumpen dras EN gång per session som en shock bank (seed × paths ×
+#     horisont, standardnormal) och återanvänds för varje ändring,
+#   - varje ändring blir då en ren, deterministisk funktion av reglagen:
+#     resultaten hoppar inte mellan närliggande lägen och är monotona
+#     (mer spar/högre cagr ⇒ aldrig senare),
+#   - omräkningen går via den vektoriserade kärnan med en förallokerad
+#     buffert (mål: < 100 ms för 5 000 banor × 600 månader),
+#   - med en ShockStore (sim/shockbank.py) mappas banken från disk i stället
+#     för att dras: sessioner och processer med samma nyckel delar då en
+#     kopia i sidcachen, och en ny session slipper dragningen helt.
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from moneygoal.sim.kernel import hitting_months_lognormal, percentiles, shock_bank
+
+__all__ = ["WhatIfBank"]
+
+
+class WhatIfBank:
+    """Fast shock bank + förallokerad buffert för upprepade utvärderingar."""
+
+    def __init__(self, seed: Optional[int], paths: int, months: int, store=None) -> None:
+        if paths < 100:
+            raise ValueError("paths måste vara ≥ 100")
+        if months < 1:
+            raise ValueError("months måste vara ≥ 1")
+        self.key = (seed, paths, months)
+        z = store.get(seed, months, paths) if store is not None else None
+        self.z = z if z is not None else shock_bank(seed, paths, months)
+        self._buf = np.empty(paths)
+        self.last_ms = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.z.nbytes + self._buf.nbytes)
+
+    def evaluate(
+        self, nuvarde: float, mean_monthly_contrib: float, cagr: float, vol: float, goal: float
+    ) -> Dict[str, int]:
+        """
+        P10/P50/P90 i månader (horisont+1 = når ej målet) mot den fasta banken.
+        Tidsåtgången för senaste anropet sparas i `last_ms`.
+        """
+        if nuvarde < 0:
+            raise ValueError("nuvarde måste vara ≥ 0")
+        if mean_monthly_contrib < 0:
+            raise ValueError("mean_monthly_contrib måste vara ≥ 0")
+        if not (0.0 <= cagr <= 1.0):
+            raise ValueError("cagr måste ligga i [0,1]")
+        if vol < 0.0:
+            raise ValueError("vol måste vara ≥ 0")
+        if goal <= 0.0:
+            raise ValueError("goal måste vara > 0")
+        t0 = time.perf_counter()
+        months = hitting_months_lognormal(
+            nuvarde, mean_monthly_contrib, self.z, cagr, vol, goal, buf=self._buf
+        )
+        out = percentiles(months)
+        self.last_ms = (time.perf_counter() - t0) * 1000.0
+        return out
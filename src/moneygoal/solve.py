@@ -0,0 +1,117 @@
+# -------------------------------------------------------------------
+# CLI för inverslösaren (moneygoal.sim.inverse):
+#   "Hur mycket måste jag spara per månad för att nå 1 MSEK inom 10 år
+#    med 90 % säkerhet?"  → --solve-for contrib
+#   "Vilken avkastning krävs med nuvarande månadsspar?" → --solve-for cagr
+#
+# Körning:
+#   moneygoal solve --positions ... [--transactions ...] --goal 1000000 \
+#       --deadline 120 --confidence 0.9 --solve-for contrib
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+__all__ = ["main"]
+
+
+def main(argv=None) -> int:
+    """
+    Exit-koder som CLI:n: 0 OK, 1 körfel (t.ex. mål ouppnåeligt), 2 argumentfel.
+    --transactions behövs bara för --solve-for cagr (månadsspar ur historiken).
+    """
+    p = argparse.ArgumentParser(
+        prog="moneygoal solve",
+        description="Lös ut månadsspar eller CAGR som krävs för att nå målet före en deadline.",
+    )
+    p.add_argument("--positions", required=True, help="Sökväg till positions.csv (Avanza-export).")
+    p.add_argument("--transactions", default=None, help="Sökväg till transactions.csv (krävs för --solve-for cagr).")
+    p.add_argument("--goal", type=float, required=True, help="Målbelopp i SEK.")
+    p.add_argument("--deadline", type=int, required=True, help="Deadline i månader.")
+    p.add_argument("--confidence", type=float, default=0.9, help="Andel banor som ska nå målet, (0,1).")
+    p.add_argument("--solve-for", choices=["contrib", "cagr"], default="contrib")
+    p.add_argument("--cagr", type=float, default=0.06, help="Antagen CAGR (vid --solve-for contrib).")
+    p.add_argument("--vol", type=float, default=0.15, help="Årsvolatilitet.")
+    p.add_argument("--paths", type=int, default=5000, help="Antal simuleringar (samma chocker i alla iterationer).")
+    p.add_argument("--seed", type=int, default=42, help="Slumptalsfrö.")
+    p.add_argument("--report", default=None, help="Valfri CSV att skriva svaret till.")
+    args = p.parse_args(argv)
+
+    # 1) Tidig validering innan tunga importer
+    errs = []
+    if not Path(args.positions).is_file():
+        errs.append(f"--positions saknas: {args.positions}")
+    if args.solve_for == "cagr" and (args.transactions is None or not Path(args.transactions).is_file()):
+        errs.append(f"--transactions saknas: {args.transactions}")
+    if args.goal <= 0:
+        errs.append("--goal måste vara > 0")
+    if args.deadline < 1:
+        errs.append("--deadline måste vara ≥ 1")
+    if not (0.0 < args.confidence < 1.0):
+        errs.append("--confidence måste ligga i (0,1)")
+    if args.paths < 100:
+        errs.append("--paths måste vara ≥ 100")
+    if args.vol < 0:
+        errs.append("--vol måste vara ≥ 0")
+    if not (0.0 <= args.cagr <= 1.0):
+        errs.append("--cagr måste ligga i [0,1]")
+    if errs:
+        for e in errs:
+            print(f"ARGERROR: {e}", file=sys.stderr)
+        return 2
+
+    import logging
+
+    from moneygoal.io.avanza_csv import read_positions
+    from moneygoal.logsetup import new_run_id, setup_logging
+    from moneygoal.sim.inverse import required_cagr, required_contribution
+
+    setup_logging("logs/app.log")
+    new_run_id()
+    logging.info(f"Solve start solve_for={args.solve_for} goal={args.goal} deadline={args.deadline} "
+                 f"confidence={args.confidence} paths={args.paths} seed={args.seed}")
+    try:
+        V0 = float(read_positions(args.positions)["Marknadsvärde"].sum())
+        if args.solve_for == "contrib":
+            value = required_contribution(
+                nuvarde=V0, goal=args.goal, deadline_months=args.deadline,
+                confidence=args.confidence, cagr=args.cagr, vol=args.vol,
+                paths=args.paths, seed=args.seed,
+            )
+            text = f"Krävt månadsspar: {value:,.0f} SEK/mån".replace(",", " ")
+        else:
+            from moneygoal.contrib import mean_monthly_contribution, prepare_contribution_rows
+            from moneygoal.io.avanza_csv import read_transactions
+
+            mmc = max(0.0, mean_monthly_contribution(prepare_contribution_rows(read_transactions(args.transactions))))
+            value = required_cagr(
+                nuvarde=V0, mean_monthly_contrib=mmc, goal=args.goal,
+                deadline_months=args.deadline, confidence=args.confidence,
+                vol=args.vol, paths=args.paths, seed=args.seed,
+            )
+            text = f"Krävd CAGR: {value:.2%}"
+        print(f"{text}  ({args.confidence:.0%} säkerhet, {args.deadline // 12} år {args.deadline % 12} mån)")
+
+        if args.report:
+            import pandas as pd
+
+            Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+            pd.DataFrame([{
+                "solve_for": args.solve_for, "value": value, "V0": V0, "goal": args.goal,
+                "deadline_months": args.deadline, "confidence": args.confidence,
+                "cagr": args.cagr if args.solve_for == "contrib" else value,
+                "vol": args.vol, "paths": args.paths, "seed": args.seed,
+            }]).to_csv(args.report, index=False, encoding="utf-8")
+        logging.info(f"Solve OK value={value}")
+        return 0
+    except Exception as e:
+        logging.exception("Solve failed")
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
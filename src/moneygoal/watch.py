@@ -0,0 +1,332 @@
+# -------------------------------------------------------------------
+# Bevakningsläge: räkna om stegvis när nya Avanza-exporter landar.
+# Tanken är att:
+#   - bevaka platserna för positions och transactions (en fil, eller en
+#     katalog där senast ändrade *.csv används) med inotify när det finns
+#     (Linux, via libc/ctypes; inga extra beroenden), annars med polling
+#     av (mtime, storlek),
+#   - slå ihop skurar av skrivningar (debounce): efter första händelsen
+#     väntar vi tills det varit tyst i `debounce` sekunder, så att en export
+#     som skrivs i flera block bara ger en omräkning,
+#   - köra samma kedja som CLI:n (cli.run_once) på EN långlivad pipeline,
+#     så att bara steg vars indata ändrats räknas om: ny positions-fil rör
+#     inte månadssparet, och Monte Carlo körs bara om V0 faktiskt ändrats
+#     (se moneygoal.pipeline),
+#   - skriva rapport och diagnostics (stage="watch") efter varje omräkning,
+#   - ligga nära noll CPU i vila: inotify blockerar i select utan timeout,
+#     polling gör ett stat-anrop per fil och intervall.
+#
+# Körning:
+#   moneygoal watch --positions data/raw/positions/ --transactions data/raw/transactions/ \
+#       --goal 1000000 --report result/time_to_goal_summary.csv [--debounce 2] [--poll]
+# -------------------------------------------------------------------
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "resolve_source", "PollingWatcher", "InotifyWatcher", "make_watcher",
+    "changes", "watch", "main",
+]
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 2.0
+
+# inotify-konstanter (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+_IN_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def resolve_source(path: str | Path) -> Optional[Path]:
+    """Fil → filen; katalog → senast ändrade *.csv i katalogen (None om ingen finns)."""
+    path = Path(path)
+    if path.is_dir():
+        csvs = [p for p in path.glob("*.csv") if p.is_file()]
+        return max(csvs, key=lambda p: p.stat().st_mtime_ns) if csvs else None
+    return path if path.is_file() else None
+
+
+def _targets(paths: Sequence[Path]) -> Dict[Path, Optional[set]]:
+    """Katalog att bevaka → filnamn att reagera på (None = alla *.csv)."""
+    out: Dict[Path, Optional[set]] = {}
+    for p in paths:
+        p = Path(p)
+        if p.is_dir():
+            out[p] = None
+        elif p.parent not in out:
+            out[p.parent] = {p.name}
+        elif out[p.parent] is not None:
+            out[p.parent].add(p.name)
+    return out
+
+
+class PollingWatcher:
+    """
+    Reservläge utan inotify: jämför (mtime_ns, storlek) för bevakade filer
+    var `interval` sekund. wait() returnerar True vid ändring, False vid
+    timeout eller när close() anropats.
+    """
+
+    def __init__(self, paths: Sequence[str | Path], interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.paths = [Path(p) for p in paths]
+        self.interval = interval
+        self._stop = threading.Event()
+        self._snap = self._snapshot()
+
+    @property
+    def closed(self) -> bool:
+        return self._stop.is_set()
+
+    def _snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snap: Dict[Path, Tuple[int, int]] = {}
+        for p in self.paths:
+            for f in (p.glob("*.csv") if p.is_dir() else [p]):
+                try:
+                    st = f.stat()
+                except OSError:
+                    continue
+                snap[f] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        remaining = timeout
+        while not self._stop.is_set():
+            step = self.interval if remaining is None else min(self.interval, remaining)
+            if self._stop.wait(step):
+                return False
+            snap = self._snapshot()
+            if snap != self._snap:
+                self._snap = snap
+                return True
+            if remaining is not None:
+                remaining -= step
+                if remaining <= 0:
+                    return False
+        return False
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+class InotifyWatcher:
+    """
+    inotify via libc (Linux). Bevakar katalogerna som innehåller filerna
+    (exporter ersätts ofta via rename) och filtrerar på filnamn. Ett internt
+    rör väcker select() vid close(), så ingen timeout behövs i vila.
+    Kastar OSError om inotify inte finns.
+    """
+
+    def __init__(self, paths: Sequence[str | Path]) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify saknas")
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 misslyckades")
+        self._wds: Dict[int, Optional[set]] = {}
+        try:
+            for d, name in _targets(paths).items():
+                wd = libc.inotify_add_watch(fd, str(d).encode(), _IN_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"kan inte bevaka {d}")
+                self._wds[wd] = name
+        except OSError:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._wake_r, self._wake_w = os.pipe()
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _relevant(self, data: bytes) -> bool:
+        hit, pos = False, 0
+        while pos + _EVENT.size <= len(data):
+            wd, _, _, n = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size: pos + _EVENT.size + n].rstrip(b"\0").decode(errors="replace")
+            pos += _EVENT.size + n
+            if wd not in self._wds:
+                continue
+            want = self._wds[wd]
+            if (want is None and name.lower().endswith(".csv")) or (want is not None and name in want):
+                hit = True
+        return hit
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._closed:
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd, self._wake_r], [], [], left)
+            if not ready or self._wake_r in ready:
+                return False
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                continue
+            if self._relevant(data):
+                return True
+        return False
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            os.write(self._wake_w, b"x")
+
+    def __del__(self) -> None:
+        for fd in (getattr(self, "_fd", None), getattr(self, "_wake_r", None), getattr(self, "_wake_w", None)):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+
+def make_watcher(paths: Sequence[str | Path], poll: bool = False,
+                 interval: float = DEFAULT_POLL_INTERVAL):
+    """inotify om möjligt (och poll=False), annars polling."""
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except OSError as e:
+            logging.info(f"inotify ej tillgängligt ({e}); använder polling")
+    return PollingWatcher(paths, interval)
+
+
+def changes(watcher, debounce: float = DEFAULT_DEBOUNCE) -> Iterator[None]:
+    """
+    En yield per skur av ändringar.
+
+    Steg:
+    1. Blockera tills första relevanta händelsen (eller close()).
+    2. Debounce: fortsätt vänta så länge nya händelser kommer inom `debounce` s.
+    3. Yield; anroparen räknar om.
+    """
+    while not watcher.closed:
+        if not watcher.wait(None):
+            continue
+        while watcher.wait(debounce):
+            pass
+        if watcher.closed:
+            return
+        yield
+
+
+def _resolved(args: argparse.Namespace, sources: Tuple[Path, Path]) -> Tuple[argparse.Namespace, List[str]]:
+    """Kopia av args där katalogplatser är ersatta med senaste CSV-filen."""
+    pos, trx = resolve_source(sources[0]), resolve_source(sources[1])
+    errs = []
+    if pos is None:
+        errs.append(f"--positions: ingen CSV i {sources[0]}")
+    if trx is None:
+        errs.append(f"--transactions: ingen CSV i {sources[1]}")
+    ns = argparse.Namespace(**vars(args))
+    ns.positions, ns.transactions = str(pos or sources[0]), str(trx or sources[1])
+    return ns, errs
+
+
+def watch(
+    args: argparse.Namespace,
+    pipe,
+    watcher,
+    debounce: float = DEFAULT_DEBOUNCE,
+    max_runs: Optional[int] = None,
+) -> int:
+    """
+    Kör en gång direkt och sedan en gång per skur av ändringar.
+    Fel i en enskild omräkning (t.ex. halvskriven fil) loggas men stoppar
+    inte bevakningen. max_runs begränsar antalet körningar (tester).
+    """
+    from moneygoal.cli import run_once
+
+    sources = (Path(args.positions), Path(args.transactions))
+    runs = 0
+
+    def once() -> None:
+        nonlocal runs
+        ns, errs = _resolved(args, sources)
+        for e in errs:
+            print(f"WATCHERROR: {e}", file=sys.stderr)
+        if not errs:
+            logging.info(f"watch run positions={ns.positions} transactions={ns.transactions}")
+            run_once(ns, pipe, stage="watch")
+        runs += 1
+
+    once()
+    if max_runs is not None and runs >= max_runs:
+        return 0
+    for _ in changes(watcher, debounce):
+        print("Ändring upptäckt – räknar om …", file=sys.stderr)
+        once()
+        if max_runs is not None and runs >= max_runs:
+            break
+    return 0
+
+
+def main(argv=None) -> int:
+    """
+    `moneygoal watch`: samma flaggor som en enskild körning, plus
+    --debounce, --poll och --poll-interval. --positions/--transactions får
+    vara kataloger. Avsluta med Ctrl-C. Exit-koder: 0 OK, 2 argumentfel.
+    """
+    from moneygoal.cli import arg_errors, build_parser
+
+    p = build_parser(prog="moneygoal watch")
+    p.description = "Bevaka exporterna och räkna om stegvis när de ändras."
+    g = p.add_argument_group("bevakning")
+    g.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                   help="Sekunder utan nya skrivningar innan omräkning (default 2).")
+    g.add_argument("--poll", action="store_true", help="Använd polling även om inotify finns.")
+    g.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                   help="Sekunder mellan kontroller vid polling (default 2).")
+    args = p.parse_args(argv)
+
+    sources = (Path(args.positions), Path(args.transactions))
+    ns, errs = _resolved(args, sources)
+    errs += arg_errors(ns) if not errs else []
+    if args.debounce < 0:
+        errs.append("--debounce måste vara ≥ 0")
+    if args.poll_interval <= 0:
+        errs.append("--poll-interval måste vara > 0")
+    if errs:
+        for e in errs:
+            print(f"ARGERROR: {e}", file=sys.stderr)
+        return 2
+
+    from moneygoal.logsetup import setup_logging, new_run_id
+    from moneygoal.pipeline import CACHE_DIR, default_pipeline
+
+    setup_logging("logs/app.log")
+    new_run_id()
+    pipe = default_pipeline(None if (args.no_cache or args.profile) else CACHE_DIR)
+    watcher = make_watcher(sources, poll=args.poll, interval=args.poll_interval)
+    logging.info(f"Watch start ({type(watcher).__name__}) positions={args.positions} "
+                 f"transactions={args.transactions}")
+    print(f"Bevakar {args.positions} och {args.transactions} (Ctrl-C avslutar)", file=sys.stderr)
+    try:
+        return watch(args, pipe, watcher, args.debounce)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        watcher.close()
+        logging.info("Watch stop")
@@ -0,0 +1,26 @@
+import pytest
+
+POSITIONS_CSV = (
+    "Kontonummer;Namn;Volym;Marknadsvärde;Valuta;ISIN\n"
+    "9552-1;Fond A;100;250 000,00;SEK;SE0000000001\n"
+    "9552-1;Fond B;50;150 000,50;SEK;SE0000000002\n"
+)
+
+TRANSACTIONS_CSV = (
+    "Datum;Konto;Typ av transaktion;Värdepapper/beskrivning;Belopp;Transaktionsvaluta\n"
+    "2020-01-15;K;Insättning;Överföring;100 000;SEK\n"
+    "2020-06-15;K;Insättning;Överföring;50 000;SEK\n"
+    "2021-03-10;K;Utdelning;Fond A;1 200,50;SEK\n"
+    "2022-02-01;K;Uttag;Överföring;-10 000;SEK\n"
+    "2023-05-15;K;Insättning;Överföring;120 000;SEK\n"
+)
+
+
+@pytest.fixture
+def avanza_files(tmp_path):
+    """Skriv små Avanza-lika positions/transactions-filer och returnera sökvägarna."""
+    pos = tmp_path / "positions.csv"
+    trx = tmp_path / "transactions.csv"
+    pos.write_text(POSITIONS_CSV, encoding="utf-8-sig")
+    trx.write_text(TRANSACTIONS_CSV, encoding="utf-8-sig")
+    return pos, trx
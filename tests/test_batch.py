@@ -0,0 +1,67 @@
+import json
+import pandas as pd
+from moneygoal import cli
+from moneygoal.batch import read_scenarios, run_scenarios
+
+def test_read_scenarios_formats(tmp_path):
+    (tmp_path / "s.csv").write_text("name;goal;cagr;horizon\nbas;1000000;0.05;240\n")
+    (tmp_path / "s.json").write_text(json.dumps([{"goal": 500000, "vol": 0.1}]))
+    (tmp_path / "s.toml").write_text('[[scenario]]\nname = "t"\ngoal = 2e6\npaths = 200\n')
+    csv_sc = read_scenarios(tmp_path / "s.csv")[0]
+    assert csv_sc["scenario"] == "bas" and csv_sc["maxhorisont"] == 240 and csv_sc["cagr"] == 0.05
+    json_sc = read_scenarios(tmp_path / "s.json")[0]
+    assert json_sc["vol"] == 0.1 and json_sc["paths"] == 5000  # default
+    toml_sc = read_scenarios(tmp_path / "s.toml")[0]
+    assert toml_sc["goal"] == 2e6 and toml_sc["paths"] == 200
+
+def test_run_scenarios_isolates_failures():
+    scs = [
+        {"scenario": "ok", "goal": 200_000, "cagr": 0.0, "vol": 0.0, "paths": 100, "seed": 1, "maxhorisont": 360},
+        {"scenario": "bad", "goal": 200_000, "cagr": 0.0, "vol": 0.0, "paths": 10, "seed": 1, "maxhorisont": 360},
+    ]
+    res = run_scenarios(scs, V0=100_000, mmc=2_000, workers=2)
+    assert [r["scenario"] for r in res] == ["ok", "bad"]
+    assert 49 <= res[0]["p50_months"] <= 51 and res[0]["error"] == ""
+    assert res[1]["error"]
+
+def test_cli_batch_end_to_end(avanza_files, tmp_path, monkeypatch):
+    pos, trx = avanza_files
+    monkeypatch.chdir(tmp_path)
+    scen = tmp_path / "scen.json"
+    scen.write_text(json.dumps({"scenarios": [
+        {"name": "a", "goal": 1_000_000, "paths": 100, "horizon": 120},
+        {"name": "b", "goal": 2_000_000, "paths": 100, "horizon": 120},
+        {"name": "c", "goal": 3_000_000, "paths": 100, "horizon": 120},
+    ]}))
+    rc = cli.main(["batch", "--scenarios", str(scen), "--positions", str(pos),
+                   "--transactions", str(trx), "--report", "result/batch.csv", "--workers", "2"])
+    assert rc == 0
+    rep = pd.read_csv("result/batch.csv")
+    assert list(rep["scenario"]) == ["a", "b", "c"]
+    diag = pd.read_csv("result/diagnostics.csv")
+    assert len(diag) == 3 and diag["xirr"].notna().all()
+    assert cli.main(["batch", "--scenarios", str(scen), "--positions", str(pos), "--transactions", str(trx),
+                     "--report", "result/cash.csv", "--workers", "1", "--dividends", "cash"]) == 0
+    diag = pd.read_csv("result/diagnostics.csv")
+    assert diag["dividends"].tolist()[-3:] == ["cash"] * 3
+    assert (diag["mean_monthly_contrib"].iloc[-1] < diag["mean_monthly_contrib"].iloc[0])
+
+def test_cli_batch_bad_scenario_returns_2(avanza_files, tmp_path):
+    pos, trx = avanza_files
+    scen = tmp_path / "scen.json"
+    scen.write_text(json.dumps([{"goal": -1}]))
+    rc = cli.main(["batch", "--scenarios", str(scen), "--positions", str(pos),
+                   "--transactions", str(trx), "--report", str(tmp_path / "r.csv")])
+    assert rc == 2
+
+def test_cli_batch_empty_csv_and_missing_toml_support_return_2(avanza_files, tmp_path, monkeypatch, capsys):
+    import moneygoal.io.tomlfile as tomlfile
+    pos, trx = avanza_files
+    (tmp_path / "empty.csv").write_text("")
+    (tmp_path / "s.toml").write_text('[[scenario]]\ngoal = 2e6\n')
+    args = ["--positions", str(pos), "--transactions", str(trx), "--report", str(tmp_path / "r.csv")]
+    assert cli.main(["batch", "--scenarios", str(tmp_path / "empty.csv"), *args]) == 2
+    assert "inga scenarier" in capsys.readouterr().err
+    monkeypatch.setattr(tomlfile, "_loader", lambda: None)  # som Python 3.10 utan tomli
+    assert cli.main(["batch", "--scenarios", str(tmp_path / "s.toml"), *args]) == 2
+    assert "tomli" in capsys.readouterr().err
@@ -0,0 +1,36 @@
+import pandas as pd
+from benchmarks.compare import compare
+from benchmarks.datagen import generate_transactions, write_dataset
+from benchmarks.run import run_suite
+from moneygoal.io.avanza_csv import read_positions, read_transactions
+
+def test_datagen_is_seeded_and_matches_contract(tmp_path):
+    assert generate_transactions(500, seed=3).equals(generate_transactions(500, seed=3))
+    pos, trx = write_dataset(tmp_path, rows=2_000, holdings=12, seed=3)
+    df_pos = read_positions(pos)
+    df_trx = read_transactions(trx)
+    assert len(df_pos) == 12 and abs(df_pos["Marknadsvärde"].sum() - 738_273.18) < 0.1
+    assert len(df_trx.columns) == 13 and len(df_trx) == 2_000
+    assert pd.api.types.is_datetime64_any_dtype(df_trx["Datum"])
+    assert {"Insättning", "Uttag", "Utdelning"} <= set(df_trx["Typ"])
+
+def test_compare_flags_regressions_with_overrides():
+    base = {"results": [{"name": "mc/a", "suite": "mc", "min_s": 1.0},
+                        {"name": "io/b", "suite": "io", "min_s": 1.0}]}
+    cur = {"results": [{"name": "mc/a", "suite": "mc", "min_s": 1.3},
+                       {"name": "io/b", "suite": "io", "min_s": 1.3},
+                       {"name": "ny/c", "suite": "ny", "min_s": 9.0}]}
+    rows = {r["name"]: r for r in compare(cur, base, threshold=0.2, overrides={"io": 0.5})}
+    assert rows["mc/a"]["regression"] and not rows["io/b"]["regression"]
+    assert "ny/c" not in rows
+
+def test_run_suite_writes_results(monkeypatch):
+    import benchmarks.run as run
+    monkeypatch.setitem(run.SIZES, "quick", {"mc": [(100, 12)], "xirr": [10], "io": [100], "e2e": []})
+    res = run_suite("quick", only=["mc", "xirr", "io"], repeat=1)
+    names = [r["name"] for r in res["results"]]
+    assert names == ["mc/time_to_goal_mc/p100_m12", "xirr/xirr/n10", "xirr/monthly/n10",
+                     "io/read_transactions/r100", "io/normalize_transactions/r100",
+                     "io/normalize_positions/r100"]
+    assert all(r["min_s"] >= 0 for r in res["results"])
+    assert all(r["peak_bytes"] > 0 for r in res["results"])
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from moneygoal import cli
+from moneygoal.sim.bootstrap import read_monthly_returns, BlockBootstrap, time_to_goal_bootstrap
+
+def _write_returns(path, values):
+    path.write_text("Månad;Avkastning\n" + "".join(
+        f"2000-{i:04d};{str(v).replace('.', ',')}\n" for i, v in enumerate(values)), encoding="utf-8")
+    return path
+
+def test_read_monthly_returns_swedish_format(tmp_path):
+    f = tmp_path / "r.csv"
+    f.write_text("datum,return\n" + "".join(f"2020-{m:02d},{m}%\n" for m in range(1, 13)), encoding="utf-8")
+    assert read_monthly_returns(f)[:2] == pytest.approx([0.01, 0.02])
+    r = read_monthly_returns(_write_returns(tmp_path / "s.csv", [0.01] * 11 + [-0.5]))
+    assert r[-1] == -0.5
+    with pytest.raises(ValueError):
+        read_monthly_returns(_write_returns(tmp_path / "t.csv", [0.01] * 5))
+
+def test_moving_blocks_are_contiguous_runs():
+    bb = BlockBootstrap(np.arange(100) / 1000.0, block=6, method="moving")
+    idx = bb.indices(np.random.default_rng(0), 60, 500)
+    runs = idx.reshape(10, 6, 500)
+    assert np.all(np.diff(runs, axis=1) == 1)
+    assert idx.min() >= 0 and idx.max() < 100
+
+def test_stationary_blocks_wrap_and_have_expected_mean_length():
+    bb = BlockBootstrap(np.zeros(50), block=8, method="stationary")
+    idx = bb.indices(np.random.default_rng(1), 400, 2000)
+    assert idx.min() >= 0 and idx.max() < 50
+    # ett nytt block börjar där steget inte är +1 (mod n); snittlängd ≈ L
+    breaks = (np.diff(idx, axis=0) % 50 != 1).mean()
+    assert 1 / breaks == pytest.approx(8, rel=0.1)
+
+def test_constant_series_matches_analytic_and_is_seeded():
+    bb = BlockBootstrap(np.zeros(24), block=6)
+    assert time_to_goal_bootstrap(100_000, 2_000, bb, 360, 200, 200_000, seed=1) == {"p10": 50, "p50": 50, "p90": 50}
+    bb = BlockBootstrap(np.random.default_rng(3).normal(0.005, 0.04, 240), block=12)
+    a = time_to_goal_bootstrap(100_000, 2_000, bb, 600, 3_000, 1_000_000, seed=7, chunk=1_000)
+    assert a == time_to_goal_bootstrap(100_000, 2_000, bb, 600, 3_000, 1_000_000, seed=7, chunk=1_000)
+    assert a["p10"] <= a["p50"] <= a["p90"]
+
+def test_cli_runs_with_returns(avanza_files, tmp_path, monkeypatch):
+    pos, trx = avanza_files
+    f = _write_returns(tmp_path / "r.csv", np.random.default_rng(0).normal(0.005, 0.04, 120).round(4))
+    monkeypatch.chdir(tmp_path)
+    rc = cli.main(["--positions", str(pos), "--transactions", str(trx), "--goal", "1000000",
+                   "--report", "r.csv", "--paths", "500", "--returns", str(f), "--bootstrap", "moving"])
+    assert rc == 0
+    assert pd.read_csv(tmp_path / "result" / "diagnostics.csv")["bootstrap"].iloc[-1] == "moving:12"
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from moneygoal.sim.coarse import TOLERANCE_MONTHS, hitting_months_bridge
+from moneygoal.sim.engine import time_to_goal
+from moneygoal.sim.kernel import hitting_months, lognormal_factors
+from moneygoal.sim.monte_carlo import time_to_goal_mc
+from moneygoal.sim.returns import Lognormal, StudentT
+
+# Monte Carlo-brus vid 50k paths (olika slumpströmmar) utöver metodens tolerans
+NOISE_MONTHS = 2
+
+@pytest.mark.parametrize("step", [3, 12])
+@pytest.mark.parametrize("case", [
+    (100_000, 2_000, 0.06, 0.15, 1_000_000),
+    (0, 1_000, 0.08, 0.25, 2_000_000),
+    (500_000, 0, 0.05, 0.20, 1_000_000),
+])
+def test_quarter_and_year_within_tolerance_of_monthly(step, case):
+    V0, c, cagr, vol, goal = case
+    args = (V0, c, cagr, vol, 600, 50_000, goal, 1)
+    ref, got = time_to_goal_mc(*args), time_to_goal_mc(*args, step=step)
+    for k in ("p10", "p50", "p90"):
+        assert abs(got[k] - ref[k]) <= TOLERANCE_MONTHS + NOISE_MONTHS, (k, ref, got)
+
+def test_deterministic_path_is_exact():
+    f = lognormal_factors(np.zeros((600, 100)), 0.07, 0.0)
+    exact = hitting_months(50_000, 1_500, f, 800_000)
+    for step in (3, 12, 7):
+        got = hitting_months_bridge(50_000, 1_500, 0.07, 0.0, 800_000, 600, 100, step, np.random.default_rng(1))
+        assert np.array_equal(got, exact)
+
+def test_step_validation_and_seed():
+    kw = dict(nuvarde=100_000, mean_monthly_contrib=2_000, max_months=240, paths=500, goal=1_000_000, seed=3)
+    m = Lognormal(0.06, 0.15)
+    assert time_to_goal(model=m, step=12, **kw) == time_to_goal(model=m, step=12, **kw)
+    for bad in (dict(model=StudentT(0.06, 0.15), step=3), dict(model=m, step=3, compact=True),
+                dict(model=m, step=0)):
+        with pytest.raises(ValueError):
+            time_to_goal(**{**kw, **bad})
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from moneygoal.sim.engine import time_to_goal
+from moneygoal.sim.kernel import (
+    COMPACT_MAX_MONTHS, hitting_months, hitting_months_compact, lognormal_factors,
+    percentiles, percentiles_from_counts, shock_bank,
+)
+from moneygoal.sim.returns import Lognormal, StudentT
+
+@pytest.mark.parametrize("seed, cagr, vol, goal", [
+    (5, 0.06, 0.15, 1_000_000), (6, 0.03, 0.30, 1_000_000), (7, 0.08, 0.25, 5_000_000), (8, 0.0, 0.05, 300_000),
+])
+def test_compact_kernel_within_empirical_tolerance_of_float64(seed, cagr, vol, goal):
+    f64 = lognormal_factors(shock_bank(seed, 20_000, 600), cagr, vol)
+    ref = hitting_months(100_000, 2_000, f64, goal)
+    n = f64.shape[1]
+    out = np.empty(n, np.uint16)
+    got = hitting_months_compact(100_000, 2_000, f64.astype(np.float32), goal, out,
+                                 np.empty(n, np.float32), np.empty(n, bool), np.empty(n, bool))
+    # Ingen garanti per bana (se kernel.py); mät andelen banor som byter månad
+    assert np.mean(got.astype(np.int64) != ref) <= 1e-3
+    a, b = percentiles(ref), percentiles(got)
+    assert all(abs(a[k] - b[k]) <= 1 for k in a)
+    assert percentiles_from_counts(np.bincount(got, minlength=602)) == b
+
+def test_compact_engine_matches_analytic_and_float64():
+    kw = dict(nuvarde=100_000, mean_monthly_contrib=2_000, max_months=360, goal=200_000)
+    assert time_to_goal(model=Lognormal(0.0, 0.0), paths=1_234, chunk=500, compact=True, **kw) == \
+        {"p10": 50, "p50": 50, "p90": 50}
+    # modell utan fill(): samma slump som float64-vägen, castas in i bufferten
+    kw = dict(nuvarde=100_000, mean_monthly_contrib=2_000, max_months=600, goal=1_000_000,
+              paths=5_123, seed=9, chunk=2_000)
+    a = time_to_goal(model=StudentT(0.06, 0.15), **kw)
+    b = time_to_goal(model=StudentT(0.06, 0.15), compact=True, **kw)
+    assert all(abs(a[k] - b[k]) <= 1 for k in a)
+
+def test_compact_is_seeded_and_rejects_too_long_horizon():
+    kw = dict(nuvarde=100_000, mean_monthly_contrib=2_000, model=Lognormal(0.06, 0.15),
+              paths=3_000, goal=1_000_000, seed=4, compact=True)
+    assert time_to_goal(max_months=600, **kw) == time_to_goal(max_months=600, **kw)
+    with pytest.raises(ValueError):
+        time_to_goal(max_months=COMPACT_MAX_MONTHS + 1, **kw)
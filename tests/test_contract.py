@@ -0,0 +1,56 @@
+import io
+
+import pandas as pd
+import pytest
+from moneygoal import cli
+from moneygoal.io.avanza_csv import normalize_transactions
+from moneygoal.io.contract import ContractReport, validate_files, validate_positions, validate_transactions
+
+TRX_BAD = (
+    "Datum;Typ av transaktion;Belopp;Transaktionsvaluta\n"
+    "2020-01-15;Insättning;100 000;SEK\n"
+    "2020-13-01;Insättning;50 000;SEK\n"      # rad 3: ogiltigt datum
+    "2020-06-15;Insättning;5O,00;SEK\n"       # rad 4: bokstaven O
+    "2020-07-15;Uttag;;SEK\n"                 # rad 5: tomt belopp för uttag
+    "2020-08-15;Övrigt;;sek\n"                # rad 6: tomt ok, valuta fel
+    "2020-09-15;Mystisk;10;SEK\n"             # rad 7: okänd typ (varning)
+)
+
+def test_reports_every_bad_row_in_one_pass():
+    raw = pd.read_csv(io.StringIO(TRX_BAD), sep=";", dtype=str)
+    r = validate_transactions(raw)
+    assert not r.ok
+    rows = {(i.column, i.row) for i in r.issues if i.severity == "error"}
+    assert rows == {("Datum", 3), ("Belopp", 4), ("Belopp", 5), ("Transaktionsvaluta", 6)}
+    assert [i.row for i in r.issues if i.rule == "okänd transaktionstyp"] == [7]
+    assert r.n_errors == 4 and r.n_warnings == 2   # + kolumnantal ≠ 13
+    assert r.to_frame().shape[0] == len(r.issues)
+
+def test_report_is_capped_but_counts_are_exact():
+    n = 10_000
+    raw = pd.DataFrame({"Marknadsvärde": ["x"] * n, "Valuta": ["SEK"] * n, "ISIN": ["SE0000000001"] * n})
+    r = validate_positions(raw, ContractReport(max_per_rule=5))
+    assert r.counts[("positions", "Marknadsvärde", "ogiltigt tal", "error")] == n
+    assert len(r.issues) == 5 and r.truncated
+    assert "10000 rader" in r.summary_lines()[0]
+
+def test_missing_columns_are_file_level_errors():
+    r = validate_positions(pd.DataFrame({"Valuta": ["SEK"]}))
+    assert {(i.column, i.row) for i in r.issues} == {("Marknadsvärde", None), ("ISIN", None)}
+
+def test_normalize_error_names_rows():
+    df = pd.DataFrame({"Datum": ["2020-01-01", "2020-02-30"], "Typ": ["Insättning"] * 2, "Belopp": ["1", "2"]})
+    with pytest.raises(ValueError, match="rad 3"):
+        normalize_transactions(df)
+
+def test_valid_fixture_passes_and_cli_stops_on_bad_data(avanza_files, tmp_path, monkeypatch, capsys):
+    pos, trx = avanza_files
+    report, raw_pos, raw_trx = validate_files(pos, trx)
+    assert report.ok and len(raw_pos) == 2 and len(raw_trx) == 5
+    bad = tmp_path / "bad.csv"
+    bad.write_text(TRX_BAD, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    rc = cli.main(["--positions", str(pos), "--transactions", str(bad), "--goal", "1000000", "--report", "r.csv"])
+    err = capsys.readouterr().err
+    assert rc == 1 and "DATAERROR" in err and "rad 3" in err and "rad 6" in err
+    assert not (tmp_path / "r.csv").exists()
@@ -41,3 +41,15 @@ def test_ignore_other_types():
     rows = prepare_contribution_rows(df)
     assert rows.empty
     assert mean_monthly_contribution(rows) == 0.0
+
+def test_empty_input_matches_nonempty_columns_and_month_type():
+    empty = prepare_contribution_rows(pd.DataFrame(columns=["Datum", "Typ", "Belopp"]))
+    full = prepare_contribution_rows(_trx(pd.DataFrame({
+        "Datum": ["2025-01-01"], "Typ": ["Insättning"], "Belopp": [100.0]})))
+    assert list(empty.columns) == list(full.columns)
+    # Månad är "YYYY-MM"-sträng i båda fallen (inte period[M])
+    for rows in (empty, full):
+        assert pd.api.types.is_string_dtype(rows["Månad"])
+        assert pd.api.types.is_datetime64_any_dtype(rows["Datum"])
+        assert rows["Belopp_signed"].dtype == float
+    assert mean_monthly_contribution(empty) == 0.0
@@ -0,0 +1,46 @@
+import pandas as pd
+from moneygoal import cli
+from moneygoal.fleet import discover_clients, read_goals, run_fleet
+from tests.conftest import POSITIONS_CSV, TRANSACTIONS_CSV
+
+PARAMS = {"goal": 1_000_000.0, "cagr": 0.06, "vol": 0.15, "paths": 200, "seed": 1, "maxhorisont": 600,
+          "dividends": "reinvest", "xirr_monthly": False, "asof": "2025-01-01"}
+
+def _tree(root):
+    for name in ("a", "b", "nested/c"):
+        d = root / name
+        d.mkdir(parents=True)
+        (d / "positions.csv").write_text(POSITIONS_CSV, encoding="utf-8-sig")
+        (d / "transactions.csv").write_text(TRANSACTIONS_CSV, encoding="utf-8-sig")
+    (root / "b" / "positions.csv").write_text(POSITIONS_CSV.replace("250 000,00", "abc"), encoding="utf-8-sig")
+    (root / "d").mkdir()
+    (root / "d" / "positions.csv").write_text(POSITIONS_CSV, encoding="utf-8-sig")
+    return root
+
+def test_discover_and_isolate_failures(tmp_path):
+    clients = discover_clients(_tree(tmp_path / "kunder"))
+    assert [c.id for c in clients] == ["a", "b", "d", "nested/c"]
+    serial = run_fleet(clients, PARAMS, workers=1)
+    pooled = run_fleet(clients, PARAMS, {"nested/c": 2_000_000.0}, workers=2, io_threads=2, max_inflight=1)
+    assert [r["client"] for r in pooled] == ["a", "b", "d", "nested/c"]
+    assert serial[0]["p50_months"] == pooled[0]["p50_months"] and pooled[0]["error"] == ""
+    assert pooled[0]["V0"] == 400_000.5 and pooled[0]["xirr"] is not None
+    assert pooled[0]["xirr_error_bound"] is None
+    monthly = run_fleet(clients[:1], {**PARAMS, "xirr_monthly": True}, workers=1)[0]
+    assert monthly["xirr_error_bound"] is not None and abs(monthly["xirr"] - serial[0]["xirr"]) <= monthly["xirr_error_bound"]
+    assert "datakontrakt" in pooled[1]["error"] and "transactions" in pooled[2]["error"]
+    assert pooled[3]["goal"] == 2_000_000.0 and pooled[3]["p50_months"] > pooled[0]["p50_months"]
+
+def test_read_goals(tmp_path):
+    (tmp_path / "g.csv").write_text("client;goal\na;1 500 000\nnested/c;2000000,5\n", encoding="utf-8")
+    assert read_goals(tmp_path / "g.csv") == {"a": 1_500_000.0, "nested/c": 2_000_000.5}
+
+def test_cli_fleet_end_to_end(tmp_path, monkeypatch):
+    root = _tree(tmp_path / "kunder")
+    monkeypatch.chdir(tmp_path)
+    rc = cli.main(["fleet", "--root", str(root), "--goal", "1000000", "--paths", "200",
+                   "--report", "result/fleet.csv", "--workers", "2"])
+    assert rc == 0
+    rep = pd.read_csv("result/fleet.csv")
+    assert len(rep) == 4 and rep["error"].notna().sum() == 2
+    assert cli.main(["fleet", "--root", str(root), "--report", "r.txt"]) == 2
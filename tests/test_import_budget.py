@@ -0,0 +1,22 @@
+import subprocess
+import sys
+from benchmarks.bench_import import measure, _env
+
+# Budget för `import moneygoal.cli` (kumulativ importtid, bästa av 3).
+# Utan pandas ligger den på några tiotal ms; pandas ensamt kostar flera hundra.
+IMPORT_BUDGET_MS = 150.0
+
+def test_cli_import_is_light_and_within_budget():
+    res = measure("moneygoal.cli", runs=3)
+    assert res["heavy_imported"] == []
+    assert res["cumulative_ms"] < IMPORT_BUDGET_MS, res["top_ms"]
+
+def test_argerror_exit_does_not_import_pandas():
+    code = (
+        "import sys; from moneygoal import cli; "
+        "rc = cli.main(['--positions', 'saknas.csv', '--transactions', 'saknas.csv', "
+        "'--goal', '-1', '--report', 'r.csv']); "
+        "print(rc, 'pandas' in sys.modules)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=_env())
+    assert out.stdout.split() == ["2", "False"]
@@ -0,0 +1,48 @@
+import json
+import datetime as dt
+import pandas as pd
+from moneygoal import cli
+from moneygoal.instrument import Instrument, NULL_INSTRUMENT
+from moneygoal.models.mwrr import xirr
+
+def test_disabled_instrument_is_noop():
+    with NULL_INSTRUMENT.stage("mc"):
+        pass
+    NULL_INSTRUMENT.count("rows", 10)
+    assert NULL_INSTRUMENT.diag_fields() == {}
+
+def test_stage_timings_and_counters():
+    inst = Instrument()
+    with inst.stage("mc"):
+        sum(range(1000))
+    inst.count("mc_paths", 500)
+    inst.rate("mc_paths_per_s", "mc_paths", "mc")
+    fields = inst.diag_fields()
+    assert fields["t_mc_s"] >= 0
+    assert fields["mc_paths"] == 500
+    assert fields["mc_paths_per_s"] > 0
+    rec = json.loads(inst.to_json(event="stages"))
+    assert rec["event"] == "stages" and "mc" in rec["stages"]
+
+def test_xirr_reports_iterations():
+    stats = {}
+    xirr([(dt.date(2020, 1, 1), -1000.0), (dt.date(2021, 1, 1), 1100.0)], stats=stats)
+    assert stats["iterations"] > 0
+    assert stats["npv_evals"] >= stats["iterations"]
+    assert stats["n_flows"] == 2
+
+def test_cli_profile_writes_stage_columns(avanza_files, tmp_path, monkeypatch):
+    pos, trx = avanza_files
+    monkeypatch.chdir(tmp_path)
+    rc = cli.main([
+        "--positions", str(pos), "--transactions", str(trx),
+        "--goal", "1000000", "--report", "result/summary.csv",
+        "--paths", "200", "--profile",
+    ])
+    assert rc == 0
+    diag = pd.read_csv("result/diagnostics.csv")
+    for col in ["t_read_s", "t_mc_s", "t_xirr_s", "rows_transactions", "xirr_iterations"]:
+        assert col in diag.columns
+    assert (tmp_path / "result/profile/mc.prof").is_file()
+    summary = json.loads((tmp_path / "result/profile/summary.json").read_text())
+    assert summary["peaks"]["mc"] > 0
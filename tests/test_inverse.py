@@ -0,0 +1,38 @@
+import pytest
+from moneygoal import cli
+from moneygoal.sim.inverse import required_contribution, required_cagr
+from moneygoal.sim.kernel import shock_bank, lognormal_factors, hitting_months, percentiles
+
+def test_contribution_deterministic_matches_analytic():
+    # 100k -> 200k på 50 mån utan avkastning ⇒ exakt 2 000 kr/mån
+    c = required_contribution(100_000, 200_000, 50, 0.9, cagr=0.0, vol=0.0, paths=100, seed=1)
+    assert c == pytest.approx(2_000.0)
+
+def test_contribution_hits_target_percentile_on_same_shocks():
+    kw = dict(goal=1_000_000, deadline_months=120, confidence=0.9)
+    c = required_contribution(200_000, cagr=0.06, vol=0.15, paths=2000, seed=7, **kw)
+    f = lognormal_factors(shock_bank(7, 2000, 120), 0.06, 0.15)
+    assert percentiles(hitting_months(200_000, c * 1.0001, f, 1_000_000))["p90"] <= 120
+    assert percentiles(hitting_months(200_000, c * 0.99, f, 1_000_000))["p90"] > 120
+
+def test_contribution_monotone_in_confidence_and_deterministic():
+    a = required_contribution(100_000, 1_000_000, 120, 0.5, 0.06, 0.15, paths=1000, seed=3)
+    b = required_contribution(100_000, 1_000_000, 120, 0.9, 0.06, 0.15, paths=1000, seed=3)
+    assert a < b
+    assert b == required_contribution(100_000, 1_000_000, 120, 0.9, 0.06, 0.15, paths=1000, seed=3)
+
+def test_required_cagr():
+    g = required_cagr(100_000, 3_000, 1_000_000, 240, 0.9, vol=0.15, paths=1000, seed=5)
+    assert 0.0 < g < 1.0
+    assert required_cagr(100_000, 3_000, 100_000, 240, 0.9, vol=0.15, paths=1000) == 0.0
+    with pytest.raises(ValueError):
+        required_cagr(1_000, 0, 1e12, 12, 0.9, vol=0.15, paths=1000, seed=5)
+
+def test_cli_solve(avanza_files, tmp_path, monkeypatch):
+    pos, trx = avanza_files
+    monkeypatch.chdir(tmp_path)
+    rc = cli.main(["solve", "--positions", str(pos), "--goal", "1000000", "--deadline", "120",
+                   "--paths", "500", "--report", str(tmp_path / "solve.csv")])
+    assert rc == 0 and (tmp_path / "solve.csv").is_file()
+    assert cli.main(["solve", "--positions", str(pos), "--goal", "1000000", "--deadline", "120",
+                     "--solve-for", "cagr"]) == 2  # saknar --transactions
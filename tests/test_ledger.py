@@ -0,0 +1,45 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+from moneygoal.contrib import mean_monthly_contribution, prepare_contribution_rows
+from moneygoal.diagnostics import compute_xirr_from_frames, compute_xirr_from_ledger
+from moneygoal.ledger import build_ledger, contribution_rows, dividends_per_month, xirr_flows
+
+def _trx():
+    return pd.DataFrame({
+        "Datum": pd.to_datetime(["2024-01-10", "2024-01-20", "2024-02-05", "2024-02-15",
+                                 "2024-03-01", "2024-03-02", "2024-03-03"]),
+        "Typ": ["Insättning", "Köp", "Utdelning", "Utländsk källskatt", "Uttag", "Sälj", "Övrigt"],
+        "Belopp": [10_000.0, -9_000.0, 300.0, -45.0, 2_000.0, 500.0, 1.0],
+    })
+
+def test_one_pass_classifies_every_row():
+    led = build_ledger(_trx())
+    assert led["category"].tolist() == ["contribution", "trade", "dividend", "fee",
+                                        "withdrawal", "trade", "other"]
+    assert led["contribution"].sum() == 10_000.0 and led["withdrawal"].sum() == -2_000.0
+    assert led["trade"].sum() == -8_500.0 and led["fee"].sum() == -45.0
+    assert (led.iloc[-1][["contribution", "withdrawal", "dividend", "trade", "fee"]] == 0).all()
+    assert led["Månad"].tolist()[:3] == ["2024-01", "2024-01", "2024-02"]
+    assert dividends_per_month(led).to_dict() == {"2024-02": 300.0}
+
+def test_contributions_match_legacy_and_dividend_toggle():
+    led = build_ledger(_trx())
+    rows = contribution_rows(led)
+    assert rows["Belopp_signed"].tolist() == [10_000.0, -2_000.0]
+    assert mean_monthly_contribution(prepare_contribution_rows(_trx())) == mean_monthly_contribution(rows)
+    cash = contribution_rows(led, "cash")
+    assert cash["Belopp_signed"].tolist() == [10_000.0, -300.0, -2_000.0]
+    with pytest.raises(ValueError):
+        contribution_rows(led, "spend")
+
+def test_xirr_flows_and_dividends_as_cash():
+    led = build_ledger(_trx())
+    asof = dt.date(2025, 1, 1)
+    assert xirr_flows(led, 9_000.0, asof) == [
+        (dt.date(2024, 1, 10), -10_000.0), (dt.date(2024, 3, 1), 2_000.0), (asof, 9_000.0),
+    ]
+    base = compute_xirr_from_ledger(led, 9_000.0, asof=asof)
+    assert base == compute_xirr_from_frames(_trx(), pd.DataFrame({"Marknadsvärde": [9_000.0]}), asof=asof)
+    assert compute_xirr_from_ledger(led, 9_000.0, asof=asof, dividends="cash") > base
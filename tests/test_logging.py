@@ -0,0 +1,53 @@
+import json
+import logging
+from moneygoal.instrument import Instrument
+from moneygoal.logsetup import setup_logging, flush_logging, new_run_id
+from moneygoal.logreport import stage_latency_summary
+
+def _lines(path):
+    return [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines() if l.strip()]
+
+def test_json_lines_with_run_id_and_stages(tmp_path):
+    log = tmp_path / "app.log"
+    setup_logging(log)
+    rid = new_run_id()
+    inst = Instrument()
+    with inst.stage("mc"):
+        pass
+    logging.info("stages", extra=inst.to_record())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.exception("Run failed")
+    flush_logging()
+
+    recs = _lines(log)
+    stages = [r for r in recs if r["message"] == "stages"]
+    assert stages and stages[-1]["run_id"] == rid
+    assert "mc" in stages[-1]["stages"]
+    failed = [r for r in recs if r["message"] == "Run failed"][-1]
+    assert "ValueError: boom" in failed["exc"]
+
+def test_rotation_keeps_backup_count(tmp_path):
+    log = tmp_path / "rot.log"
+    setup_logging(log, max_bytes=2000, backup_count=3)
+    for i in range(500):
+        logging.info("rad %d", i)
+    flush_logging()
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["rot.log", "rot.log.1", "rot.log.2", "rot.log.3"]
+
+def test_stage_latency_summary_across_rotated_files(tmp_path):
+    (tmp_path / "app.log.1").write_text(
+        json.dumps({"message": "stages", "stages": {"mc": 1.0, "read": 0.1}}) + "\n", encoding="utf-8"
+    )
+    (tmp_path / "app.log").write_text(
+        "gammal textrad\n"
+        + "".join(json.dumps({"message": "stages", "stages": {"mc": float(v)}}) + "\n" for v in (2, 3, 4)),
+        encoding="utf-8",
+    )
+    s = stage_latency_summary(tmp_path / "app.log")
+    assert s["mc"]["n"] == 4
+    assert s["mc"]["p50"] == 2.0
+    assert s["mc"]["max"] == 4.0
+    assert s["read"]["n"] == 1
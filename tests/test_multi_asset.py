@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from moneygoal import cli
+from moneygoal.sim.multi_asset import (
+    AssetAssumptions, read_assumptions, asset_values, correlation_factor, time_to_goal_multi,
+)
+
+ASSUMPTIONS_TOML = """
+default = "FUND"
+correlation = [[1.0, 0.5], [0.5, 1.0]]
+
+[[asset]]
+key = "SE0000000001"
+cagr = 0.07
+vol = 0.20
+
+[[asset]]
+key = "FUND"
+cagr = 0.05
+vol = 0.10
+"""
+
+def _same_asset_twice(corr):
+    return AssetAssumptions(("A", "B"), np.array([0.06, 0.06]), np.array([0.15, 0.15]),
+                            np.array([[1.0, corr], [corr, 1.0]]))
+
+def test_read_assumptions_and_map_holdings(tmp_path):
+    f = tmp_path / "a.toml"
+    f.write_text(ASSUMPTIONS_TOML, encoding="utf-8")
+    a = read_assumptions(f)
+    pos = pd.DataFrame({"ISIN": ["SE0000000001", "SE0000000002", "SE0000000003"],
+                        "Marknadsvärde": [100.0, 50.0, 25.0]})
+    used, values = asset_values(pos, a)
+    assert used.keys == ("SE0000000001", "FUND")
+    assert values.tolist() == [100.0, 75.0]     # okända ISIN → default
+    with pytest.raises(KeyError):
+        asset_values(pos, AssetAssumptions(a.keys, a.cagr, a.vol, a.corr))
+
+def test_invalid_correlation_rejected():
+    with pytest.raises(ValueError):
+        AssetAssumptions(("A", "B"), np.zeros(2), np.ones(2), np.array([[1.0, 0.5], [0.4, 1.0]]))
+    with pytest.raises(ValueError):
+        correlation_factor(np.array([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]]))
+    L = correlation_factor(np.ones((2, 2)))     # semidefinit (korrelation 1) är ok
+    assert np.allclose(L @ L.T, np.ones((2, 2)))
+
+def test_deterministic_case_matches_analytic():
+    a = AssetAssumptions(("A", "B"), np.zeros(2), np.zeros(2), np.eye(2))
+    mc = time_to_goal_multi(np.array([60_000.0, 40_000.0]), 2_000, a, 360, 200, 200_000, seed=1)
+    assert mc == {"p10": 50, "p50": 50, "p90": 50}
+
+def test_rebalancing_is_noop_for_perfectly_correlated_identical_assets():
+    a = _same_asset_twice(1.0)
+    kw = dict(values=np.array([50_000.0, 50_000.0]), mean_monthly_contrib=2_000, assumptions=a,
+              max_months=600, paths=2_000, goal=1_000_000, seed=3)
+    assert time_to_goal_multi(**kw) == time_to_goal_multi(**kw, rebalance_months=12)
+
+def test_diversification_narrows_spread():
+    kw = dict(values=np.array([50_000.0, 50_000.0]), mean_monthly_contrib=1_000,
+              max_months=600, paths=4_000, goal=1_000_000, seed=4, rebalance_months=1)
+    hi = time_to_goal_multi(assumptions=_same_asset_twice(1.0), **kw)
+    lo = time_to_goal_multi(assumptions=_same_asset_twice(0.0), **kw)
+    assert lo["p90"] - lo["p10"] < hi["p90"] - hi["p10"]
+
+def test_cli_runs_with_assumptions(avanza_files, tmp_path, monkeypatch):
+    pos, trx = avanza_files
+    f = tmp_path / "a.toml"
+    f.write_text(ASSUMPTIONS_TOML, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    rc = cli.main(["--positions", str(pos), "--transactions", str(trx), "--goal", "1000000",
+                   "--report", "r.csv", "--paths", "500", "--assumptions", str(f), "--rebalance", "12"])
+    assert rc == 0
+    diag = pd.read_csv(tmp_path / "result" / "diagnostics.csv")
+    assert diag["rebalance_months"].iloc[-1] == 12
+    assert cli.main(["--positions", str(pos), "--transactions", str(trx), "--goal", "1",
+                     "--report", "r.csv", "--assumptions", "nope.toml"]) == 2
+
+def test_toml_without_loader_is_an_argerror(avanza_files, tmp_path, monkeypatch):
+    import moneygoal.io.tomlfile as tomlfile
+    pos, trx = avanza_files
+    f = tmp_path / "a.toml"
+    f.write_text(ASSUMPTIONS_TOML, encoding="utf-8")
+    monkeypatch.setattr(tomlfile, "_loader", lambda: None)  # som Python 3.10 utan tomli
+    with pytest.raises(ValueError, match="tomli"):
+        read_assumptions(f)
+    monkeypatch.chdir(tmp_path)
+    assert cli.main(["--positions", str(pos), "--transactions", str(trx), "--goal", "1000000",
+                     "--report", "r.csv", "--assumptions", str(f)]) == 2
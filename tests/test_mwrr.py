@@ -14,3 +14,32 @@ def test_xirr_multiple_flows_stable():
            (dt.date(2022,1,1),  1500.0)]
     r = xirr(cfs)
     assert -0.5 < r < 0.5
+
+def test_same_day_flows_are_netted_exactly():
+    from moneygoal.models.mwrr import net_flows
+    d0, d1 = dt.date(2020,1,1), dt.date(2021,1,1)
+    split = [(d0, -0.1)] * 10_000 + [(d1, 1_100.0)]
+    assert net_flows(split) == [(d0, -1_000.0), (d1, 1_100.0)]
+    stats = {}
+    assert abs(xirr(split, stats) - 0.10) < 1e-6
+    assert stats["n_flows"] == 10_001 and stats["n_dates"] == 2
+
+def test_monthly_compression_reports_error_bound():
+    import pytest
+    start = dt.date(2018,1,1)
+    cfs = [(start + dt.timedelta(days=i), -10.0 - i % 7) for i in range(1_500)]
+    cfs += [(dt.date(2022,6,1), 25_000.0)]
+    exact, stats = xirr(cfs), {}
+    approx = xirr(cfs, stats, compress="month")
+    assert stats["n_buckets"] < 60 and stats["n_dates"] == 1_501
+    assert 0 < stats["error_bound"] < 1e-3
+    assert abs(approx - exact) <= stats["error_bound"]
+    with pytest.raises(ValueError):
+        xirr(cfs, compress="week")
+
+def test_empty_or_one_sided_flows_raise_value_error():
+    import pytest
+    for cfs in ([], [(dt.date(2020,1,1), -1000.0)]):
+        for compress in (None, "month"):
+            with pytest.raises(ValueError, match="både negativa och positiva"):
+                xirr(cfs, compress=compress)
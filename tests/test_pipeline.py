@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+from moneygoal import cli
+from moneygoal.pipeline import MC_DEFAULTS, Pipeline, Stage, default_pipeline
+
+
+def _params(pos, trx, **kw):
+    p = {"positions": pos, "transactions": trx, "asof": "2025-01-01", "goal": 1_000_000.0,
+         "cagr": 0.06, "vol": 0.15, "paths": 200, "seed": 1, "maxhorisont": 600, **MC_DEFAULTS}
+    p.update(kw)
+    return p
+
+TARGETS = ["V0", "contrib", "xirr", "mc", "report"]
+
+def test_goal_change_reruns_only_mc_and_report(avanza_files):
+    pos, trx = avanza_files
+    pipe = default_pipeline()
+    first = pipe.run(TARGETS, _params(pos, trx))
+    assert set(first.computed) == {"raw_positions", "raw_transactions", "read_positions", "read_transactions",
+                                   "ledger", "V0", "contrib", "holdings", "xirr", "mc", "report"}
+    again = pipe.run(TARGETS, _params(pos, trx))
+    assert again.computed == [] and again["mc"] == first["mc"]
+    moved = pipe.run(TARGETS, _params(pos, trx, goal=2_000_000.0))
+    assert moved.computed == ["mc", "report"]
+    assert moved["mc"]["p50"] > first["mc"]["p50"]
+
+def _edit(path, old, new):
+    path.write_text(path.read_text(encoding="utf-8-sig").replace(old, new), encoding="utf-8-sig")
+
+def test_positions_change_skips_contrib_and_mc_unless_v0_moved(avanza_files):
+    pos, trx = avanza_files
+    pipe = default_pipeline()
+    v0 = pipe.run(TARGETS, _params(pos, trx))["V0"]
+    _edit(pos, "Fond A", "Fond A (ny export)")          # samma V0
+    run = pipe.run(TARGETS, _params(pos, trx))
+    assert set(run.computed) == {"raw_positions", "read_positions", "V0", "holdings"}
+    _edit(pos, "250 000,00", "350 000,00")              # V0 flyttar sig
+    run = pipe.run(TARGETS, _params(pos, trx))
+    assert run["V0"] == pytest.approx(v0 + 100_000)
+    assert "mc" in run.computed and "report" in run.computed
+    assert "contrib" not in run.computed and "read_transactions" not in run.computed
+
+def test_transactions_change_reruns_contrib(avanza_files):
+    pos, trx = avanza_files
+    pipe = default_pipeline()
+    pipe.run(TARGETS, _params(pos, trx))
+    _edit(trx, "120 000", "180 000")
+    run = pipe.run(TARGETS, _params(pos, trx))
+    assert {"read_transactions", "ledger", "contrib", "mc", "xirr"} <= set(run.computed)
+    assert "read_positions" not in run.computed
+
+def test_disk_cache_is_shared_between_processes(avanza_files, tmp_path):
+    pos, trx = avanza_files
+    default_pipeline(tmp_path / "cache").run(TARGETS, _params(pos, trx))
+    run = default_pipeline(tmp_path / "cache").run(TARGETS, _params(pos, trx, goal=900_000.0))
+    assert run.computed == ["mc", "report"]
+    assert set(run.reused) >= {"V0", "contrib", "xirr"}
+
+def test_code_change_invalidates_disk_cache(avanza_files, tmp_path, monkeypatch):
+    import moneygoal.pipeline as pipeline
+    pos, trx = avanza_files
+    default_pipeline(tmp_path / "cache").run(TARGETS, _params(pos, trx))
+    monkeypatch.setattr(pipeline, "code_fingerprint", lambda: "annan version")
+    run = default_pipeline(tmp_path / "cache").run(TARGETS, _params(pos, trx))
+    assert run.reused == [] and "mc" in run.computed
+
+def test_underscore_params_are_not_fingerprinted_and_stages_can_be_replaced(avanza_files):
+    pos, trx = avanza_files
+    calls = []
+    mc = Stage("mc", lambda V0, goal, _tag: calls.append(_tag) or {"p10": 1, "p50": 2, "p90": 3},
+               ("V0", "goal", "_tag"))
+    pipe = default_pipeline().replace(mc)
+    assert pipe.run(["report"], _params(pos, trx, _tag="a"))["report"]["months"].tolist() == [1, 2, 3]
+    pipe.run(["report"], _params(pos, trx, _tag="b"))
+    assert calls == ["a"]
+
+def test_stage_order_is_checked():
+    with pytest.raises(ValueError, match="senare steg"):
+        Pipeline([Stage("a", lambda b: b, ("b",)), Stage("b", lambda x: x, ("x",))])
+
+def test_cli_second_run_reuses_stages(avanza_files, tmp_path, monkeypatch):
+    pos, trx = avanza_files
+    monkeypatch.chdir(tmp_path)
+    base = ["--positions", str(pos), "--transactions", str(trx), "--report", "r.csv", "--paths", "200"]
+    assert cli.main(base + ["--goal", "1000000"]) == 0
+    assert cli.main(base + ["--goal", "1500000"]) == 0
+    diag = pd.read_csv("result/diagnostics.csv")
+    assert diag["pipeline_reused"].tolist()[-1] >= 5
+    assert pd.isna(diag["t_read_s"].iloc[-1]) and diag["t_mc_s"].iloc[-1] > 0
+    # Helt cachad körning: räknarna spelas upp från när stegen räknades
+    assert cli.main(base + ["--goal", "1500000"]) == 0
+    last = pd.read_csv("result/diagnostics.csv").iloc[-1]
+    assert pd.isna(last["t_mc_s"]) and last["mc_paths"] == 200
+    assert last["rows_positions"] == diag["rows_positions"].iloc[0] and last["rows_transactions"] > 0
+    assert last["mc_paths_per_s"] > 0
+
+def test_dividend_mode_reruns_contrib_but_not_ledger(avanza_files):
+    pos, trx = avanza_files
+    pipe = default_pipeline()
+    pipe.run(TARGETS, _params(pos, trx))
+    run = pipe.run(TARGETS, _params(pos, trx, dividends="cash"))
+    assert "ledger" not in run.computed and {"contrib", "xirr"} <= set(run.computed)
@@ -0,0 +1,47 @@
+import threading
+from moneygoal.sim.progressive import iter_time_to_goal, BackgroundRun
+
+PARAMS = dict(nuvarde=100_000, mean_monthly_contrib=2_000, cagr=0.06, vol=0.15,
+              max_months=600, paths=5_000, goal=1_000_000, seed=42)
+
+def test_chunks_grow_and_final_is_deterministic():
+    snaps = list(iter_time_to_goal(**PARAMS, first_chunk=250))
+    assert [s.paths_done for s in snaps] == [250, 750, 1750, 3750, 5000]
+    assert snaps[-1].done and not snaps[0].done
+    again = list(iter_time_to_goal(**PARAMS, first_chunk=250))[-1]
+    assert again.as_dict() == snaps[-1].as_dict()
+    assert snaps[-1].p10 <= snaps[-1].p50 <= snaps[-1].p90
+    # konvergensintervallet krymper med fler banor
+    assert snaps[-1].ci["p50"] <= snaps[0].ci["p50"]
+
+def test_deterministic_case_matches_analytic():
+    last = list(iter_time_to_goal(100_000, 2_000, 0.0, 0.0, 360, 200, 200_000, seed=1))[-1]
+    assert last.as_dict() == {"p10": 50, "p50": 50, "p90": 50}
+    assert last.converged
+
+def test_cancel_stops_between_chunks():
+    ev = threading.Event()
+    gen = iter_time_to_goal(**{**PARAMS, "paths": 100_000}, first_chunk=100, cancel=ev)
+    first = next(gen)
+    ev.set()
+    rest = list(gen)
+    assert len(rest) == 1 and rest[0].cancelled and rest[0].paths_done == first.paths_done
+
+def test_background_run_idle_timeout_cancels():
+    bg = BackgroundRun("k", idle_timeout=0.0, **{**PARAMS, "paths": 1_000_000, "max_chunk": 500},
+                       first_chunk=100)
+    bg.join(timeout=10)
+    assert not bg.running
+    assert bg.latest().cancelled
+
+def test_background_runs_share_bounded_pool():
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        runs = [BackgroundRun(i, executor=pool, **{**PARAMS, "paths": 1_000, "seed": i}) for i in range(3)]
+        for bg in runs:
+            bg.join(timeout=10)
+        assert all(not bg.running and bg.latest().done for bg in runs)
+        # samma parametrar som egen tråd ⇒ samma resultat
+        solo = BackgroundRun("s", **{**PARAMS, "paths": 1_000, "seed": 0})
+        solo.join(timeout=10)
+        assert solo.latest().as_dict() == runs[0].latest().as_dict()
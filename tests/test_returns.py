@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from moneygoal import cli
+from moneygoal.sim.bootstrap import BlockBootstrap
+from moneygoal.sim.engine import time_to_goal
+from moneygoal.sim.monte_carlo import time_to_goal_mc
+from moneygoal.sim.returns import ReturnModel, Lognormal, StudentT, RegimeSwitching, MODELS
+
+class Constant:
+    """Minimal modell: fast tillväxt, visar att motorn bara kräver factors()."""
+    def __init__(self, g):
+        self.g = g
+    def factors(self, rng, months, paths):
+        return np.full((months, paths), self.g)
+
+def test_all_models_satisfy_protocol():
+    for cls in MODELS.values():
+        assert isinstance(cls(0.06, 0.15), ReturnModel)
+    assert isinstance(BlockBootstrap(np.zeros(24)), ReturnModel)
+    assert isinstance(Constant(1.0), ReturnModel)
+
+def test_engine_is_model_agnostic():
+    assert time_to_goal(100_000, 2_000, Constant(1.0), 360, 200, 200_000) == {"p10": 50, "p50": 50, "p90": 50}
+    a = time_to_goal_mc(100_000, 2_000, 0.06, 0.15, 600, 3_000, 1_000_000, seed=1)
+    assert a == time_to_goal(100_000, 2_000, Lognormal(0.06, 0.15), 600, 3_000, 1_000_000, seed=1)
+
+@pytest.mark.parametrize("model", [Lognormal(0.06, 0.15), StudentT(0.06, 0.15, df=4), RegimeSwitching(0.06, 0.15)])
+def test_models_give_finite_positive_factors(model):
+    f = model.factors(np.random.default_rng(0), 120, 2_000)
+    assert f.shape == (120, 2_000) and np.all(np.isfinite(f)) and np.all(f > 0)
+
+def test_student_t_matches_target_vol_with_fatter_tails():
+    rng = np.random.default_rng(1)
+    lt = np.log(StudentT(0.06, 0.15, df=4).factors(rng, 600, 2_000))
+    ln = np.log(Lognormal(0.06, 0.15).factors(rng, 600, 2_000))
+    assert lt.std() == pytest.approx(0.15 / np.sqrt(12), rel=0.05)
+    kurt = lambda x: ((x - x.mean()) ** 4).mean() / x.var() ** 2
+    assert kurt(lt) > kurt(ln) + 1.0
+    with pytest.raises(ValueError):
+        StudentT(0.06, 0.15, df=2)
+
+def test_regime_switching_spends_stationary_share_in_bear():
+    m = RegimeSwitching(0.08, 0.12, bear_cagr=-0.30, bear_vol=0.0, p_bear=0.05, p_recover=0.20)
+    f = m.factors(np.random.default_rng(2), 400, 2_000)
+    bear_growth = (1 - 0.30) ** (1 / 12)
+    share = np.isclose(f, bear_growth).mean()
+    assert share == pytest.approx(0.05 / 0.25, abs=0.02)
+    # bear-perioder klumpar ihop sig: P(bear nästa mån | bear) ≈ 1 − p_recover
+    b = np.isclose(f, bear_growth)
+    assert (b[1:] & b[:-1]).sum() / b[:-1].sum() == pytest.approx(0.8, abs=0.03)
+
+def test_cli_model_flag(avanza_files, tmp_path, monkeypatch):
+    pos, trx = avanza_files
+    monkeypatch.chdir(tmp_path)
+    base = ["--positions", str(pos), "--transactions", str(trx), "--goal", "1000000", "--report", "r.csv", "--paths", "500"]
+    assert cli.main(base + ["--model", "regime"]) == 0
+    assert cli.main(base + ["--model", "student-t", "--df", "2"]) == 2
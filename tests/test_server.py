@@ -0,0 +1,87 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from moneygoal.server import make_server, MoneygoalService
+
+@pytest.fixture
+def base_url():
+    httpd = make_server("127.0.0.1", 0, workers=2)
+    t = threading.Thread(target=httpd.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.service.close()
+
+def _post(url, body):
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), method="POST",
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_load_simulate_and_cache(base_url, avanza_files):
+    pos, trx = avanza_files
+    st, pf = _post(base_url + "/portfolios", {"positions": str(pos), "transactions": str(trx)})
+    assert st == 200 and pf["V0"] == pytest.approx(400_000.5)
+    # samma filer ⇒ samma portfölj-id
+    assert _post(base_url + "/portfolios", {"positions": str(pos), "transactions": str(trx)})[1]["portfolio"] == pf["portfolio"]
+
+    body = {"portfolio": pf["portfolio"], "goal": 1_000_000, "paths": 200, "horizon": 240}
+    st, r1 = _post(base_url + "/time-to-goal", body)
+    assert st == 200 and r1["cached"] is False
+    st, r2 = _post(base_url + "/time-to-goal", body)
+    assert r2["cached"] is True and (r2["p10"], r2["p50"], r2["p90"]) == (r1["p10"], r1["p50"], r1["p90"])
+
+    st, x = _post(base_url + "/xirr", {"portfolio": pf["portfolio"]})
+    assert st == 200 and -1 < x["xirr"] < 10
+
+def test_concurrent_requests(base_url, avanza_files):
+    pos, trx = avanza_files
+    pid = _post(base_url + "/portfolios", {"positions": str(pos), "transactions": str(trx)})[1]["portfolio"]
+    bodies = [{"portfolio": pid, "goal": g, "paths": 100, "horizon": 120} for g in (5e5, 6e5, 7e5, 8e5) * 2]
+    with ThreadPoolExecutor(8) as ex:
+        res = list(ex.map(lambda b: _post(base_url + "/time-to-goal", b), bodies))
+    assert all(st == 200 for st, _ in res)
+    assert [r["p50"] for _, r in res[:4]] == [r["p50"] for _, r in res[4:]]
+
+def test_errors(base_url, tmp_path):
+    assert _post(base_url + "/portfolios", {"positions": str(tmp_path / "x.csv"), "transactions": "y"})[0] == 404
+    assert _post(base_url + "/time-to-goal", {"portfolio": "nope", "goal": 1})[0] == 404
+    assert _post(base_url + "/time-to-goal", {"portfolio": "nope"})[0] == 400
+    assert _post(base_url + "/xirr", {"portfolio": "nope", "dividends": "spend"})[0] == 400
+    assert _post(base_url + "/nope", {})[0] == 404
+
+def test_service_without_http(avanza_files):
+    pos, trx = avanza_files
+    with ThreadPoolExecutor(2) as ex:
+        svc = MoneygoalService(executor=ex)
+        pf = svc.load(str(pos), str(trx))
+        params = {"goal": 1e6, "cagr": 0.0, "vol": 0.0, "paths": 100, "seed": 1, "maxhorisont": 600}
+        mc, cached = svc.time_to_goal(pf.id, params)
+        assert not cached and mc["p50"] > 0
+        # Utdelningar som kontanter: lägre månadsspar, högre XIRR, egen cachepost
+        assert pf.contrib("cash") < pf.mmc and pf.xirr("cash") > pf.xirr()
+        cash, cached = svc.time_to_goal(pf.id, {**params, "dividends": "cash"})
+        assert not cached and cash["p50"] >= mc["p50"]
+
+def test_portfolio_cache_is_bounded_lru(avanza_files, tmp_path):
+    from moneygoal.server import RequestError
+    pos, trx = avanza_files
+    with ThreadPoolExecutor(1) as ex:
+        svc = MoneygoalService(executor=ex, portfolio_cache_size=2)
+        ids = []
+        for i in range(3):
+            p = tmp_path / f"positions_{i}.csv"
+            p.write_bytes(pos.read_bytes())
+            ids.append(svc.load(str(p), str(trx)).id)
+            if i == 1:
+                svc.get(ids[0])  # senast använd: ids[1] trängs ut i stället
+        assert svc.get(ids[0]).id == ids[0] and svc.get(ids[2]).id == ids[2]
+        with pytest.raises(RequestError):
+            svc.get(ids[1])
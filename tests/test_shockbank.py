@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from moneygoal.batch import run_scenarios
+from moneygoal.sim.engine import time_to_goal
+from moneygoal.sim.kernel import shock_bank
+from moneygoal.sim.returns import Lognormal
+from moneygoal.sim.shockbank import ShockStore
+from moneygoal.sim.whatif import WhatIfBank
+
+def _column_sum(args):
+    root, lo, hi = args
+    z = ShockStore(root).get(7, 120, 400)
+    return float(z[:, lo:hi].sum())
+
+def test_bank_matches_shock_bank_and_is_reused(tmp_path):
+    store = ShockStore(tmp_path)
+    z = store.get(5, 240, 300)
+    assert isinstance(z, np.memmap) and not z.flags.writeable
+    assert np.array_equal(z, shock_bank(5, 300, 240))
+    mtime = store.path(5, 240, 300, 300).stat().st_mtime_ns
+    store._generate = lambda *a: pytest.fail("banken genererades igen")
+    assert np.array_equal(store.get(5, 240, 300), z)
+    assert store.path(5, 240, 300, 300).stat().st_mtime_ns >= mtime
+    assert store.get(None, 240, 300) is None
+
+def test_engine_is_bit_identical_with_bank(tmp_path):
+    store, m = ShockStore(tmp_path), Lognormal(0.06, 0.15)
+    args = (100_000, 3_000, m, 480, 700, 1_000_000, 11)
+    assert time_to_goal(*args, chunk=300, shocks=store) == time_to_goal(*args, chunk=300)
+    assert store.path(11, 480, 700, 300).is_file()
+    bank = WhatIfBank(11, 700, 480, store=store)
+    assert bank.evaluate(100_000, 3_000, 0.06, 0.15, 1_000_000) == \
+        WhatIfBank(11, 700, 480).evaluate(100_000, 3_000, 0.06, 0.15, 1_000_000)
+
+def test_size_limit_and_lru_eviction(tmp_path):
+    one = 100 * 100 * 8
+    store = ShockStore(tmp_path, max_bank_bytes=one, max_total_bytes=2 * one + 1000)
+    assert store.get(1, 100, 101) is None
+    store.get(1, 100, 100)
+    store.get(2, 100, 100)
+    os.utime(store.path(1, 100, 100, 100), ns=(1, 1))
+    store.get(2, 100, 100)  # markerar 2 som senast använd
+    store.get(3, 100, 100)
+    assert not store.path(1, 100, 100, 100).exists()
+    assert store.path(2, 100, 100, 100).exists() and store.path(3, 100, 100, 100).exists()
+    assert store.usage() <= store.max_total_bytes
+
+def test_workers_share_one_file(tmp_path):
+    store = ShockStore(tmp_path)
+    z = store.get(7, 120, 400)
+    with ProcessPoolExecutor(max_workers=2) as ex:
+        sums = list(ex.map(_column_sum, [(str(tmp_path), 0, 200), (str(tmp_path), 200, 400)]))
+    assert sums == pytest.approx([z[:, :200].sum(), z[:, 200:].sum()])
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+    scs = [{"scenario": str(g), "goal": g, "cagr": 0.06, "vol": 0.15, "paths": 400, "seed": 7,
+            "maxhorisont": 120} for g in (200_000, 300_000)]
+    assert run_scenarios(scs, 100_000, 2_000, workers=2, shocks=store) == \
+        run_scenarios(scs, 100_000, 2_000, workers=1)
@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+from moneygoal import cli
+from moneygoal.pipeline import default_pipeline
+from moneygoal.watch import InotifyWatcher, PollingWatcher, changes, resolve_source, watch
+
+
+def _args(pos, trx, *extra):
+    return cli.build_parser().parse_args(
+        ["--positions", str(pos), "--transactions", str(trx), "--goal", "1000000",
+         "--report", "result/r.csv", "--paths", "200", *extra])
+
+def _edit(path, old, new):
+    path.write_text(path.read_text(encoding="utf-8-sig").replace(old, new), encoding="utf-8-sig")
+
+def test_resolve_source_picks_newest_csv(tmp_path):
+    assert resolve_source(tmp_path) is None
+    (tmp_path / "a.csv").write_text("x")
+    (tmp_path / "b.csv").write_text("x")
+    os.utime(tmp_path / "a.csv", ns=(1, 2_000_000_000))
+    os.utime(tmp_path / "b.csv", ns=(1, 3_000_000_000))
+    assert resolve_source(tmp_path).name == "b.csv"
+
+class _ScriptedWatcher:
+    """Fejkad bevakare: wait() ger nästa steg i manuset (anropbara steg körs och ger True)."""
+
+    def __init__(self, script):
+        self.script, self.timeouts, self.closed = list(script), [], False
+
+    def wait(self, timeout=None):
+        self.timeouts.append(timeout)
+        if not self.script:
+            self.closed = True
+            return False
+        step = self.script.pop(0)
+        if callable(step):
+            step()
+            return True
+        return step
+
+    def close(self):
+        self.closed = True
+
+def test_changes_debounces_a_burst_into_one_change():
+    w = _ScriptedWatcher([True, True, True, False, True, False])  # skur om tre, sedan en ensam
+    assert len(list(changes(w, debounce=0.2))) == 2
+    assert w.timeouts == [None, 0.2, 0.2, 0.2, None, 0.2, None]
+    closing = _ScriptedWatcher([True, True])  # stängs mitt i en skur ⇒ ingen omräkning
+    assert list(changes(closing, debounce=0.2)) == []
+
+def test_polling_smoke(tmp_path):
+    f = tmp_path / "positions.csv"
+    f.write_text("0")
+    w = PollingWatcher([f], interval=0.01)
+    seen = []
+    t = threading.Thread(target=lambda: [seen.append(1) for _ in changes(w, debounce=0.05)])
+    t.start()
+    f.write_text("ändrad")
+    deadline = time.monotonic() + 10
+    while not seen and time.monotonic() < deadline:
+        time.sleep(0.01)
+    w.close()
+    t.join(10)
+    assert seen == [1] and not t.is_alive()
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify finns bara på Linux")
+def test_inotify_sees_write_and_rename(tmp_path):
+    f = tmp_path / "positions.csv"
+    f.write_text("0")
+    w = InotifyWatcher([f])
+    assert w.wait(0.05) is False
+    (tmp_path / "other.txt").write_text("ignoreras")
+    assert w.wait(0.05) is False
+    (tmp_path / "tmp.part").write_text("1")
+    (tmp_path / "tmp.part").rename(f)
+    assert w.wait(1.0) is True
+    w.close()
+    assert w.wait(None) is False
+
+def test_watch_reruns_only_affected_stages(avanza_files, tmp_path, monkeypatch):
+    pos, trx = avanza_files
+    monkeypatch.chdir(tmp_path)
+    w = _ScriptedWatcher([
+        lambda: _edit(pos, "Fond A", "Fond A2"), False,          # samma V0 ⇒ ingen ny simulering
+        lambda: _edit(pos, "250 000,00", "300 000,00"), False,   # nytt V0 ⇒ mc, men inte contrib
+    ])
+    assert watch(_args(pos, trx), default_pipeline(), w, 0.1, 3) == 0
+    diag = pd.read_csv("result/diagnostics.csv")
+    assert diag["stage"].tolist() == ["watch"] * 3
+    assert pd.isna(diag["t_mc_s"].iloc[1]) and diag["t_mc_s"].iloc[2] > 0
+    assert pd.isna(diag["t_contrib_s"].iloc[1]) and pd.isna(diag["t_contrib_s"].iloc[2])
+    assert diag["V0"].iloc[2] == pytest.approx(diag["V0"].iloc[0] + 50_000)
+    assert (tmp_path / "result/r.csv").is_file()
+
+def test_watch_main_rejects_empty_directory(tmp_path, capsys):
+    rc = cli.main(["watch", "--positions", str(tmp_path), "--transactions", str(tmp_path),
+                   "--goal", "1000000", "--report", "r.csv"])
+    assert rc == 2 and "ingen CSV" in capsys.readouterr().err
@@ -0,0 +1,24 @@
+import pytest
+from moneygoal.sim.kernel import shock_bank, lognormal_factors, hitting_months, hitting_months_lognormal
+from moneygoal.sim.whatif import WhatIfBank
+
+def test_lazy_kernel_matches_materialized_factors():
+    z = shock_bank(3, 500, 240)
+    a = hitting_months(100_000, 2_000, lognormal_factors(z, 0.06, 0.15), 500_000)
+    b = hitting_months_lognormal(100_000, 2_000, z, 0.06, 0.15, 500_000)
+    assert (a == b).all()
+
+def test_bank_is_fixed_and_monotone():
+    bank = WhatIfBank(42, 2_000, 600)
+    r1 = bank.evaluate(100_000, 2_000, 0.06, 0.15, 1_000_000)
+    assert bank.evaluate(100_000, 2_000, 0.06, 0.15, 1_000_000) == r1
+    more = bank.evaluate(100_000, 3_000, 0.06, 0.15, 1_000_000)
+    higher = bank.evaluate(100_000, 2_000, 0.08, 0.15, 1_000_000)
+    assert all(more[k] <= r1[k] and higher[k] <= r1[k] for k in r1)
+    assert bank.last_ms > 0
+
+def test_deterministic_case_and_validation():
+    bank = WhatIfBank(1, 200, 360)
+    assert bank.evaluate(100_000, 2_000, 0.0, 0.0, 200_000) == {"p10": 50, "p50": 50, "p90": 50}
+    with pytest.raises(ValueError):
+        bank.evaluate(100_000, -1, 0.0, 0.0, 200_000)